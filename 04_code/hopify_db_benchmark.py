@@ -0,0 +1,178 @@
+# Standard library
+import os
+import sys
+import csv
+import json
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+
+
+# ------------------------------
+# Constants
+# ------------------------------
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATOR_PATH = os.path.join(CODE_DIR, 'hopify_db_v1_gen.py')
+DEFAULT_OUTPUT_DIR = os.path.join(CODE_DIR, '..', '01_project_artifacts', '01_benchmarks', 'generator_perf')
+DEFAULT_BASELINE = os.path.join(DEFAULT_OUTPUT_DIR, 'baseline.json')
+DEFAULT_SCALES = [0.05, 0.1, 0.2]
+DEFAULT_THRESHOLD = 0.10  # flag anything more than 10% worse than the baseline
+MIN_SECONDS = 0.05  # stages faster than this are too noisy to compare on time
+CSV_COLUMNS = ["scale", "stage", "seconds", "rows", "rows_per_sec", "peak_rss_mb"]
+
+
+# ------------------------------
+# Run the Generator at Each Scale Point
+# ------------------------------
+def run_generator(scale, generator_args, workdir):
+    # Each run is a fresh process, so peak RSS belongs to that scale point alone
+    stats_path = os.path.join(workdir, f"stats_{scale:g}.json")
+    command = [sys.executable, GENERATOR_PATH, "--db-path", os.path.join(workdir, f"hopify_{scale:g}.db"),
+               "--scale", str(scale), "--stats-json", stats_path] + generator_args
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stdout[-2000:])
+        print(result.stderr[-2000:])
+        raise SystemExit(f"[ERROR] Generator failed at scale {scale:g} (exit code {result.returncode}).")
+    with open(stats_path, mode='r', encoding='utf-8') as file:
+        return json.load(file)
+
+def best_of(runs):
+    # Fastest run per stage (least disturbed by other load); rows and memory come from that same run
+    best = dict(runs[0])
+    best["total_seconds"] = min(run["total_seconds"] for run in runs)
+    best["peak_rss_mb"] = max(run["peak_rss_mb"] for run in runs)
+    best["stages"] = {
+        stage: min((run["stages"][stage] for run in runs if stage in run["stages"]), key=lambda s: s["seconds"])
+        for stage in runs[0]["stages"]
+    }
+    return best
+
+def run_suite(scales, repeat, generator_args):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="hopify_bench_") as workdir:
+        for scale in scales:
+            runs = []
+            for attempt in range(repeat):
+                print(f"[INFO] Scale {scale:g}: run {attempt + 1}/{repeat}...")
+                runs.append(run_generator(scale, generator_args, workdir))
+            results[f"{scale:g}"] = best_of(runs)
+            print(f"[INFO] Scale {scale:g}: {results[f'{scale:g}']['total_seconds']:.2f}s total, "
+                  f"{results[f'{scale:g}']['peak_rss_mb']} MB peak RSS")
+    return results
+
+# ------------------------------
+# Write Results (JSON + CSV)
+# ------------------------------
+def write_results(output_dir, report):
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = report["created_at"].replace(":", "").replace("-", "")
+    json_path = os.path.join(output_dir, f"generator_perf_{stamp}.json")
+    csv_path = os.path.join(output_dir, f"generator_perf_{stamp}.csv")
+
+    with open(json_path, mode='w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+
+    with open(csv_path, mode='w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_COLUMNS)
+        for scale, result in report["results"].items():
+            for stage, stage_stats in result["stages"].items():
+                writer.writerow([scale, stage] + [stage_stats[column] for column in CSV_COLUMNS[2:]])
+            writer.writerow([scale, "total", result["total_seconds"],
+                             sum(s["rows"] for s in result["stages"].values()), None, result["peak_rss_mb"]])
+
+    print(f"[INFO] Results written to: {json_path}")
+    print(f"[INFO] Results written to: {csv_path}")
+    return json_path
+
+# ------------------------------
+# Compare with Baseline
+# ------------------------------
+def compare(report, baseline, threshold):
+    if baseline["generator_args"] != report["generator_args"]:
+        print(f"[WARN] Baseline was recorded with different generator options: {baseline['generator_args']}")
+
+    regressions = []
+    print(f"[PERF] {'scale':>6} {'stage':<18} {'baseline':>10} {'current':>10} {'change':>8}")
+    for scale, result in report["results"].items():
+        base = baseline["results"].get(scale)
+        if base is None:
+            print(f"[PERF] {scale:>6} (no baseline for this scale point)")
+            continue
+
+        checks = [(stage, "seconds", s["seconds"], base["stages"][stage]["seconds"])
+                  for stage, s in result["stages"].items() if stage in base["stages"]]
+        checks.append(("total", "seconds", result["total_seconds"], base["total_seconds"]))
+        checks.append(("total", "peak_rss_mb", result["peak_rss_mb"], base["peak_rss_mb"]))
+
+        for stage, metric, current, previous in checks:
+            if not previous:
+                continue
+            change = (current - previous) / previous
+            label = stage if metric == "seconds" else f"{stage} (RSS MB)"
+            flagged = change > threshold and (metric != "seconds" or max(current, previous) >= MIN_SECONDS)
+            print(f"[PERF] {scale:>6} {label:<18} {previous:>10.3f} {current:>10.3f} {change:>+7.1%}"
+                  + ("  <-- REGRESSION" if flagged else ""))
+            if flagged:
+                regressions.append((scale, label, previous, current, change))
+
+    if regressions:
+        print(f"[WARN] {len(regressions)} regression(s) above {threshold:.0%}.")
+    else:
+        print(f"[INFO] No regressions above {threshold:.0%}.")
+    return regressions
+
+# ------------------------------
+# Main
+# ------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark hopify_db_v1_gen.py per stage at several scale points. "
+                    "Unrecognised options are passed through to the generator (e.g. --order-engine numpy --fast-load)."
+    )
+    parser.add_argument("--scales", type=float, nargs="+", default=DEFAULT_SCALES, help="Scale points to run")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scale point; the fastest time per stage is kept")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Where result JSON/CSV files are written")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown (or memory growth) flagged as a regression")
+    args, generator_args = parser.parse_known_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    return args, generator_args
+
+def main(argv=None):
+    args, generator_args = parse_args(argv)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "generator_args": generator_args,
+        "results": run_suite(args.scales, args.repeat, generator_args),
+    }
+    write_results(os.path.abspath(args.output_dir), report)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, mode='r', encoding='utf-8') as file:
+            regressions = compare(report, json.load(file), args.threshold)
+    elif not args.save_baseline:
+        print(f"[INFO] No baseline at {args.baseline}; rerun with --save-baseline to store one.")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, mode='w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"[INFO] Baseline saved to: {args.baseline}")
+
+    # Non-zero exit lets CI fail on a regression
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# Standard library
+import os
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+
+# Generator module (KPI refresh, storage settings, default paths)
+import hopify_db_v1_gen as gen
+
+
+# ------------------------------
+# Constants
+# ------------------------------
+DEFAULT_FRACTION = 0.01
+# Multipliers of the 32-bit hash that orders customers within a segment (odd, below 2^31 so every product fits a
+# SQLite integer)
+HASH_MULTIPLIERS = (0x7feb352d, 0x5bd1e995)
+# Run-specific generator_metadata keys that do not describe the subset (it is not resumable, has no partitions,
+# and its KPI tables are recomputed)
+DROPPED_METADATA = ["run_config", "partition_by", "partition_dir", "kpi_high_water"]
+
+# ------------------------------
+# Sample Customers (per segment, seeded)
+# ------------------------------
+def sample_customers(conn, fraction, seed):
+    # The first round(fraction * segment size) customers of each segment (at least one) in seeded hash order,
+    # so every segment keeps its share of the source. The hash XORs the customer ID with the mixed seed, then runs
+    # two multiply / xor-shift rounds (SQLite has no XOR operator: a ^ b = (a | b) - (a & b)), so each seed gives
+    # an unrelated order
+    seed_mix = (seed * HASH_MULTIPLIERS[1]) % 4294967296
+    conn.execute("CREATE TEMP TABLE subset_customers (customer_id INTEGER PRIMARY KEY)")
+    conn.execute(
+        "INSERT INTO temp.subset_customers (customer_id) "
+        "WITH first_round AS ("
+        "    SELECT customer_id, customer_segment, "
+        "           (((customer_id | :seed) - (customer_id & :seed)) * :k1) % 4294967296 AS h "
+        "    FROM source.customers"
+        "), second_round AS ("
+        "    SELECT customer_id, customer_segment, (((h | (h >> 15)) - (h & (h >> 15))) * :k2) % 4294967296 AS h "
+        "    FROM first_round"
+        "), ranked AS ("
+        "    SELECT customer_id, "
+        "           ROW_NUMBER() OVER (PARTITION BY customer_segment "
+        "                              ORDER BY (h | (h >> 13)) - (h & (h >> 13)), customer_id) AS position, "
+        "           COUNT(*) OVER (PARTITION BY customer_segment) AS segment_size "
+        "    FROM second_round"
+        ") SELECT customer_id FROM ranked WHERE position <= MAX(1, ROUND(segment_size * :fraction))",
+        {"seed": seed_mix, "k1": HASH_MULTIPLIERS[0], "k2": HASH_MULTIPLIERS[1], "fraction": fraction}
+    )
+    return conn.execute(
+        "SELECT customer_segment, COUNT(*), SUM(customer_id IN (SELECT customer_id FROM temp.subset_customers)) "
+        "FROM source.customers GROUP BY 1 ORDER BY 1"
+    ).fetchall()
+
+# ------------------------------
+# Copy the Subset (schema verbatim, customer-level rows by key, everything else whole)
+# ------------------------------
+def source_objects(conn, kind):
+    return conn.execute(
+        "SELECT name, sql FROM source.sqlite_master WHERE type = ? AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+        "ORDER BY rowid", (kind,)
+    ).fetchall()
+
+def subset_filter(conn, table):
+    # WHERE clause selecting the subset's rows of a stored table (None: copied whole). Customer-level tables follow
+    # the sampled customers, and order-level tables the copied orders; both are set lookups against a key the
+    # source indexes (the primary key, or the analytical indexes when built)
+    columns = {row[1] for row in conn.execute(f"PRAGMA source.table_info({table})").fetchall()}
+    if "customer_id" in columns:
+        return "customer_id IN (SELECT customer_id FROM temp.subset_customers)"
+    if "order_id" in columns and table != "orders":
+        return "order_id IN (SELECT order_id FROM main.orders)"
+    return None
+
+def copy_subset(conn):
+    # Tables in source order, except that order-level tables wait for the subset's orders; KPI tables are left
+    # empty for the refresh and checkpoints are not carried over. Views follow, and indexes are built once the
+    # rows are in
+    stats = {}
+    tables = []
+    for table, sql in source_objects(conn, "table"):
+        conn.execute(sql)
+        if table != "generator_checkpoints" and not table.startswith("kpi_"):
+            tables.append((table, subset_filter(conn, table)))
+    tables.sort(key=lambda entry: entry[1] is not None and entry[1].startswith("order_id"))
+    for table, where in tables:
+        started = time.perf_counter()
+        cursor = conn.execute(f"INSERT INTO main.{table} SELECT * FROM source.{table}" + (f" WHERE {where}" if where else ""))
+        stats[table] = (cursor.rowcount, time.perf_counter() - started, where is not None)
+    for _, sql in source_objects(conn, "view"):
+        conn.execute(sql)
+    conn.commit()
+
+    started = time.perf_counter()
+    indexes = source_objects(conn, "index")
+    for _, sql in indexes:
+        conn.execute(sql)
+    analyzed = conn.execute("SELECT COUNT(*) FROM source.sqlite_master WHERE name = 'sqlite_stat1'").fetchone()[0]
+    if analyzed:
+        conn.execute("ANALYZE main")
+    conn.commit()
+    return stats, len(indexes), time.perf_counter() - started
+
+def refresh_subset_kpis(conn, source_path, fraction, seed):
+    # The copied KPI tables describe the whole source; recompute them from the subset's rows, on the source's run
+    # date and storage settings
+    metadata = dict(conn.execute("SELECT key, value FROM generator_metadata").fetchall())
+    gen.DATE_STORAGE = metadata.get("date_storage", "text")
+    gen.CATEGORY_STORAGE = metadata.get("category_storage", "text")
+    conn.executemany("DELETE FROM generator_metadata WHERE key = ?", [(key,) for key in DROPPED_METADATA])
+    gen.write_metadata(conn, subset_of=source_path, subset_fraction=fraction, subset_seed=seed)
+    if "as_of" in metadata:
+        gen.AS_OF = datetime.fromisoformat(metadata["as_of"])
+        writer = gen.RowBuffer(conn)
+        gen.refresh_kpis(writer, full=True)
+        writer.close()
+    conn.commit()
+
+def extract_subset(source_path, output_path, fraction, seed):
+    # Written next to the output and swapped in when complete
+    temp_path = output_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    gen.apply_pragmas(conn, gen.FAST_LOAD_PRAGMAS)
+    conn.execute("ATTACH DATABASE ? AS source", (source_path,))
+
+    started = time.perf_counter()
+    segments = sample_customers(conn, fraction, seed)
+    sample_seconds = time.perf_counter() - started
+    stats, index_count, index_seconds = copy_subset(conn)
+    conn.execute("DETACH DATABASE source")
+    refresh_subset_kpis(conn, source_path, fraction, seed)
+    gen.apply_pragmas(conn, gen.SAFE_PRAGMAS)
+    conn.close()
+    os.replace(temp_path, output_path)
+    return segments, sample_seconds, stats, index_count, index_seconds
+
+# ------------------------------
+# Report
+# ------------------------------
+def print_report(segments, sample_seconds, stats, index_count, index_seconds, total_seconds):
+    print(f"[INFO] {'segment':<12} {'source':>10} {'subset':>8} {'share':>8}")
+    for segment, source_count, subset_count in segments:
+        print(f"[INFO] {segment:<12} {source_count:>10} {subset_count:>8} {subset_count / source_count:>8.2%}")
+    print(f"[PERF] {'table':<22} {'rows':>10} {'seconds':>9}")
+    print(f"[PERF] {'(sample customers)':<22} {sum(count for _, _, count in segments):>10} {sample_seconds:>9.3f}")
+    for table, (rows, seconds, filtered) in stats.items():
+        print(f"[PERF] {table:<22} {rows:>10} {seconds:>9.3f}" + ("" if filtered else "  (copied whole)"))
+    print(f"[PERF] {f'({index_count} indexes)':<22} {'':>10} {index_seconds:>9.3f}")
+    print(f"[PERF] Total: {total_seconds:.2f}s")
+
+# ------------------------------
+# Main
+# ------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extract a referentially consistent slice of a generated database: a share of the customers of "
+                    "every segment with all of their subscriptions, orders, order items, payments, tickets, churn "
+                    "events and order discounts, plus the reference tables; KPI tables are recomputed for the slice."
+    )
+    parser.add_argument("--db-path", default=gen.DEFAULT_DB_PATH, help="Generated SQLite database (left unchanged)")
+    parser.add_argument("--output", default=None, help="Subset database to write (default: <db-path>_subset.db)")
+    parser.add_argument("--fraction", type=float, default=DEFAULT_FRACTION,
+                        help="Share of each segment's customers to keep (at least one per segment)")
+    parser.add_argument("--seed", type=int, default=gen.SEED, help="Seed of the customer sample")
+    args = parser.parse_args(argv)
+    if not 0 < args.fraction <= 1:
+        parser.error("--fraction must be in (0, 1]")
+    if not os.path.exists(args.db_path):
+        parser.error(f"{args.db_path} not found; generate a database first")
+    args.output = args.output or os.path.splitext(args.db_path)[0] + "_subset.db"
+    if os.path.abspath(args.output) == os.path.abspath(args.db_path):
+        parser.error("--output must differ from --db-path")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    source_path, output_path = os.path.abspath(args.db_path), os.path.abspath(args.output)
+    print(f"[INFO] Extracting {args.fraction:.2%} of each segment's customers from {source_path}...")
+    segments, sample_seconds, stats, index_count, index_seconds = extract_subset(source_path, output_path,
+                                                                                 args.fraction, args.seed)
+    print_report(segments, sample_seconds, stats, index_count, index_seconds, time.perf_counter() - started)
+    print(f"[INFO] Subset written to: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
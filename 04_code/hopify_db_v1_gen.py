@@ -5,25 +5,108 @@ import sqlite3
 import random
 import csv
 import re
+import argparse
+import contextlib
+import hashlib
+import importlib
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 from collections import defaultdict
+from itertools import accumulate
+from concurrent.futures import ProcessPoolExecutor
 
 # Third-party libraries
+import faker
 from faker import Faker
 from dateutil.relativedelta import relativedelta
 
-random.seed(42)
+# Optional: peak memory in the performance report (not available on Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Optional: vectorized order engine
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Optional: columnar Parquet export (also the Arrow ingest path for DuckDB)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Optional: embedded DuckDB output
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
 fake = Faker()
-fake.seed_instance(42)
 
 
 # ------------------------------
 # Constants and Lookups
 # ------------------------------
-NUM_CUSTOMERS = 50000
+NUM_CUSTOMERS = 50000  # customers at --scale 1
 NUM_PRODUCTS_STATIC = 30
 NUM_PRODUCTS_DYNAMIC = 50
 NUM_PRODUCTS_TOTAL = NUM_PRODUCTS_STATIC + NUM_PRODUCTS_DYNAMIC
+NUM_DISCOUNT_CODES = 50
+NUM_DISCOUNTED_ORDERS = 20000  # orders with a discount applied at --scale 1
+ORDER_ENGINE = "python"  # "python" (row by row) or "numpy" (vectorized batches, requires numpy)
+CHURN_MODEL = "rules"  # a name in CHURN_MODELS, or "package.module:function"
+DATE_STORAGE = "text"  # timestamp columns as "text" ("%Y-%m-%d %H:%M:%S") or "epoch" (INTEGER seconds since EPOCH)
+CATEGORY_STORAGE = "text"  # low-cardinality columns as "text" or "dictionary" (INTEGER codes into dimension tables)
+EPOCH = datetime(1970, 1, 1)
+SEED = 42
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'hopify_saas_v1.db')
+DEFAULT_BENCHMARKS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '01_project_artifacts',
+                                      '01_benchmarks', 'hopify_benchmarks_seg_table.csv')
+
+# Reference clock for the whole run ("today"); fixed once in main() and handed to every shard
+AS_OF = datetime.combine(datetime.today().date(), datetime.min.time())
+ONE_YEAR = timedelta(days=365.24)  # Faker's '1y'
+ORDER_WINDOW = 2 * ONE_YEAR
+HISTORY_MONTHS = 36  # acquisition plan and marketing spend span
+
+# Per-customer upper bounds, used to give each shard a non-overlapping ID block
+MAX_ITEMS_PER_ORDER = 5
+MAX_EXPANSION_MONTHS = 4
+MAX_TICKETS_PER_CUSTOMER = 10
+MAX_SUBSCRIPTIONS_PER_CUSTOMER = 4  # signup, upgrade, churn-time reactivation, later reactivation
+TICKET_SAMPLE_SIZE = 20000  # customers sampled for support tickets at --scale 1
+
+# Faker value pools (opt-in via --faker-pools)
+DEFAULT_POOL_SIZE = 25000
+
+# Write path
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_QUEUE_BATCHES = 8  # batches in flight between generation and the writer thread (opt-in via --writer-thread)
+FAST_LOAD_PRAGMAS = ["journal_mode = MEMORY", "synchronous = OFF", "cache_size = -262144", "temp_store = MEMORY"]
+SAFE_PRAGMAS = ["journal_mode = DELETE", "synchronous = FULL", "cache_size = -2000", "temp_store = DEFAULT"]
+DEFAULT_PAGE_SIZE = 8192  # page size the read-optimized finalize (opt-in via --finalize) rebuilds with
+
+# Timestamp columns: generated rows carry epoch seconds here, formatted (or not) per DATE_STORAGE at write time
+TIMESTAMP_COLUMNS = {"signup_date", "start_date", "end_date", "order_date", "payment_date", "churn_date", "created_at",
+                     "resolved_at", "install_date"}
+
+# Parquet export (opt-in via --parquet-dir) and DuckDB output (opt-in via --duckdb-path)
+DEFAULT_ROW_GROUP_SIZE = 100000  # rows per Parquet row group, and per Arrow batch ingested into DuckDB
+MONEY_COLUMNS = {"subscription_price", "total_amount", "subtotal", "payment_amount", "monthly_budget", "price", "mrr",
+                 "mrr_target", "revenue", "arpu", "arpu_target", "marketing_spend", "cac", "cac_target"}
+# Tables later stages query back; with --no-sqlite only these go to the scratch database
+READ_BACK_TABLES = ["products", "customers", "orders", "support_tickets", "churn_events", "app_installs", "discounts"]
 
 PLAN_TYPES = {
     "Starter": 29,
@@ -36,6 +119,28 @@ CUSTOMER_SEGMENTS = ["SMB", "Mid-Market", "Enterprise"]
 TICKET_CATEGORIES = ["Billing", "Technical", "Onboarding", "Account Access", "General Inquiry"]
 PAYMENT_METHODS = ["Card", "ACH", "PayPal", "Hop Pay"]
 CHURN_REASONS = ["Too expensive", "Switched provider", "Lack of features", "Poor support", "Other"]
+PRODUCT_CATEGORIES = ['POS Hardware & Software', 'Payments & Finance', 'Financial Services', 'Apps & Integrations',
+                      'Storefront Tools', 'Marketing & Growth', 'Logistics & Shipping']
+TRAFFIC_CHANNELS = ['Paid Search', 'Social Media', 'Organic']
+
+# Weighted distributions (outcome -> weight), compiled once into samplers; tune them here
+SEGMENT_WEIGHTS = {"SMB": 0.6, "Mid-Market": 0.3, "Enterprise": 0.1}
+SEGMENT_SOURCE_WEIGHTS = {
+    "SMB": {"Organic": 0.45, "Social": 0.25, "Paid Search": 0.20, "Referral": 0.05, "Direct": 0.05},
+    "Mid-Market": {"Paid Search": 0.30, "Referral": 0.25, "Organic": 0.20, "Social": 0.15, "Direct": 0.10},
+    "Enterprise": {"Referral": 0.35, "Paid Search": 0.30, "Direct": 0.20, "Organic": 0.10, "Social": 0.05},
+}
+SEGMENT_CATEGORY_WEIGHTS = {
+    "Enterprise": {"POS Hardware & Software": 0.4, "Payments & Finance": 0.3, "Financial Services": 0.2,
+                   "Apps & Integrations": 0.1},
+    "Mid-Market": {"Apps & Integrations": 0.4, "Storefront Tools": 0.4, "Marketing & Growth": 0.2},
+    "SMB": {"Storefront Tools": 0.5, "Marketing & Growth": 0.3, "Logistics & Shipping": 0.2},
+}
+SEGMENT_TICKET_COUNT_WEIGHTS = {  # tickets per year for a ticketing customer
+    "Enterprise": {5: 20, 6: 30, 7: 25, 8: 15, 9: 7, 10: 3},
+    "Mid-Market": {2: 30, 3: 30, 4: 20, 5: 15, 6: 5},
+    "SMB": {0: 50, 1: 30, 2: 15, 3: 5},
+}
 
 OFFICE_LOCATIONS = [
     ("Hopify NYC HQ", "150 Elgin St", "New York City", "NY", "10001", "United States"),
@@ -45,21 +150,104 @@ OFFICE_LOCATIONS = [
     ("Hopify Singapore Hub", "1 Raffles Place", "Singapore", "Singapore", "048616", "Singapore")
 ]
 
-print("[INFO] Database structure and constants initialized.")
+# Dictionary-encoded columns (opt-in via --category-storage dictionary): each dimension table holds one column's
+# values, coded by their position in these lists (from 1), so every build, shard and append agrees on the codes.
+# New values go at the end of a list
+DIMENSIONS = {  # dimension table -> (column, values)
+    "dim_customer_segment": ("customer_segment", CUSTOMER_SEGMENTS),
+    "dim_acquisition_source": ("acquisition_source", list(dict.fromkeys(
+        source for weights in SEGMENT_SOURCE_WEIGHTS.values() for source in weights))),
+    # Subscription values are kept exactly as generated, including the differently cased reactivation rows
+    "dim_plan_type": ("plan_type", list(PLAN_TYPES) + ["Standard", "Pro", "Enterprise"]),
+    "dim_subscription_status": ("status", ["active", "Active"]),
+    "dim_change_type": ("change_type", ["signup", "upgrade", "reactivation", "Reactivation"]),
+    "dim_payment_method": ("payment_method", PAYMENT_METHODS),
+    "dim_ticket_category": ("ticket_category", TICKET_CATEGORIES),
+    "dim_churn_reason": ("churn_reason", CHURN_REASONS),
+    "dim_product_category": ("category", PRODUCT_CATEGORIES),
+    "dim_source_channel": ("source_channel", TRAFFIC_CHANNELS),
+}
+DICTIONARY_COLUMNS = {  # table -> {column: dimension table}
+    "customers": {"customer_segment": "dim_customer_segment", "acquisition_source": "dim_acquisition_source"},
+    "subscriptions": {"plan_type": "dim_plan_type", "status": "dim_subscription_status",
+                      "change_type": "dim_change_type"},
+    "payments": {"payment_method": "dim_payment_method"},
+    "support_tickets": {"ticket_category": "dim_ticket_category"},
+    "churn_events": {"churn_reason": "dim_churn_reason"},
+    "products": {"category": "dim_product_category"},
+    "web_traffic": {"source_channel": "dim_source_channel"},
+}
+
+# Tables populated per customer (and therefore per shard); everything else is generated once by the parent
+SHARDED_TABLES = ["customers", "orders", "order_items", "payments", "order_discounts", "subscriptions", "support_tickets",
+                  "churn_events"]
+
+# ------------------------------
+# Faker Value Pools (pre-generated, deduplicated; drawn with index arithmetic instead of per-row Faker calls)
+# ------------------------------
+POOL_FIELDS = {
+    "name": lambda: fake.name(),
+    "first_name": lambda: fake.first_name(),
+    "company": lambda: fake.company(),
+    "email": lambda: fake.email(),
+    "address": lambda: fake.address(),
+}
+faker_pools = {}
+
+def build_faker_pools(seed, size):
+    seed_stage(seed, "faker_pools")
+    pools = {}
+    for field, make in POOL_FIELDS.items():
+        # dict keeps first-seen order, so the pool is deterministic for a seed; low-cardinality
+        # fields (e.g. first names) stop after a bounded number of attempts
+        values = {}
+        attempts = 0
+        while len(values) < size and attempts < size * 3:
+            values.setdefault(make(), None)
+            attempts += 1
+        pools[field] = list(values)
+    print("[INFO] Built faker pools: " + ", ".join(f"{field}={len(values)}" for field, values in pools.items()))
+    return pools
+
+def load_faker_pools(seed, size, cache_path=None):
+    key = {"seed": seed, "size": size, "faker": faker.VERSION, "locales": list(fake.locales)}
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, mode='r', encoding='utf-8') as file:
+            cached = json.load(file)
+        if cached.get("key") == key:
+            print(f"[INFO] Loaded faker pools from cache: {cache_path}")
+            return cached["pools"]
+        print(f"[INFO] Faker pool cache {cache_path} was built with different settings; rebuilding.")
+
+    pools = build_faker_pools(seed, size)
+    if cache_path:
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, mode='w', encoding='utf-8') as file:
+            json.dump({"key": key, "pools": pools}, file)
+        os.replace(tmp_path, cache_path)
+        print(f"[INFO] Faker pools cached to: {cache_path}")
+    return pools
+
+def fake_value(field):
+    # Pool draw when pools are loaded, otherwise a live Faker call
+    pool = faker_pools.get(field)
+    if pool:
+        return pool[int(random.random() * len(pool))]
+    return POOL_FIELDS[field]()
 
 # ------------------------------
 # B2B Name & Domain Helpers
 # ------------------------------
 def generate_customer_name(segment):
     if segment == "SMB":
-        return fake.name()
+        return fake_value("name")
     elif segment == "Mid-Market":
         return random.choice([
-            f"{fake.first_name()}'s {random.choice(['Studio', 'Shop', 'Solutions'])}",
-            fake.company()
+            f"{fake_value('first_name')}'s {random.choice(['Studio', 'Shop', 'Solutions'])}",
+            fake_value("company")
         ])
     elif segment == "Enterprise":
-        return f"{fake.company()} {random.choice(['Inc.', 'LLC', 'Group', 'Solutions', 'Systems'])}"
+        return f"{fake_value('company')} {random.choice(['Inc.', 'LLC', 'Group', 'Solutions', 'Systems'])}"
 
 def slugify(text):
     text = text.lower()
@@ -73,44 +261,98 @@ def generate_store_metadata(name):
     return slug, domain
 
 # ------------------------------
-# Dynamic Monthly Acquisition Plan (with dips, spikes, and marketing campaigns)
+# Deterministic Seeding
 # ------------------------------
+def derive_seed(seed, *keys):
+    # Stable 64-bit seed for (seed, *keys), independent of process, shard count and PYTHONHASHSEED
+    material = ":".join(str(part) for part in (seed,) + keys).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(material).digest()[:8], "big")
+
+def seed_stage(seed, *keys):
+    # Every stage starts from its own derived seed, so its output does not depend on which process runs it
+    stage_seed = derive_seed(seed, *keys)
+    random.seed(stage_seed)
+    fake.seed_instance(stage_seed)
+    return stage_seed
 
-acquisition_plan = defaultdict(int)
-start_month = datetime.now() - relativedelta(months=36)  # Extend to 3 years for v15
-current_month = datetime.now() - relativedelta(months=1)
-month_cursor = start_month
+# ------------------------------
+# Weighted Sampling (distributions compiled once instead of per draw)
+# ------------------------------
+class WeightedChoice:
+    # random.choices(values, weights)[0] with the cumulative weights built once: the same single random() draw
+    # and bisect, so seeded output is unchanged, without rebuilding the table on every call. draw_codes() is
+    # the vectorized numpy form (indices into values) over the same table
+    def __init__(self, weights):
+        self.values = list(weights)
+        self.weights = list(weights.values())
+        self.cum_weights = list(accumulate(self.weights))
+        self.total = self.cum_weights[-1] + 0.0
+        self.hi = len(self.cum_weights) - 1
+        self.cum_array = None
+
+    def draw(self):
+        return self.values[bisect_right(self.cum_weights, random.random() * self.total, 0, self.hi)]
+
+    def draw_codes(self, rng, size):
+        if self.cum_array is None:
+            self.cum_array = np.cumsum(self.weights) / np.sum(self.weights)
+            self.cum_array[-1] = 1.0
+        return np.searchsorted(self.cum_array, rng.random(size), side="right")
+
+segment_sampler = WeightedChoice(SEGMENT_WEIGHTS)
+source_samplers = {segment: WeightedChoice(weights) for segment, weights in SEGMENT_SOURCE_WEIGHTS.items()}
+category_samplers = {segment: WeightedChoice(weights) for segment, weights in SEGMENT_CATEGORY_WEIGHTS.items()}
+ticket_count_samplers = {segment: WeightedChoice(weights) for segment, weights in SEGMENT_TICKET_COUNT_WEIGHTS.items()}
 
-while month_cursor <= current_month:
-    year_month = month_cursor.strftime('%Y-%m')
-    if month_cursor.month in [6, 7, 8]:
-        target_customers = random.randint(1200, 1800)
-    elif month_cursor.month in [11, 12, 1]:
-        target_customers = random.randint(2200, 3000)
-    elif month_cursor.month == 4 and random.random() < 0.3:
-        target_customers = random.randint(3000, 4000)
+# ------------------------------
+# Dynamic Monthly Acquisition Plan (with dips, spikes, and marketing campaigns)
+# ------------------------------
+# Expected draw_monthly_target() averaged over a calendar year
+SEASONAL_MEAN_TARGET = (3 * 1500 + 3 * 2600 + (0.3 * 3500 + 0.7 * 2050) + 5 * 2050) / 12
+
+def draw_monthly_target(month):
+    if month.month in [6, 7, 8]:
+        return random.randint(1200, 1800)
+    elif month.month in [11, 12, 1]:
+        return random.randint(2200, 3000)
+    elif month.month == 4 and random.random() < 0.3:
+        return random.randint(3000, 4000)
     else:
-        target_customers = random.randint(1800, 2300)
-    acquisition_plan[year_month] = target_customers
-    month_cursor += relativedelta(months=1)
-
-print(f"[INFO] Acquisition plan generated for {len(acquisition_plan)} months.")
+        return random.randint(1800, 2300)
+
+def build_acquisition_plan(total_customers=NUM_CUSTOMERS):
+    acquisition_plan = defaultdict(int)
+    start_month = AS_OF - relativedelta(months=HISTORY_MONTHS)  # Extend to 3 years for v15
+    current_month = AS_OF - relativedelta(months=1)
+    month_cursor = start_month
+
+    while month_cursor <= current_month:
+        year_month = month_cursor.strftime('%Y-%m')
+        acquisition_plan[year_month] = draw_monthly_target(month_cursor)
+        month_cursor += relativedelta(months=1)
+
+    # The monthly targets above set the seasonal shape; scale it to the requested customer total
+    # (largest-remainder rounding keeps the total exact)
+    weight_total = sum(acquisition_plan.values())
+    exact = {month: total_customers * target / weight_total for month, target in acquisition_plan.items()}
+    scaled_plan = {month: int(value) for month, value in exact.items()}
+    shortfall = total_customers - sum(scaled_plan.values())
+    for month in sorted(exact, key=lambda m: exact[m] - scaled_plan[m], reverse=True)[:shortfall]:
+        scaled_plan[month] += 1
+
+    print(f"[INFO] Acquisition plan generated for {len(scaled_plan)} months ({total_customers} customers).")
+    return scaled_plan
 
 # ------------------------------
 # Connect and Create Schema
 # ------------------------------
-
-db_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'hopify_saas_v1.db')
-conn = sqlite3.connect(os.path.abspath(db_path))
-cursor = conn.cursor()
-
-
-cursor.executescript("""
+SCHEMA_SQL = """
 DROP TABLE IF EXISTS customers;
 DROP TABLE IF EXISTS subscriptions;
 DROP TABLE IF EXISTS orders;
 DROP TABLE IF EXISTS order_items;
 DROP TABLE IF EXISTS payments;
+DROP TABLE IF EXISTS marketing_spend;
 DROP TABLE IF EXISTS churn_events;
 DROP TABLE IF EXISTS support_tickets;
 DROP TABLE IF EXISTS app_installs;
@@ -121,6 +363,10 @@ DROP TABLE IF EXISTS locations;
 DROP TABLE IF EXISTS marketing_campaigns;
 DROP TABLE IF EXISTS web_traffic;
 DROP TABLE IF EXISTS benchmarks;
+DROP TABLE IF EXISTS kpi_monthly_segment;
+DROP TABLE IF EXISTS kpi_monthly_traffic;
+DROP TABLE IF EXISTS generator_metadata;
+DROP TABLE IF EXISTS generator_checkpoints;
 
 CREATE TABLE customers (
     customer_id INTEGER PRIMARY KEY,
@@ -179,7 +425,7 @@ CREATE TABLE marketing_spend (
     segment TEXT,
     month TEXT,
     monthly_budget REAL
-);                     
+);
 
 CREATE TABLE churn_events (
     churn_id INTEGER PRIMARY KEY,
@@ -260,176 +506,1032 @@ CREATE TABLE benchmarks (
     target_period TEXT
 );
 
-""")
+CREATE TABLE kpi_monthly_segment (
+    month TEXT,
+    segment TEXT,
+    active_customers INTEGER,
+    new_customers INTEGER,
+    churned_customers INTEGER,
+    reactivated_customers INTEGER,
+    churn_rate_pct REAL,
+    churn_target_pct REAL,
+    mrr REAL,
+    mrr_target REAL,
+    revenue REAL,
+    paying_customers INTEGER,
+    arpu REAL,
+    arpu_target REAL,
+    marketing_spend REAL,
+    cac REAL,
+    cac_target REAL,
+    new_customers_target REAL,
+    PRIMARY KEY (month, segment)
+);
 
-print("[INFO] Database schema created.")
+CREATE TABLE kpi_monthly_traffic (
+    month TEXT,
+    source_channel TEXT,
+    visitors INTEGER,
+    leads INTEGER,
+    mqls INTEGER,
+    lead_to_mql_pct REAL,
+    PRIMARY KEY (month, source_channel)
+);
+
+CREATE TABLE generator_metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
 
+CREATE TABLE generator_checkpoints (
+    stage TEXT PRIMARY KEY,
+    stage_seed TEXT,
+    ids TEXT
+);
+"""
+
+def logical_schema_sql():
+    # The tables as queries see them: with DATE_STORAGE = "epoch" every timestamp column is declared INTEGER
+    # instead of TEXT
+    if DATE_STORAGE == "epoch":
+        pattern = r"^(\s+(?:" + "|".join(sorted(TIMESTAMP_COLUMNS)) + r")) TEXT\b"
+        return re.sub(pattern, r"\1 INTEGER", SCHEMA_SQL, flags=re.MULTILINE)
+    return SCHEMA_SQL
+
+def schema_sql():
+    # With CATEGORY_STORAGE = "dictionary" the dictionary-encoded tables are stored coded behind views
+    sql = logical_schema_sql()
+    if CATEGORY_STORAGE == "dictionary":
+        sql = dictionary_schema_sql(sql)
+    return sql
+
+def create_schema(cursor):
+    # A rebuild may replace a database stored the other way, whose tables are views here (or the reverse)
+    for name, kind in cursor.execute("SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view')").fetchall():
+        if (kind == "view" and name in CODED_TABLES) or name in DIMENSIONS or name in CODED_TABLES.values():
+            cursor.execute(f"DROP {kind.upper()} {name}")
+    cursor.executescript(schema_sql())
+    if CATEGORY_STORAGE == "dictionary":
+        fill_dimensions(cursor)
+    print("[INFO] Database schema created.")
+
+# Insert column order per table (web_traffic.traffic_id is AUTOINCREMENT and left to SQLite)
+TABLE_COLUMNS = {
+    "customers": ["customer_id", "name", "email", "billing_address", "shipping_address", "signup_date",
+                  "customer_segment", "acquisition_source", "store_slug", "store_domain"],
+    "subscriptions": ["subscription_id", "customer_id", "plan_type", "subscription_price", "start_date", "end_date",
+                      "status", "change_type"],
+    "orders": ["order_id", "customer_id", "order_date", "total_amount"],
+    "order_items": ["order_item_id", "order_id", "product_id", "quantity", "subtotal"],
+    "payments": ["payment_id", "customer_id", "payment_amount", "payment_date", "payment_method", "success"],
+    "marketing_spend": ["segment", "month", "monthly_budget"],
+    "churn_events": ["churn_id", "customer_id", "churn_date", "churn_reason"],
+    "support_tickets": ["ticket_id", "customer_id", "ticket_category", "created_at", "resolved_at"],
+    "app_installs": ["install_id", "location_id", "product_id", "install_date"],
+    "discounts": ["discount_id", "discount_code", "discount_percent", "start_date", "end_date"],
+    "order_discounts": ["order_id", "discount_id"],
+    "products": ["product_id", "name", "category", "price", "revenue_type"],
+    "locations": ["location_id", "name", "address", "city", "state", "postal_code", "country"],
+    "web_traffic": ["traffic_date", "source_channel", "visitors", "leads", "mqls"],
+    "benchmarks": ["benchmark_id", "metric_category", "segment", "metric_name", "target_value", "description",
+                   "target_period"],
+    "kpi_monthly_segment": ["month", "segment", "active_customers", "new_customers", "churned_customers",
+                            "reactivated_customers", "churn_rate_pct", "churn_target_pct", "mrr", "mrr_target",
+                            "revenue", "paying_customers", "arpu", "arpu_target", "marketing_spend", "cac", "cac_target",
+                            "new_customers_target"],
+    "kpi_monthly_traffic": ["month", "source_channel", "visitors", "leads", "mqls", "lead_to_mql_pct"],
+}
+INSERT_SQL = {
+    table: f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    for table, columns in TABLE_COLUMNS.items()
+}
 
 # ------------------------------
-# Products (Static and Dynamic)
+# Timestamps (epoch seconds in memory, formatted once at write time)
 # ------------------------------
-product_id = 1
-categories = ['POS Hardware & Software', 'Payments & Finance', 'Financial Services', 'Apps & Integrations',
-              'Storefront Tools', 'Marketing & Growth', 'Logistics & Shipping']
-
-# Static products
-for i in range(NUM_PRODUCTS_STATIC):
-    cursor.execute("""
-        INSERT INTO products VALUES (?, ?, ?, ?, ?)
-    """, (
-        product_id,
-        f"Static Product {i+1}",
-        random.choice(categories),
-        round(random.uniform(20, 500), 2),
-        random.choice(["One-Time", "Subscription"])
-    ))
-    product_id += 1
-
-# Dynamic products
-for i in range(NUM_PRODUCTS_DYNAMIC):
-    cursor.execute("""
-        INSERT INTO products VALUES (?, ?, ?, ?, ?)
-    """, (
-        product_id,
-        fake.catch_phrase(),
-        random.choice(categories),
-        round(random.uniform(20, 500), 2),
-        random.choice(["One-Time", "Subscription"])
-    ))
-    product_id += 1
+TIMESTAMP_POSITIONS = {
+    table: [i for i, column in enumerate(columns) if column in TIMESTAMP_COLUMNS]
+    for table, columns in TABLE_COLUMNS.items()
+}
+CLOCK_MINUTES = [f"{hour:02d}:{minute:02d}:" for hour in range(24) for minute in range(60)]
+CLOCK_SECONDS = [f"{second:02d}" for second in range(60)]
+day_prefixes = {}  # days since EPOCH -> "YYYY-MM-DD "
+day_numbers = {}  # "YYYY-MM-DD" -> days since EPOCH
+
+def to_epoch(moment):
+    # Whole seconds, matching the "%Y-%m-%d %H:%M:%S" strings written to the database
+    return int((moment - EPOCH).total_seconds())
+
+def from_epoch(seconds):
+    return EPOCH + timedelta(seconds=seconds)
+
+def format_epoch(seconds):
+    # Same text as from_epoch(seconds).strftime("%Y-%m-%d %H:%M:%S"); the date part is formatted once per day and
+    # the clock part comes from lookup tables
+    day, second = divmod(seconds, 86400)
+    prefix = day_prefixes.get(day)
+    if prefix is None:
+        prefix = day_prefixes[day] = (EPOCH + timedelta(days=day)).strftime("%Y-%m-%d ")
+    minute, second = divmod(second, 60)
+    return prefix + CLOCK_MINUTES[minute] + CLOCK_SECONDS[second]
+
+def read_epoch(value):
+    # A stored timestamp (TEXT "%Y-%m-%d %H:%M:%S" or INTEGER epoch seconds) back to epoch seconds
+    if value is None or isinstance(value, int):
+        return value
+    day = day_numbers.get(value[:10])
+    if day is None:
+        day = day_numbers[value[:10]] = (datetime.strptime(value[:10], "%Y-%m-%d") - EPOCH).days
+    return day * 86400 + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+
+def format_timestamps(table, rows):
+    # Rows as stored in SQLite: timestamp columns formatted column-wise when DATE_STORAGE is "text"
+    positions = TIMESTAMP_POSITIONS[table]
+    if DATE_STORAGE == "epoch" or not positions:
+        return rows
+    columns = list(zip(*rows))
+    for i in positions:
+        columns[i] = [None if value is None else format_epoch(value) for value in columns[i]]
+    return list(zip(*columns))
+
+def stored_timestamp(moment):
+    # A datetime as bound in SQL comparisons against a stored timestamp column
+    epoch = to_epoch(moment)
+    return epoch if DATE_STORAGE == "epoch" else format_epoch(epoch)
+
+def month_sql(column):
+    # SQL expression for the "YYYY-MM" month of a stored timestamp column
+    if DATE_STORAGE == "epoch":
+        return f"strftime('%Y-%m', {column}, 'unixepoch')"
+    return f"substr({column}, 1, 7)"
+
+# ------------------------------
+# Dictionary-Encoded Columns (INTEGER codes in <table>_coded, decoded by a view under the table's name)
+# ------------------------------
+CODED_TABLES = {table: f"{table}_coded" for table in DICTIONARY_COLUMNS}
+DIMENSION_CODES = {
+    dimension: {None: None, **{value: code for code, value in enumerate(values, 1)}}
+    for dimension, (_, values) in DIMENSIONS.items()
+}
+CODE_POSITIONS = {
+    table: [(TABLE_COLUMNS[table].index(column), column, dimension) for column, dimension in columns.items()]
+    for table, columns in DICTIONARY_COLUMNS.items()
+}
 
-print("[INFO] Inserted products.")
+def stored_table(table):
+    # Table the rows of `table` are written to (and its rowids live in)
+    return CODED_TABLES[table] if CATEGORY_STORAGE == "dictionary" and table in CODED_TABLES else table
+
+def stored_column(table, column):
+    if CATEGORY_STORAGE == "dictionary" and column in DICTIONARY_COLUMNS.get(table, {}):
+        return f"{column}_id"
+    return column
+
+def insert_sql(table):
+    if stored_table(table) == table:
+        return INSERT_SQL[table]
+    columns = [stored_column(table, column) for column in TABLE_COLUMNS[table]]
+    return f"INSERT INTO {stored_table(table)} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+def encode_categories(table, rows):
+    # Rows as stored in SQLite: dictionary-encoded columns replaced by their codes, column-wise
+    if stored_table(table) == table:
+        return rows
+    columns = list(zip(*rows))
+    for i, column, dimension in CODE_POSITIONS[table]:
+        codes = DIMENSION_CODES[dimension]
+        try:
+            columns[i] = [codes[value] for value in columns[i]]
+        except KeyError as error:
+            raise ValueError(f"{table}.{column} value {error.args[0]!r} is not in {dimension}; "
+                             f"add it to DIMENSIONS") from None
+    return list(zip(*columns))
+
+def dictionary_schema_sql(sql):
+    # Encoded tables are renamed to <table>_coded with <column>_id INTEGER columns, and the dimension tables are
+    # added after them; the views under the original names come from create_category_views()
+    def encode_table(match):
+        table, body = match.groups()
+        if table not in CODED_TABLES:
+            return match.group(0)
+        for column, dimension in DICTIONARY_COLUMNS[table].items():
+            body = re.sub(rf"^(\s+){column} TEXT\b", rf"\1{column}_id INTEGER REFERENCES {dimension}({column}_id)",
+                          body, flags=re.MULTILINE)
+        return f"CREATE TABLE {CODED_TABLES[table]} ({body}\n);"
+
+    sql = re.sub(r"CREATE TABLE (\w+) \((.*?)\n\);", encode_table, sql, flags=re.DOTALL)
+    dimensions = [
+        f"CREATE TABLE {dimension} (\n    {column}_id INTEGER PRIMARY KEY,\n    {column} TEXT NOT NULL UNIQUE\n);"
+        for dimension, (column, _) in DIMENSIONS.items()
+    ]
+    return sql + "\n" + "\n\n".join(dimensions) + "\n"
+
+def decoded_column(table, column):
+    # SQL expression for a column's value in the stored table. Codes are decoded inline rather than joined, so
+    # scans through the views cost no per-row lookups, and an index on the same expression serves filters and
+    # grouping on the decoded column
+    if stored_column(table, column) == column:
+        return column
+    cases = []
+    for code, value in enumerate(DIMENSIONS[DICTIONARY_COLUMNS[table][column]][1], 1):
+        escaped = value.replace("'", "''")
+        cases.append(f"WHEN {code} THEN '{escaped}'")
+    return f"CASE {column}_id {' '.join(cases)} END"
+
+def create_category_views(cursor):
+    # One view per encoded table with the original name, columns and values; recreated whenever DIMENSIONS may
+    # have grown (new builds and --append)
+    for table, coded in CODED_TABLES.items():
+        columns = [f"{decoded_column(table, column)} AS {column}" if column in DICTIONARY_COLUMNS[table]
+                   else column for column in SQL_TYPES[table]]
+        cursor.execute(f"DROP VIEW IF EXISTS {table}")
+        cursor.execute(f"CREATE VIEW {table} AS SELECT {', '.join(columns)} FROM {coded}")
+
+def fill_dimensions(cursor):
+    # Idempotent, so a database built before a value was added picks it up on --append
+    for dimension, (column, values) in DIMENSIONS.items():
+        cursor.executemany(f"INSERT OR IGNORE INTO {dimension} ({column}_id, {column}) VALUES (?, ?)",
+                           list(enumerate(values, 1)))
+    create_category_views(cursor)
 
 # ------------------------------
-# Office Locations
+# Bulk Load Writer (batched row buffer, stage-boundary commits, load-time PRAGMAs)
+# ------------------------------
+def apply_pragmas(conn, pragmas):
+    for pragma in pragmas:
+        conn.execute(f"PRAGMA {pragma}")
+
+class RowBuffer:
+    # Every table is written through here: rows are batched per table, flushed with executemany
+    # when a batch fills up, and flushed + committed at each stage boundary. With queue_batches > 0 the
+    # flushes go to a single writer thread through a bounded queue, so generation and I/O overlap and a slow
+    # writer blocks generation instead of letting batches pile up; the connection must then be opened with
+    # check_same_thread=False, and callers read through self.cursor only after sync() (or at stage boundaries)
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE, sinks=(), sqlite_tables=None, queue_batches=0):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch_size = batch_size
+        # Storage backends besides SQLite (ParquetSink, DuckDBSink): anything with write(table, rows) and close()
+        # receives every flushed batch, timestamps as epoch seconds
+        self.sinks = list(sinks)
+        self.sqlite_tables = set(sqlite_tables) if sqlite_tables is not None else None  # None = all tables
+        self.pending = defaultdict(list)
+        self.rows_written = defaultdict(int)
+        self.write_seconds = defaultdict(float)
+        self.queue_wait_seconds = defaultdict(float)
+        self.stage_seconds = {}
+        self.stage_rows = {}
+        self.stage_peak_rss_mb = {}
+        self.stage_started = time.perf_counter()
+        self.rows_at_stage_start = 0
+        self.queue = None
+        self.writer_error = None
+        if queue_batches:
+            self.queue = queue.Queue(maxsize=queue_batches)
+            self.write_cursor = conn.cursor()
+            self.writer_thread = threading.Thread(target=self.drain_queue, name="hopify-writer", daemon=True)
+            self.writer_thread.start()
+
+    def add(self, table, row):
+        rows = self.pending[table]
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush(table)
+
+    def add_many(self, table, rows):
+        pending = self.pending[table]
+        pending.extend(rows)
+        if len(pending) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table=None):
+        for name in [table] if table else list(self.pending):
+            rows = self.pending[name]
+            if not rows:
+                continue
+            if self.queue is None:
+                self.write_batch(self.cursor, name, rows)
+                rows.clear()
+                continue
+            # Hand the rows over in batch-size pieces (put blocks while the queue is full) and start a fresh buffer,
+            # so at most queue_batches x batch_size rows are in flight however large an add_many was
+            self.raise_writer_error()
+            started = time.perf_counter()
+            for start in range(0, len(rows), self.batch_size):
+                self.queue.put((name, rows[start:start + self.batch_size]))
+            self.queue_wait_seconds[name] += time.perf_counter() - started
+            self.pending[name] = []
+
+    def write_batch(self, cursor, name, rows):
+        started = time.perf_counter()
+        if self.sqlite_tables is None or name in self.sqlite_tables:
+            cursor.executemany(insert_sql(name), encode_categories(name, format_timestamps(name, rows)))
+        for sink in self.sinks:
+            sink.write(name, rows)
+        self.write_seconds[name] += time.perf_counter() - started
+        self.rows_written[name] += len(rows)
+
+    def drain_queue(self):
+        # Writer thread: the only code touching the connection while generation runs. After a failure it keeps
+        # taking (and dropping) batches so the generating thread never blocks on a full queue; the error is
+        # raised there on its next flush or sync
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                if self.writer_error is None:
+                    self.write_batch(self.write_cursor, *item)
+            except BaseException as error:
+                self.writer_error = error
+            finally:
+                self.queue.task_done()
+
+    def raise_writer_error(self):
+        if self.writer_error is not None:
+            raise RuntimeError(f"Writer thread failed: {self.writer_error!r}") from self.writer_error
+
+    def sync(self):
+        # Flush and wait until every queued batch is written, so reads on self.cursor see all rows
+        self.flush()
+        if self.queue is not None:
+            self.queue.join()
+            self.raise_writer_error()
+
+    def end_stage(self, stage, checkpoint=None):
+        # A stage's checkpoint is committed in the same transaction as its last rows
+        self.sync()
+        if checkpoint:
+            record_checkpoint(self.cursor, *checkpoint)
+        self.conn.commit()
+        now = time.perf_counter()
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + now - self.stage_started
+        self.stage_started = now
+        rows_total = sum(self.rows_written.values())
+        self.stage_rows[stage] = self.stage_rows.get(stage, 0) + rows_total - self.rows_at_stage_start
+        self.rows_at_stage_start = rows_total
+        self.stage_peak_rss_mb[stage] = peak_rss_mb()
+
+    def close(self):
+        self.sync()
+        if self.queue is not None and self.writer_thread.is_alive():
+            self.queue.put(None)
+            self.writer_thread.join()
+        for sink in self.sinks:
+            sink.close()
+
+    def stats(self):
+        stats = {
+            "rows": dict(self.rows_written),
+            "write_seconds": dict(self.write_seconds),
+            "stage_seconds": dict(self.stage_seconds),
+            "stage_rows": dict(self.stage_rows),
+            "stage_peak_rss_mb": dict(self.stage_peak_rss_mb),
+        }
+        if self.queue is not None:
+            stats["queue_wait_seconds"] = dict(self.queue_wait_seconds)
+        return stats
+
+def peak_rss_mb():
+    # High-water mark of this process so far (ru_maxrss is KB on Linux, bytes on macOS)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def merge_stats(total, stats):
+    # Counts and times add up across shards; memory is the largest high-water mark of any process
+    for key, values in stats.items():
+        bucket = total.setdefault(key, {})
+        for name, value in values.items():
+            if key == "stage_peak_rss_mb":
+                bucket[name] = max(bucket.get(name) or 0, value or 0) if value is not None else bucket.get(name)
+            else:
+                bucket[name] = bucket.get(name, 0) + value
+    return total
+
+def write_stats_json(path, stats, run_info):
+    # Machine-readable version of the [PERF] report, read by hopify_db_benchmark.py
+    stage_rows = stats.get("stage_rows", {})
+    report = dict(run_info)
+    report["peak_rss_mb"] = max([peak_rss_mb() or 0] + [v or 0 for v in stats.get("stage_peak_rss_mb", {}).values()])
+    report["stages"] = {
+        stage: {
+            "seconds": round(seconds, 4),
+            "rows": stage_rows.get(stage, 0),
+            "rows_per_sec": round(stage_rows.get(stage, 0) / seconds, 1) if seconds > 0 else None,
+            "peak_rss_mb": stats.get("stage_peak_rss_mb", {}).get(stage),
+        }
+        for stage, seconds in stats.get("stage_seconds", {}).items()
+    }
+    report["tables"] = {
+        table: {"rows": rows, "write_seconds": round(stats["write_seconds"].get(table, 0.0), 4)}
+        for table, rows in sorted(stats.get("rows", {}).items())
+    }
+    for table, seconds in stats.get("queue_wait_seconds", {}).items():
+        report["tables"].setdefault(table, {"rows": 0, "write_seconds": 0.0})["queue_wait_seconds"] = round(seconds, 4)
+    with open(path, mode='w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"[INFO] Performance stats written to: {path}")
+
+def print_load_report(stats):
+    print("[PERF] Stage wall time:")
+    for stage, seconds in stats.get("stage_seconds", {}).items():
+        rss = stats.get("stage_peak_rss_mb", {}).get(stage)
+        print(f"[PERF]   {stage:<18} {seconds:9.2f}s {stats.get('stage_rows', {}).get(stage, 0):>10} rows"
+              + (f" {rss:9.1f} MB peak RSS" if rss is not None else ""))
+    print("[PERF] Table write throughput (executemany time only):")
+    for table, rows in sorted(stats.get("rows", {}).items()):
+        seconds = stats["write_seconds"].get(table, 0.0)
+        rate = rows / seconds if seconds > 0 else float("inf")
+        print(f"[PERF]   {table:<18} {rows:>10} rows {seconds:9.3f}s {rate:>14,.0f} rows/s")
+    if "queue_wait_seconds" in stats:
+        print("[PERF] Writer queue backpressure (generation blocked on a full queue):")
+        for table, seconds in sorted(stats["queue_wait_seconds"].items()):
+            print(f"[PERF]   {table:<18} {seconds:9.3f}s")
+
 # ------------------------------
-for i, (name, address, city, state, postal_code, country) in enumerate(OFFICE_LOCATIONS, 1):
-    cursor.execute("""
-        INSERT INTO locations VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (i, name, address, city, state, postal_code, country))
+# Columnar Parquet Export (typed columns, epoch timestamps, streamed a row group at a time)
+# ------------------------------
+SQL_TYPES = {
+    table: dict(re.findall(r"^\s+(\w+) (INTEGER|REAL|TEXT)\b", body, re.MULTILINE))
+    for table, body in re.findall(r"CREATE TABLE (\w+) \((.*?)\n\);", SCHEMA_SQL, re.DOTALL)
+}
 
-print("[INFO] Inserted office locations.")
+def arrow_schema(table):
+    arrow_types = {"INTEGER": pa.int64(), "REAL": pa.float64(), "TEXT": pa.string()}
+    return pa.schema([
+        (column, pa.timestamp("s") if column in TIMESTAMP_COLUMNS else arrow_types[SQL_TYPES[table][column]])
+        for column in TABLE_COLUMNS[table]
+    ])
+
+def rows_to_arrow(table, rows):
+    # Timestamp columns arrive as epoch seconds, which is already Arrow's timestamp("s") representation
+    schema = arrow_schema(table)
+    arrays = [pa.array(values, type=field.type) for field, values in zip(schema, zip(*rows))]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+class ParquetSink:
+    # One Parquet file per table and writer: <directory>/<table>/<part>.parquet. Rows are held only until a
+    # full row group is ready, so memory stays bounded by row_group_size per table
+    def __init__(self, directory, part, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        if pa is None:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+        self.directory = directory
+        self.part = part
+        self.row_group_size = row_group_size
+        self.pending = defaultdict(list)
+        self.writers = {}
+
+    def write(self, table, rows):
+        pending = self.pending[table]
+        pending.extend(rows)
+        while len(pending) >= self.row_group_size:
+            self.write_row_group(table, pending[:self.row_group_size])
+            del pending[:self.row_group_size]
+
+    def write_row_group(self, table, rows):
+        if table not in self.writers:
+            os.makedirs(os.path.join(self.directory, table), exist_ok=True)
+            path = os.path.join(self.directory, table, f"{self.part}.parquet")
+            self.writers[table] = pq.ParquetWriter(path, arrow_schema(table), compression="zstd")
+        self.writers[table].write_table(rows_to_arrow(table, rows), row_group_size=self.row_group_size)
+
+    def close(self):
+        for table, rows in self.pending.items():
+            if rows:
+                self.write_row_group(table, rows)
+                rows.clear()
+        for parquet_writer in self.writers.values():
+            parquet_writer.close()
+        self.writers.clear()
+
+def prepare_parquet_dir(directory):
+    # Drop part files from earlier runs (a different shard count would otherwise leave stale parts behind)
+    for table in TABLE_COLUMNS:
+        table_dir = os.path.join(directory, table)
+        if os.path.isdir(table_dir):
+            for name in os.listdir(table_dir):
+                if name.endswith(".parquet"):
+                    os.remove(os.path.join(table_dir, name))
+    os.makedirs(directory, exist_ok=True)
+
+def finish_parquet_dir(directory):
+    # Tables that received no rows still get an empty file with their schema
+    for table in TABLE_COLUMNS:
+        table_dir = os.path.join(directory, table)
+        if not (os.path.isdir(table_dir) and os.listdir(table_dir)):
+            os.makedirs(table_dir, exist_ok=True)
+            pq.write_table(arrow_schema(table).empty_table(), os.path.join(table_dir, "empty.parquet"))
 
 # ------------------------------
-# Customer Generation
+# Embedded DuckDB Output (typed schema, Arrow ingest a batch at a time)
+# ------------------------------
+def duckdb_schema_sql():
+    # Same tables and columns as SCHEMA_SQL, with analytical types: TIMESTAMP date-times, DECIMAL money, BIGINT
+    # integers. Keys are not declared: constraint indexes would slow the bulk load, and the generator
+    # already guarantees them
+    duck_types = {"INTEGER": "BIGINT", "REAL": "DOUBLE", "TEXT": "VARCHAR"}
+    statements = []
+    for table, columns in TABLE_COLUMNS.items():
+        definitions = [
+            f"{column} " + ("TIMESTAMP" if column in TIMESTAMP_COLUMNS else
+                            "DECIMAL(12, 2)" if column in MONEY_COLUMNS else duck_types[SQL_TYPES[table][column]])
+            for column in columns
+        ]
+        statements.append(f"CREATE TABLE {table} ({', '.join(definitions)});")
+    return "\n".join(statements)
+
+def duckdb_part_path(path, part):
+    return f"{path}.{part}"
+
+def prepare_duckdb(path):
+    # Fresh database file with the schema (a full build replaces what was there)
+    if duckdb is None:
+        raise ImportError("DuckDB output requires duckdb (pip install duckdb)")
+    for stale in (path, path + ".wal"):
+        if os.path.exists(stale):
+            os.remove(stale)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = duckdb.connect(path)
+    conn.execute(duckdb_schema_sql())
+    conn.close()
+
+class DuckDBSink:
+    # Loads rows into a DuckDB file through Arrow: rows are held until a full batch is ready, which is then
+    # ingested with one INSERT … SELECT (no per-row statements). part files (one per shard) get their own schema
+    # and are merged into the main file afterwards
+    def __init__(self, path, batch_rows=DEFAULT_ROW_GROUP_SIZE, create_schema=False):
+        if duckdb is None:
+            raise ImportError("DuckDB output requires duckdb (pip install duckdb)")
+        if pa is None:
+            raise ImportError("DuckDB output loads through Arrow and requires pyarrow (pip install pyarrow)")
+        if create_schema:
+            prepare_duckdb(path)
+        self.conn = duckdb.connect(path)
+        self.batch_rows = batch_rows
+        self.pending = defaultdict(list)
+
+    def write(self, table, rows):
+        pending = self.pending[table]
+        pending.extend(rows)
+        if len(pending) >= self.batch_rows:
+            self.load(table, pending)
+            pending.clear()
+
+    def load(self, table, rows):
+        batch = rows_to_arrow(table, rows)
+        self.conn.register("arrow_batch", batch)
+        self.conn.execute(f"INSERT INTO {table} SELECT * FROM arrow_batch")
+        self.conn.unregister("arrow_batch")
+
+    def close(self):
+        for table, rows in self.pending.items():
+            if rows:
+                self.load(table, rows)
+                rows.clear()
+        self.conn.close()
+
+def merge_duckdb_parts(path, part_paths):
+    # Shard part files hold disjoint ID blocks: a straight copy per table, then the part file is removed
+    started = time.perf_counter()
+    conn = duckdb.connect(path)
+    for part_path in part_paths:
+        conn.execute(f"ATTACH '{part_path}' AS part (READ_ONLY)")
+        for table in SHARDED_TABLES:
+            conn.execute(f"INSERT INTO main.{table} SELECT * FROM part.{table}")
+        conn.execute("DETACH part")
+        os.remove(part_path)
+    conn.close()
+    print(f"[INFO] Merged {len(part_paths)} DuckDB shard file(s) into {path}.")
+    return time.perf_counter() - started
+
+def open_sinks(outputs, part, shared):
+    # The storage backends a writer streams to besides SQLite. shared: write the DuckDB main file directly
+    # (the parent, or the only shard); otherwise a part file that is merged after the shards finish
+    if not outputs:
+        return []
+    sinks = []
+    if outputs["parquet_dir"]:
+        sinks.append(ParquetSink(outputs["parquet_dir"], part, outputs["row_group_size"]))
+    if outputs["duckdb_path"]:
+        path = outputs["duckdb_path"]
+        sinks.append(DuckDBSink(path if shared else duckdb_part_path(path, part), outputs["row_group_size"],
+                                create_schema=not shared))
+    return sinks
+
 # ------------------------------
-customer_id = 1
-customer_list = []
-batch_data = []
-batch_size = 1000
-
-for year_month, target in acquisition_plan.items():
-    month_start = datetime.strptime(year_month + "-01", "%Y-%m-%d")
-    month_end = month_start + relativedelta(months=1) - timedelta(days=1)
-
-    for _ in range(target):
-        signup_date = fake.date_time_between_dates(month_start, month_end)
-        segment = random.choices(CUSTOMER_SEGMENTS, weights=[0.6, 0.3, 0.1])[0]
-
-        # Segment-aware acquisition channel
-        if segment == "SMB":
-            source = random.choices(
-                ["Organic", "Social", "Paid Search", "Referral", "Direct"],
-                weights=[0.45, 0.25, 0.20, 0.05, 0.05]
-            )[0]
-        elif segment == "Mid-Market":
-            source = random.choices(
-                ["Paid Search", "Referral", "Organic", "Social", "Direct"],
-                weights=[0.30, 0.25, 0.20, 0.15, 0.10]
-            )[0]
-        else:  # Enterprise
-            source = random.choices(
-                ["Referral", "Paid Search", "Direct", "Organic", "Social"],
-                weights=[0.35, 0.30, 0.20, 0.10, 0.05]
-            )[0]
-
-        # Generate B2B-style name and domain
-        name = generate_customer_name(segment)
-        slug, domain = generate_store_metadata(name)
-
-        batch_data.append((
-            customer_id,
-            name,
-            fake.email(),
-            fake.address(),
-            fake.address(),
-            signup_date.strftime("%Y-%m-%d %H:%M:%S"),
-            segment,
-            source,
-            slug,
-            domain
+# Stage Checkpoints (completion marker, stage seed and ID counters per stage, for --resume)
+# ------------------------------
+def record_checkpoint(cursor, name, stage_seed=None, ids=None):
+    cursor.execute(
+        "INSERT OR REPLACE INTO generator_checkpoints (stage, stage_seed, ids) VALUES (?, ?, ?)",
+        (name, None if stage_seed is None else str(stage_seed), None if ids is None else json.dumps(ids))
+    )
+
+def load_checkpoints(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS generator_checkpoints (stage TEXT PRIMARY KEY, stage_seed TEXT, ids TEXT)")
+    return {
+        name: json.loads(ids) if ids else None
+        for name, ids in conn.execute("SELECT stage, ids FROM generator_checkpoints").fetchall()
+    }
+
+def run_stage(writer, completed, name, seed_keys, generate, ids=None):
+    # Every stage reseeds from its own derived seed (the whole RNG state it depends on), so a completed stage can
+    # be skipped without changing anything generated after it
+    if name in completed:
+        print(f"[INFO] Resume: stage {name} already completed, skipping.")
+        return None
+    stage_seed = seed_stage(*seed_keys) if seed_keys else None
+    result = generate()
+    writer.end_stage(name.rsplit("/", 1)[-1], checkpoint=(name, stage_seed, ids))
+    return result
+
+# ------------------------------
+# Products (Static and Dynamic)
+# ------------------------------
+def generate_products(writer, num_products=NUM_PRODUCTS_TOTAL):
+    # Keep the static/dynamic split of the default catalog when the product count is overridden
+    num_static = round(num_products * NUM_PRODUCTS_STATIC / NUM_PRODUCTS_TOTAL)
+    product_id = 1
+
+    # Static products
+    for i in range(num_static):
+        writer.add("products", (
+            product_id,
+            f"Static Product {i+1}",
+            random.choice(PRODUCT_CATEGORIES),
+            round(random.uniform(20, 500), 2),
+            random.choice(["One-Time", "Subscription"])
+        ))
+        product_id += 1
+
+    # Dynamic products
+    for i in range(num_products - num_static):
+        writer.add("products", (
+            product_id,
+            fake.catch_phrase(),
+            random.choice(PRODUCT_CATEGORIES),
+            round(random.uniform(20, 500), 2),
+            random.choice(["One-Time", "Subscription"])
         ))
+        product_id += 1
 
-        customer_list.append((customer_id, segment))
-        customer_id += 1
+    print("[INFO] Inserted products.")
 
-        if len(batch_data) >= batch_size:
-            cursor.executemany("INSERT INTO customers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch_data)
-            conn.commit()
-            batch_data = []
+# ------------------------------
+# Product Catalog Index (category -> products, built once for O(1) sampling)
+# ------------------------------
+product_index = defaultdict(list)
+all_products = []
+
+def build_product_index(catalog):
+    # catalog: (product_id, category, price) rows, as read back from the products table
+    product_index.clear()
+    all_products.clear()
+    for pid, category, price in catalog:
+        product_index[category].append((pid, price))
+        all_products.append((pid, price))
+
+def sample_product(category=None):
+    # Uniform pick within a category (or across the full catalog); None if the category has no products
+    candidates = all_products if category is None else product_index.get(category)
+    if not candidates:
+        return None
+    return candidates[random.randrange(len(candidates))]
 
-if batch_data:
-    cursor.executemany("INSERT INTO customers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch_data)
-    conn.commit()
+# ------------------------------
+# Office Locations
+# ------------------------------
+def generate_locations(writer):
+    for i, (name, address, city, state, postal_code, country) in enumerate(OFFICE_LOCATIONS, 1):
+        writer.add("locations", (i, name, address, city, state, postal_code, country))
 
-print(f"[INFO] Inserted {len(customer_list)} customers.")
+    print("[INFO] Inserted office locations.")
+
+# ------------------------------
+# Customer State Store (array-backed columns indexed by customer_id, replacing per-customer SELECT read-backs)
+# ------------------------------
+class CustomerStore:
+    # One block of consecutive customer IDs (a shard, or a whole database when loaded back). Base order dates sit
+    # in one flat array in customer order, addressed through per-customer counts (offsets built on first use)
+    def __init__(self, first_id):
+        self.first_id = first_id
+        self.segment = array("b")  # index into CUSTOMER_SEGMENTS
+        self.signup = array("q")  # epoch seconds
+        self.order_count = array("i")  # base orders per customer
+        self.order_epochs = array("q")
+        self.order_offsets = None
+        # Support ticket aggregates, kept up to date by the ticket stage (churn features)
+        self.ticket_count = array("i")
+        self.first_ticket = array("q")  # epoch seconds, 0 = no tickets
+        self.resolution_hours = array("q")  # summed over the customer's tickets
+        self.billing_tickets = array("i")
+
+    def __len__(self):
+        return len(self.segment)
+
+    def __iter__(self):
+        # (customer_id, segment) in ID order
+        for index, code in enumerate(self.segment):
+            yield self.first_id + index, CUSTOMER_SEGMENTS[code]
+
+    def pair(self, index):
+        return self.first_id + index, CUSTOMER_SEGMENTS[self.segment[index]]
+
+    def add_customer(self, segment, signup):
+        # Timestamps passed to the store are epoch seconds
+        self.segment.append(CUSTOMER_SEGMENTS.index(segment))
+        self.signup.append(signup)
+        self.order_count.append(0)
+        self.ticket_count.append(0)
+        self.first_ticket.append(0)
+        self.resolution_hours.append(0)
+        self.billing_tickets.append(0)
+
+    def segment_of(self, customer_id):
+        return CUSTOMER_SEGMENTS[self.segment[customer_id - self.first_id]]
+
+    def signup_date(self, customer_id):
+        return from_epoch(self.signup[customer_id - self.first_id])
+
+    def add_base_order(self, customer_id, epoch):
+        # Base orders must arrive grouped by customer in ID order (both order engines write them that way)
+        self.order_count[customer_id - self.first_id] += 1
+        self.order_epochs.append(epoch)
+        self.order_offsets = None
+
+    def add_base_order_batch(self, start, counts, epochs):
+        # Vectorized form of add_base_order for customers start .. start + len(counts) - 1 (numpy arrays)
+        stop = start + len(counts)
+        self.order_count[start:stop] = array("i", counts.tolist())
+        self.order_epochs.extend(epochs.tolist())
+        self.order_offsets = None
+
+    def note_ticket(self, customer_id, epoch, resolution_hours, category):
+        index = customer_id - self.first_id
+        if not self.ticket_count[index] or epoch < self.first_ticket[index]:
+            self.first_ticket[index] = epoch
+        self.ticket_count[index] += 1
+        self.resolution_hours[index] += resolution_hours
+        if category == "Billing":
+            self.billing_tickets[index] += 1
+
+    def churn_features(self):
+        # Feature columns for the churn model (numpy arrays when numpy is available, plain lists otherwise)
+        as_of = to_epoch(AS_OF)
+        if np is None:
+            return {
+                "segment": list(self.segment),
+                "tenure_days": [(as_of - signup) // 86400 for signup in self.signup],
+                "ticket_count": list(self.ticket_count),
+                "first_ticket_delay_days": [(first - signup) // 86400 if count else 999 for first, signup, count
+                                            in zip(self.first_ticket, self.signup, self.ticket_count)],
+                "avg_resolution_days": [hours / count / 24 if count else 0.0
+                                        for hours, count in zip(self.resolution_hours, self.ticket_count)],
+                "billing_tickets": list(self.billing_tickets),
+            }
+        signup = np.frombuffer(self.signup, dtype=np.int64)
+        count = np.frombuffer(self.ticket_count, dtype=np.int32).astype(np.int64)
+        has_tickets = count > 0
+        return {
+            "segment": np.frombuffer(self.segment, dtype=np.int8).astype(np.int64),
+            "tenure_days": (as_of - signup) // 86400,
+            "ticket_count": count,
+            "first_ticket_delay_days": np.where(
+                has_tickets, (np.frombuffer(self.first_ticket, dtype=np.int64) - signup) // 86400, 999),
+            "avg_resolution_days": np.where(
+                has_tickets, np.frombuffer(self.resolution_hours, dtype=np.int64) / np.maximum(count, 1) / 24, 0.0),
+            "billing_tickets": np.frombuffer(self.billing_tickets, dtype=np.int32).astype(np.int64),
+        }
+
+    def base_order_dates(self, customer_id):
+        if self.order_offsets is None:
+            offsets = array("q", [0])
+            for count in self.order_count:
+                offsets.append(offsets[-1] + count)
+            self.order_offsets = offsets
+        index = customer_id - self.first_id
+        return [from_epoch(epoch) for epoch in self.order_epochs[self.order_offsets[index]:self.order_offsets[index + 1]]]
+
+    @classmethod
+    def load(cls, cursor, first_id, stop_id, base_orders=None, tickets=False):
+        # Rebuild from the database (resumed shards, append runs); base_orders = (first, stop) order_id range
+        store = cls(first_id)
+        rows = cursor.execute(
+            "SELECT customer_segment, signup_date FROM customers WHERE customer_id >= ? AND customer_id < ? "
+            "ORDER BY customer_id", (first_id, stop_id)
+        ).fetchall()
+        for segment, signup_date in rows:
+            store.add_customer(segment, read_epoch(signup_date))
+        if base_orders:
+            rows = cursor.execute(
+                "SELECT customer_id, order_date FROM orders WHERE order_id >= ? AND order_id < ? "
+                "ORDER BY customer_id, order_id", base_orders
+            ).fetchall()
+            for customer_id, order_date in rows:
+                store.add_base_order(customer_id, read_epoch(order_date))
+        if tickets:
+            rows = cursor.execute(
+                "SELECT customer_id, created_at, resolved_at, ticket_category FROM support_tickets "
+                "WHERE customer_id >= ? AND customer_id < ? ORDER BY ticket_id", (first_id, stop_id)
+            ).fetchall()
+            for customer_id, created_at, resolved_at, category in rows:
+                created = read_epoch(created_at)
+                store.note_ticket(customer_id, created, (read_epoch(resolved_at) - created) // 3600, category)
+        return store
+
+# ------------------------------
+# Customer Generation
+# ------------------------------
+def generate_customers(writer, plan_slice, ids):
+    customer_id = ids["customers"]
+    customers = CustomerStore(customer_id)
+
+    for year_month, target in plan_slice:
+        month_start = datetime.strptime(year_month + "-01", "%Y-%m-%d")
+        month_end = month_start + relativedelta(months=1) - timedelta(days=1)
+
+        for _ in range(target):
+            signup = to_epoch(fake.date_time_between_dates(month_start, month_end))
+            segment = segment_sampler.draw()
+
+            # Segment-aware acquisition channel
+            source = source_samplers[segment].draw()
+
+            # Generate B2B-style name and domain
+            name = generate_customer_name(segment)
+            slug, domain = generate_store_metadata(name)
+
+            writer.add("customers", (
+                customer_id,
+                name,
+                fake_value("email"),
+                fake_value("address"),
+                fake_value("address"),
+                signup,
+                segment,
+                source,
+                slug,
+                domain
+            ))
+
+            customers.add_customer(segment, signup)
+            customer_id += 1
+
+    ids["customers"] = customer_id
+    print(f"[INFO] Inserted {len(customers)} customers.")
+    return customers
 
 # ------------------------------
 # Orders, Order Items, Payments
 # ------------------------------
-order_id = 1
-item_id = 1
-payment_id = 1
 
-for customer_id, segment in customer_list:
-    num_orders = random.randint(1, 3) if segment == 'SMB' else random.randint(2, 4) if segment == 'Mid-Market' else random.randint(3, 6)
+# Segment-based order volume (shared by both order engines; category preferences are SEGMENT_CATEGORY_WEIGHTS)
+segment_order_ranges = {
+    "SMB": (1, 3),
+    "Mid-Market": (2, 4),
+    "Enterprise": (3, 6)
+}
 
-    for _ in range(num_orders):
-        order_date = fake.date_time_between(start_date='-2y', end_date=datetime.today())
-        total = 0.0
+def build_numpy_catalog():
+    # Flattened catalog: products grouped by category code, addressed by per-category offset and count
+    catalog_categories = sorted(set(product_index) | {c for weights in SEGMENT_CATEGORY_WEIGHTS.values() for c in weights})
+    category_code = {c: i for i, c in enumerate(catalog_categories)}
+    counts = np.array([len(product_index.get(c, [])) for c in catalog_categories], dtype=np.int64)
+    catalog = {
+        "pids": np.array([pid for c in catalog_categories for pid, _ in product_index.get(c, [])], dtype=np.int64),
+        "prices": np.array([price for c in catalog_categories for _, price in product_index.get(c, [])], dtype=np.float64),
+        "counts": counts,
+        "offsets": np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64),
+        "segment_tables": []
+    }
+    for segment in CUSTOMER_SEGMENTS:
+        sampler = category_samplers[segment]
+        catalog["segment_tables"].append((np.array([category_code[c] for c in sampler.values]), sampler))
+    return catalog
+
+def draw_order_batch_numpy(rng, catalog, cust_ids, seg_codes, now_ts, first_order_id, first_item_id, first_payment_id):
+    # Whole-array draws for one batch of customers; returns column arrays per table, totals already computed
+    seg_lo = np.array([segment_order_ranges[s][0] for s in CUSTOMER_SEGMENTS])
+    seg_hi = np.array([segment_order_ranges[s][1] for s in CUSTOMER_SEGMENTS])
+
+    # Orders
+    num_orders = rng.integers(seg_lo[seg_codes], seg_hi[seg_codes], endpoint=True)
+    o_cust = np.repeat(cust_ids, num_orders)
+    o_seg = np.repeat(seg_codes, num_orders)
+    n_orders = len(o_cust)
+    o_ts = rng.integers(now_ts - int(ORDER_WINDOW.total_seconds()), now_ts, size=n_orders, endpoint=True)
+
+    # Order items: category by segment preference, then a uniform product within the category
+    i_order = np.repeat(np.arange(n_orders), rng.integers(1, MAX_ITEMS_PER_ORDER, size=n_orders, endpoint=True))
+    i_seg = o_seg[i_order]
+    i_cat = np.empty(len(i_order), dtype=np.int64)
+    for s, (codes, sampler) in enumerate(catalog["segment_tables"]):
+        mask = i_seg == s
+        i_cat[mask] = codes[sampler.draw_codes(rng, int(mask.sum()))]
+
+    counts = catalog["counts"]
+    keep = counts[i_cat] > 0  # categories without products produce no line item
+    i_order, i_cat = i_order[keep], i_cat[keep]
+    pick = catalog["offsets"][i_cat] + (rng.random(len(i_cat)) * counts[i_cat]).astype(np.int64)
+    i_qty = rng.integers(1, 3, size=len(pick), endpoint=True)
+    i_subtotal = np.round(catalog["prices"][pick] * i_qty, 2)
+    o_total = np.round(np.bincount(i_order, weights=i_subtotal, minlength=n_orders), 2)
+
+    # Payments: one per order, dated between the order and today
+    p_ts = o_ts + (rng.random(n_orders) * (now_ts - o_ts)).astype(np.int64)
+    p_method = np.array(PAYMENT_METHODS)[rng.integers(0, len(PAYMENT_METHODS), size=n_orders)]
+    p_success = (rng.random(n_orders) > 0.03).astype(np.int64)
+
+    o_ids = first_order_id + np.arange(n_orders)
+    return {
+        "order_counts": num_orders,
+        "order_ts": o_ts,
+        "orders": [o_ids, o_cust, o_ts, o_total],
+        "order_items": [first_item_id + np.arange(len(pick)), o_ids[i_order], catalog["pids"][pick], i_qty, i_subtotal],
+        "payments": [first_payment_id + np.arange(n_orders), o_cust, o_total, p_ts, p_method, p_success],
+    }
+
+def generate_orders_numpy(writer, customers, ids, discounts=None, chunk_size=100000):
+    if np is None:
+        raise ImportError("The 'numpy' order engine requires numpy (pip install numpy)")
+
+    rng = np.random.default_rng(random.getrandbits(64))
+    catalog = build_numpy_catalog()
+    now_ts = to_epoch(AS_OF)
+    segments = np.frombuffer(customers.segment, dtype=np.int8)
+
+    for start in range(0, len(customers), chunk_size):
+        stop = min(start + chunk_size, len(customers))
+        cust_ids = np.arange(customers.first_id + start, customers.first_id + stop, dtype=np.int64)
+        seg_codes = segments[start:stop].astype(np.int64)
+        batch = draw_order_batch_numpy(rng, catalog, cust_ids, seg_codes, now_ts,
+                                       ids["orders"], ids["order_items"], ids["payments"])
+        customers.add_base_order_batch(start, batch["order_counts"], batch["order_ts"])
+        if discounts:
+            discounts.offer_batch(batch["orders"][0], batch["order_ts"])
+
+        for table in ("orders", "order_items", "payments"):
+            writer.add_many(table, zip(*(col.tolist() for col in batch[table])))
+
+        ids["orders"] += len(batch["orders"][0])
+        ids["order_items"] += len(batch["order_items"][0])
+        ids["payments"] += len(batch["payments"][0])
+
+def add_order(writer, ids, customer_id, segment, order_date):
+    order_id = ids["orders"]
+    total = 0.0
+
+    # Segment-based category preferences
+    categories = category_samplers[segment]
+
+    for _ in range(random.randint(1, MAX_ITEMS_PER_ORDER)):
+        category = categories.draw()
+        result = sample_product(category)
+        if result:
+            pid, price = result
+            qty = random.randint(1, 3)
+            subtotal = round(price * qty, 2)
+            total += subtotal
+            writer.add("order_items", (ids["order_items"], order_id, pid, qty, subtotal))
+            ids["order_items"] += 1
+
+    # Order row is written once its total is known
+    writer.add("orders", (
+        order_id, customer_id, to_epoch(order_date), round(total, 2)
+    ))
 
-        cursor.execute("INSERT INTO orders VALUES (?, ?, ?, ?)", (
-            order_id, customer_id, order_date.strftime("%Y-%m-%d %H:%M:%S"), 0.0
-        ))
+    # Payment
+    pay_date = fake.date_time_between(start_date=order_date, end_date=AS_OF)
+    method = random.choice(PAYMENT_METHODS)
+    success = 1 if random.random() > 0.03 else 0
+    writer.add("payments", (
+        ids["payments"], customer_id, round(total, 2), to_epoch(pay_date), method, success
+    ))
 
-        # Segment-based category preferences
-        if segment == 'Enterprise':
-            categories = ['POS Hardware & Software', 'Payments & Finance', 'Financial Services', 'Apps & Integrations']
-            weights = [0.4, 0.3, 0.2, 0.1]
-        elif segment == 'Mid-Market':
-            categories = ['Apps & Integrations', 'Storefront Tools', 'Marketing & Growth']
-            weights = [0.4, 0.4, 0.2]
-        else:
-            categories = ['Storefront Tools', 'Marketing & Growth', 'Logistics & Shipping']
-            weights = [0.5, 0.3, 0.2]
-
-        for _ in range(random.randint(1, 5)):
-            category = random.choices(categories, weights=weights)[0]
-            cursor.execute("SELECT product_id, price FROM products WHERE category = ? ORDER BY RANDOM() LIMIT 1", (category,))
-            result = cursor.fetchone()
-            if result:
-                pid, price = result
-                qty = random.randint(1, 3)
-                subtotal = round(price * qty, 2)
-                total += subtotal
-                cursor.execute("INSERT INTO order_items VALUES (?, ?, ?, ?, ?)", (item_id, order_id, pid, qty, subtotal))
-                item_id += 1
-
-        # Update total
-        cursor.execute("UPDATE orders SET total_amount = ? WHERE order_id = ?", (round(total, 2), order_id))
-
-        # Payment
-        pay_date = fake.date_time_between(start_date=order_date, end_date=datetime.today())
-        method = random.choice(PAYMENT_METHODS)
-        success = 1 if random.random() > 0.03 else 0
-        cursor.execute("INSERT INTO payments VALUES (?, ?, ?, ?, ?, ?)", (
-            payment_id, customer_id, round(total, 2), pay_date.strftime("%Y-%m-%d %H:%M:%S"), method, success
-        ))
+    ids["orders"] += 1
+    ids["payments"] += 1
+
+def generate_orders(writer, customers, ids, engine=ORDER_ENGINE, discounts=None):
+    # discounts: optional OrderDiscountSampler, fed every base order as it is generated
+    if engine == "numpy":
+        generate_orders_numpy(writer, customers, ids, discounts)
+    else:
+        for customer_id, segment in customers:
+            num_orders = random.randint(*segment_order_ranges[segment])
 
-        order_id += 1
-        payment_id += 1
+            for _ in range(num_orders):
+                order_date = fake.date_time_between(start_date=AS_OF - ORDER_WINDOW, end_date=AS_OF)
+                order_id = ids["orders"]
+                add_order(writer, ids, customer_id, segment, order_date)
+                customers.add_base_order(customer_id, to_epoch(order_date))
+                if discounts:
+                    discounts.offer(order_id, to_epoch(order_date))
 
-print("[INFO] Inserted base orders, items, and payments.")
+    print("[INFO] Inserted base orders, items, and payments.")
+    if discounts:
+        discounts.write(writer)
 
 # ------------------------------
 # Expansion Revenue Events
@@ -440,176 +1542,165 @@ segment_expansion_params = {
     "Enterprise": {"rate": 0.15, "factor_range": (0.1, 0.2)}
 }
 
-exp_order_id = 900000
-exp_payment_id = 900000
-expansion_count = 0
-
-for customer_id, segment in customer_list:
-    params = segment_expansion_params[segment]
-    if random.random() < params["rate"]:
-        # Select a random base order date
-        cursor.execute("SELECT order_date FROM orders WHERE customer_id = ? ORDER BY RANDOM() LIMIT 1", (customer_id,))
-        result = cursor.fetchone()
-        if not result:
-            continue
-        base_date = datetime.strptime(result[0], "%Y-%m-%d %H:%M:%S")
-
-        # Generate 1–4 monthly expansions
-        months = random.randint(1, 4)
-        for i in range(months):
-            expansion_date = base_date + relativedelta(months=i+1)
-            factor = random.uniform(*params["factor_range"])
-            revenue = round(random.uniform(100, 1000) * factor, 2)
-
-            cursor.execute("INSERT INTO orders VALUES (?, ?, ?, ?)", (
-                exp_order_id, customer_id, expansion_date.strftime("%Y-%m-%d %H:%M:%S"), revenue
-            ))
-            cursor.execute("INSERT INTO payments VALUES (?, ?, ?, ?, ?, ?)", (
-                exp_payment_id, customer_id, revenue, expansion_date.strftime("%Y-%m-%d %H:%M:%S"), "Card", 1
-            ))
-
-            exp_order_id += 1
-            exp_payment_id += 1
-            expansion_count += 1
-
-print(f"[INFO] Simulated {expansion_count} expansion revenue events.")
+def generate_expansion(writer, customers, ids):
+    # Expansion orders continue the order/payment ID sequence of the current block
+    exp_order_id = ids["orders"]
+    exp_payment_id = ids["payments"]
+    expansion_count = 0
+
+    for customer_id, segment in customers:
+        params = segment_expansion_params[segment]
+        if random.random() < params["rate"]:
+            # Select a random base order date
+            result = customers.base_order_dates(customer_id)
+            if not result:
+                continue
+            base_date = random.choice(result)
+
+            # Generate 1–4 monthly expansions
+            months = random.randint(1, MAX_EXPANSION_MONTHS)
+            for i in range(months):
+                expansion_at = to_epoch(base_date + relativedelta(months=i+1))
+                factor = random.uniform(*params["factor_range"])
+                revenue = round(random.uniform(100, 1000) * factor, 2)
+
+                writer.add("orders", (
+                    exp_order_id, customer_id, expansion_at, revenue
+                ))
+                writer.add("payments", (
+                    exp_payment_id, customer_id, revenue, expansion_at, "Card", 1
+                ))
+
+                exp_order_id += 1
+                exp_payment_id += 1
+                expansion_count += 1
+
+    ids["orders"] = exp_order_id
+    ids["payments"] = exp_payment_id
+    print(f"[INFO] Simulated {expansion_count} expansion revenue events.")
 
 # ------------------------------
 # Subscriptions with Signups and Upgrades
 # ------------------------------
+def generate_subscriptions(writer, customers, ids):
+    sub_id = ids["subscriptions"]
+    subscription_data = []
 
-cursor.execute("SELECT MAX(subscription_id) FROM subscriptions")
-existing_sub_id = cursor.fetchone()[0]
-sub_id = existing_sub_id + 1 if existing_sub_id is not None else 1
-
-subscription_data = []
+    for customer_id, segment in customers:
+        signup_date = customers.signup_date(customer_id)
 
-for customer_id, segment in customer_list:
-    cursor.execute("SELECT signup_date FROM customers WHERE customer_id = ?", (customer_id,))
-    signup_date_str = cursor.fetchone()[0]
-    signup_date = datetime.strptime(signup_date_str, "%Y-%m-%d %H:%M:%S")
-    
-    start_date = fake.date_time_between(start_date=signup_date, end_date=signup_date + relativedelta(months=3))
-    duration_months = random.randint(6, 24)
-    end_date = start_date + relativedelta(months=duration_months)
-
-    if segment == 'Enterprise':
-        plan_type = random.choice(['Pro', 'Enterprise'])
-        price = round(random.uniform(300, 800), 2)
-    elif segment == 'Mid-Market':
-        plan_type = random.choice(['Standard', 'Pro'])
-        price = round(random.uniform(100, 300), 2)
-    else:
-        plan_type = random.choice(['Starter', 'Standard'])
-        price = round(random.uniform(30, 100), 2)
-
-    # Insert initial signup subscription
-    subscription_data.append((
-        sub_id, customer_id, plan_type, price,
-        start_date.strftime("%Y-%m-%d %H:%M:%S"),
-        end_date.strftime("%Y-%m-%d %H:%M:%S"),
-        'active', 'signup'
-    ))
-    sub_id += 1
-
-    # Simulate upgrades
-    upgrade_chance = {"SMB": 0.1, "Mid-Market": 0.2, "Enterprise": 0.3}
-    if random.random() < upgrade_chance[segment]:
-        upgrade_date = start_date + timedelta(days=random.randint(90, 365))
-        if upgrade_date < datetime.today():
-            upgrade_price = round(price * random.uniform(1.2, 1.6), 2)
-            subscription_data.append((
-                sub_id, customer_id, plan_type, upgrade_price,
-                upgrade_date.strftime("%Y-%m-%d %H:%M:%S"),
-                None, 'active', 'upgrade'
-            ))
-            sub_id += 1
-
-cursor.executemany("INSERT INTO subscriptions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", subscription_data)
-conn.commit()
-
-print(f"[INFO] Inserted {len(subscription_data)} subscriptions including signups and upgrades.")
+        start_date = fake.date_time_between(start_date=signup_date, end_date=signup_date + relativedelta(months=3))
+        duration_months = random.randint(6, 24)
+        end_date = start_date + relativedelta(months=duration_months)
 
+        if segment == 'Enterprise':
+            plan_type = random.choice(['Pro', 'Enterprise'])
+            price = round(random.uniform(300, 800), 2)
+        elif segment == 'Mid-Market':
+            plan_type = random.choice(['Standard', 'Pro'])
+            price = round(random.uniform(100, 300), 2)
+        else:
+            plan_type = random.choice(['Starter', 'Standard'])
+            price = round(random.uniform(30, 100), 2)
+
+        # Insert initial signup subscription
+        subscription_data.append((
+            sub_id, customer_id, plan_type, price,
+            to_epoch(start_date),
+            to_epoch(end_date),
+            'active', 'signup'
+        ))
+        sub_id += 1
+
+        # Simulate upgrades
+        upgrade_chance = {"SMB": 0.1, "Mid-Market": 0.2, "Enterprise": 0.3}
+        if random.random() < upgrade_chance[segment]:
+            upgrade_date = start_date + timedelta(days=random.randint(90, 365))
+            if upgrade_date < AS_OF:
+                upgrade_price = round(price * random.uniform(1.2, 1.6), 2)
+                subscription_data.append((
+                    sub_id, customer_id, plan_type, upgrade_price,
+                    to_epoch(upgrade_date),
+                    None, 'active', 'upgrade'
+                ))
+                sub_id += 1
+
+    writer.add_many("subscriptions", subscription_data)
+
+    ids["subscriptions"] = sub_id
+    print(f"[INFO] Inserted {len(subscription_data)} subscriptions including signups and upgrades.")
 
 # ------------------------------
 # Support Tickets (Segment-Aware with defensive handling)
 # ------------------------------
-ticket_id = 1
-sample_size = min(20000, len(customer_list))
-sampled_customers = random.sample(customer_list, sample_size)
-
-for customer_id, segment in sampled_customers:
+def draw_ticket_profile(segment):
+    # Tickets per year and resolution time range (hours) for one ticketing customer
+    num_tickets = ticket_count_samplers[segment].draw()
     if segment == 'Enterprise':
-        num_tickets = random.choices([5, 6, 7, 8, 9, 10], weights=[20, 30, 25, 15, 7, 3])[0]
         resolution_range = (6, 36)
     elif segment == 'Mid-Market':
-        num_tickets = random.choices([2, 3, 4, 5, 6], weights=[30, 30, 20, 15, 5])[0]
         resolution_range = (12, 72)
     else:
-        num_tickets = random.choices([0, 1, 2, 3], weights=[50, 30, 15, 5])[0]
         resolution_range = (24, 120)
+    return num_tickets, resolution_range
+
+def add_ticket(writer, ids, customer_id, created, resolution_range, customers=None):
+    resolution_hours = random.randint(*resolution_range)
+    resolved = created + timedelta(hours=resolution_hours)
+
+    if resolved <= created:
+        resolved = created + timedelta(hours=1)
+
+    category = random.choice(TICKET_CATEGORIES)
+    created_at, resolved_at = to_epoch(created), to_epoch(resolved)
+    if customers is not None:
+        customers.note_ticket(customer_id, created_at, (resolved_at - created_at) // 3600, category)
+
+    writer.add("support_tickets", (
+        ids["support_tickets"],
+        customer_id,
+        category,
+        created_at,
+        resolved_at
+    ))
 
-    for _ in range(num_tickets):
-        created = fake.date_time_between(start_date='-1y', end_date='-7d')
-        resolution_hours = random.randint(*resolution_range)
-        resolved = created + timedelta(hours=resolution_hours)
-
-        if resolved <= created:
-            resolved = created + timedelta(hours=1)
+    ids["support_tickets"] += 1
 
-        category = random.choice(TICKET_CATEGORIES)
+def generate_support_tickets(writer, customers, sample_size, ids):
+    # Sampling positions draws exactly what sampling the (customer_id, segment) pairs themselves would
+    sampled_customers = random.sample(range(len(customers)), min(sample_size, len(customers)))
 
-        cursor.execute("""
-            INSERT INTO support_tickets VALUES (?, ?, ?, ?, ?)
-        """, (
-            ticket_id,
-            customer_id,
-            category,
-            created.strftime("%Y-%m-%d %H:%M:%S"),
-            resolved.strftime("%Y-%m-%d %H:%M:%S")
-        ))
+    for customer_id, segment in map(customers.pair, sampled_customers):
+        num_tickets, resolution_range = draw_ticket_profile(segment)
 
-        ticket_id += 1
+        for _ in range(num_tickets):
+            created = fake.date_time_between(start_date=AS_OF - ONE_YEAR, end_date=AS_OF - timedelta(days=7))
+            add_ticket(writer, ids, customer_id, created, resolution_range, customers)
 
-print("[INFO] Inserted support tickets.")
+    print("[INFO] Inserted support tickets.")
 
 # ------------------------------
 # Churn Events (Segment-aware with support friction and decay adjustments)
 # ------------------------------
-churn_id = 1
-cursor.execute("""
-    SELECT 
-        c.customer_id,
-        c.customer_segment,
-        c.signup_date,
-        COUNT(st.ticket_id) AS total_tickets,
-        MIN(st.created_at) AS first_ticket_date,
-        AVG(JULIANDAY(st.resolved_at) - JULIANDAY(st.created_at)) AS avg_resolution_days,
-        SUM(CASE WHEN st.ticket_category = 'Billing' THEN 1 ELSE 0 END) AS billing_tickets
-    FROM customers c
-    LEFT JOIN support_tickets st
-    ON c.customer_id = st.customer_id
-    GROUP BY c.customer_id
-""")
-
-churn_candidates = 0
-churn_inserted = 0
-
-for row in cursor.fetchall():
-    customer_id, segment, signup_date_str, total_tickets, first_ticket_date, avg_resolution_days, billing_tickets = row
-    signup_date = datetime.strptime(signup_date_str, "%Y-%m-%d %H:%M:%S")
-    days_since_signup = (datetime.today() - signup_date).days
-
+# Churn models score every customer at once: model(features) -> churn probability per customer, where features
+# holds equal-length columns named in CHURN_FEATURE_NAMES (numpy arrays, or lists when numpy is not installed)
+CHURN_FEATURE_NAMES = ["segment", "tenure_days", "ticket_count", "first_ticket_delay_days", "avg_resolution_days",
+                       "billing_tickets"]
+
+def score_churn_rules(segment, tenure_days, ticket_count, first_ticket_delay_days, avg_resolution_days,
+                      billing_tickets):
+    # Scalar form of rules_churn_model (used when numpy is not installed); segment is a CUSTOMER_SEGMENTS index
+    segment = CUSTOMER_SEGMENTS[segment]
     churn_prob = 0.02 if segment == 'Enterprise' else 0.05 if segment == 'Mid-Market' else 0.12
 
-    if days_since_signup < 90:
+    if tenure_days < 90:
         churn_prob *= 0.2
-    elif days_since_signup < 180:
+    elif tenure_days < 180:
         churn_prob *= 0.5
 
-    if total_tickets >= 5:
+    if ticket_count >= 5:
         churn_prob += 0.15 if segment == 'SMB' else 0.1
-    elif 1 <= total_tickets <= 4:
+    elif 1 <= ticket_count <= 4:
         churn_prob -= 0.05
 
     if avg_resolution_days and avg_resolution_days > 3:
@@ -618,275 +1709,1887 @@ for row in cursor.fetchall():
     if billing_tickets and billing_tickets >= 2:
         churn_prob += 0.15 if segment == 'Enterprise' else 0.1
 
-    if not first_ticket_date:
-        first_ticket_delay_days = 999
-    else:
-        first_ticket_date_obj = datetime.strptime(first_ticket_date, "%Y-%m-%d %H:%M:%S")
-        first_ticket_delay_days = (first_ticket_date_obj - signup_date).days
-
     if first_ticket_delay_days > 90:
         churn_prob += 0.1 if segment == 'SMB' else 0.05
 
-    churn_prob = min(churn_prob, 0.9)
+    return min(churn_prob, 0.9)
+
+def rules_churn_model(features):
+    # Segment base rate, tenure decay, ticket friction, slow resolution, billing tickets and first-ticket delay.
+    # Steps are applied in the same order as score_churn_rules (adding 0.0 / multiplying by 1.0 is exact), so both
+    # forms give identical probabilities
+    if np is None:
+        return [score_churn_rules(*row) for row in zip(*(features[name] for name in CHURN_FEATURE_NAMES))]
+
+    segment = features["segment"]
+    smb = segment == CUSTOMER_SEGMENTS.index("SMB")
+    enterprise = segment == CUSTOMER_SEGMENTS.index("Enterprise")
+    tenure = features["tenure_days"]
+    tickets = features["ticket_count"]
+
+    churn_prob = np.where(enterprise, 0.02, np.where(smb, 0.12, 0.05))
+    churn_prob = churn_prob * np.where(tenure < 90, 0.2, np.where(tenure < 180, 0.5, 1.0))
+    churn_prob = churn_prob + np.where(tickets >= 5, np.where(smb, 0.15, 0.1), np.where(tickets >= 1, -0.05, 0.0))
+    churn_prob = churn_prob + np.where(features["avg_resolution_days"] > 3, np.where(enterprise, 0.05, 0.1), 0.0)
+    churn_prob = churn_prob + np.where(features["billing_tickets"] >= 2, np.where(enterprise, 0.15, 0.1), 0.0)
+    churn_prob = churn_prob + np.where(features["first_ticket_delay_days"] > 90, np.where(smb, 0.1, 0.05), 0.0)
+    return np.minimum(churn_prob, 0.9)
+
+CHURN_MODELS = {
+    "rules": rules_churn_model,
+}
 
-    if random.random() < churn_prob:
-        min_lifetime_days = 30 if segment == 'SMB' else 60 if segment == 'Mid-Market' else 120
-        if datetime.today() >= signup_date + timedelta(days=min_lifetime_days):
-            churn_candidates += 1
-            churn_date = fake.date_time_between(
-                start_date=signup_date + timedelta(days=min_lifetime_days),
-                end_date=datetime.today()
-            ).strftime("%Y-%m-%d %H:%M:%S")
+def resolve_churn_model(name):
+    # Built-in model name, or "package.module:function" for a model defined elsewhere
+    if name in CHURN_MODELS:
+        return CHURN_MODELS[name]
+    module_name, _, function_name = name.partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown churn model {name!r}; use one of {sorted(CHURN_MODELS)} or 'module:function'")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def min_lifetime(segment):
+    return timedelta(days=30 if segment == 'SMB' else 60 if segment == 'Mid-Market' else 120)
+
+def add_churn_event(writer, ids, customer_id, earliest_churn):
+    churn_date = to_epoch(fake.date_time_between(
+        start_date=earliest_churn,
+        end_date=AS_OF
+    ))
 
-            cursor.execute("INSERT INTO churn_events VALUES (?, ?, ?, ?)", (
-                churn_id, customer_id, churn_date, random.choice(["Too expensive", "Switched provider", "Lack of features", "Poor support", "Other"])
-            ))
-            churn_inserted += 1
-            churn_id += 1
-
-        if random.random() < 0.1:  # 10% chance to reactivate
-            reactivation_date = datetime.strptime(churn_date, "%Y-%m-%d %H:%M:%S") + timedelta(days=random.randint(30, 120))
-            cursor.execute("""
-                INSERT INTO subscriptions (subscription_id, customer_id, plan_type, subscription_price, start_date, end_date, status, change_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                sub_id, customer_id, "Hopify Standard", 299,
-                reactivation_date.strftime("%Y-%m-%d %H:%M:%S"), None, "Active", "Reactivation"
-            ))
-            sub_id += 1
+    writer.add("churn_events", (
+        ids["churn_events"], customer_id, churn_date, random.choice(CHURN_REASONS)
+    ))
+    ids["churn_events"] += 1
+
+    # Only customers that actually churned can reactivate
+    if random.random() < 0.1:  # 10% chance to reactivate
+        reactivation_date = churn_date + random.randint(30, 120) * 86400
+        writer.add("subscriptions", (
+            ids["subscriptions"], customer_id, "Hopify Standard", 299,
+            reactivation_date, None, "Active", "Reactivation"
+        ))
+        ids["subscriptions"] += 1
 
-print(f"[INFO] Churn eligible: {churn_candidates}, Churn inserted: {churn_inserted}")
+def generate_churn(writer, customers, ids, model=CHURN_MODEL):
+    # Features come from the customer store (aggregated while tickets were generated); the model scores every
+    # customer in one call, and the per-customer draws below keep their original order
+    churn_probs = resolve_churn_model(model)(customers.churn_features())
 
+    churn_candidates = 0
+    churn_inserted = 0
+
+    for (customer_id, segment), churn_prob in zip(customers, churn_probs):
+        if random.random() < churn_prob:
+            signup_date = customers.signup_date(customer_id)
+            if AS_OF >= signup_date + min_lifetime(segment):
+                churn_candidates += 1
+                add_churn_event(writer, ids, customer_id, signup_date + min_lifetime(segment))
+                churn_inserted += 1
+
+    print(f"[INFO] Churn eligible: {churn_candidates}, Churn inserted: {churn_inserted}")
 
 # ------------------------------
 # Simulated Reactivations after Churn (Segment-aware)
 # ------------------------------
-
-# Continue sub_id from previous context
-cursor.execute("SELECT MAX(subscription_id) FROM subscriptions")
-existing_sub_id = cursor.fetchone()[0]
-sub_id = existing_sub_id + 1 if existing_sub_id is not None else 1
-
-cursor.execute("SELECT customer_id, churn_date FROM churn_events")
-churned_customers = cursor.fetchall()
-
-reactivation_count = 0
-
-for customer_id, churn_date_str in churned_customers:
-    churn_date = datetime.strptime(churn_date_str, "%Y-%m-%d %H:%M:%S")
-
-    # 10–20% chance of reactivation depending on segment
-    cursor.execute("SELECT customer_segment FROM customers WHERE customer_id = ?", (customer_id,))
-    segment = cursor.fetchone()[0]
-    reactivation_chance = {"SMB": 0.05, "Mid-Market": 0.1, "Enterprise": 0.2}
-
-    if random.random() < reactivation_chance[segment]:
-        reactivation_date = churn_date + timedelta(days=random.randint(30, 180))
-        if reactivation_date < datetime.today():
-            # Assign a reactivation plan — slightly higher pricing than original
-            if segment == 'Enterprise':
-                plan_type = random.choice(['Pro', 'Enterprise'])
-                price = round(random.uniform(350, 900), 2)
-            elif segment == 'Mid-Market':
-                plan_type = random.choice(['Standard', 'Pro'])
-                price = round(random.uniform(120, 350), 2)
-            else:
-                plan_type = random.choice(['Starter', 'Standard'])
-                price = round(random.uniform(40, 120), 2)
-
-            cursor.execute("""
-                INSERT INTO subscriptions (
-                    subscription_id, customer_id, plan_type,
-                    subscription_price, start_date, end_date,
-                    status, change_type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                sub_id, customer_id, plan_type, price,
-                reactivation_date.strftime("%Y-%m-%d %H:%M:%S"),
-                None, 'active', 'reactivation'
-            ))
-            sub_id += 1
-            reactivation_count += 1
-
-print(f"[INFO] Reactivated {reactivation_count} churned customers.")
-
+def generate_reactivations(writer, customers, ids, first_churn_id=1, churned_customers=None):
+    # churned_customers: (customer_id, churn_date) pairs; read back from churn_events when not given
+    # Continue sub_id from previous context
+    sub_id = ids["subscriptions"]
+
+    if churned_customers is None:
+        cursor = writer.cursor
+        cursor.execute("SELECT customer_id, churn_date FROM churn_events WHERE churn_id >= ?", (first_churn_id,))
+        churned_customers = cursor.fetchall()
+
+    reactivation_count = 0
+    as_of = to_epoch(AS_OF)
+
+    for customer_id, churn_date_str in churned_customers:
+        churn_date = read_epoch(churn_date_str)
+
+        # 10–20% chance of reactivation depending on segment
+        segment = customers.segment_of(customer_id)
+        reactivation_chance = {"SMB": 0.05, "Mid-Market": 0.1, "Enterprise": 0.2}
+
+        if random.random() < reactivation_chance[segment]:
+            reactivation_date = churn_date + random.randint(30, 180) * 86400
+            if reactivation_date < as_of:
+                # Assign a reactivation plan — slightly higher pricing than original
+                if segment == 'Enterprise':
+                    plan_type = random.choice(['Pro', 'Enterprise'])
+                    price = round(random.uniform(350, 900), 2)
+                elif segment == 'Mid-Market':
+                    plan_type = random.choice(['Standard', 'Pro'])
+                    price = round(random.uniform(120, 350), 2)
+                else:
+                    plan_type = random.choice(['Starter', 'Standard'])
+                    price = round(random.uniform(40, 120), 2)
+
+                writer.add("subscriptions", (
+                    sub_id, customer_id, plan_type, price,
+                    reactivation_date,
+                    None, 'active', 'reactivation'
+                ))
+                sub_id += 1
+                reactivation_count += 1
+
+    ids["subscriptions"] = sub_id
+    print(f"[INFO] Reactivated {reactivation_count} churned customers.")
 
 # ------------------------------
 # App Installs per Location (Defensive Handling)
 # ------------------------------
+def generate_app_installs(writer):
+    cursor = writer.cursor
+    # Get current max install_id to avoid conflicts
+    cursor.execute("SELECT MAX(install_id) FROM app_installs")
+    existing_max_install_id = cursor.fetchone()[0]
+    install_id = existing_max_install_id + 1 if existing_max_install_id is not None else 1
+
+    for location_id in range(1, len(OFFICE_LOCATIONS) + 1):
+        for _ in range(random.randint(5, 12)):
+            pid, _ = sample_product()
+            install_date = fake.date_time_between(start_date=AS_OF - ONE_YEAR, end_date=AS_OF)
+            writer.add("app_installs", (
+                install_id, location_id, pid, to_epoch(install_date)
+            ))
+            install_id += 1
 
-# Get current max install_id to avoid conflicts
-cursor.execute("SELECT MAX(install_id) FROM app_installs")
-existing_max_install_id = cursor.fetchone()[0]
-install_id = existing_max_install_id + 1 if existing_max_install_id is not None else 1
+    print("[INFO] Inserted app installs.")
 
-for location_id in range(1, len(OFFICE_LOCATIONS) + 1):
-    for _ in range(random.randint(5, 12)):
-        pid = random.randint(1, NUM_PRODUCTS_TOTAL)
-        install_date = fake.date_time_between(start_date='-1y', end_date=datetime.today())
-        cursor.execute("INSERT INTO app_installs VALUES (?, ?, ?, ?)", (
-            install_id, location_id, pid, install_date.strftime("%Y-%m-%d %H:%M:%S")
+# ------------------------------
+# Discounts and Order Discounts (applied while orders are generated)
+# ------------------------------
+def generate_discounts(writer, num_codes=NUM_DISCOUNT_CODES):
+    cursor = writer.cursor
+    # Ensure discount_id continues from the current max
+    cursor.execute("SELECT MAX(discount_id) FROM discounts")
+    existing_max = cursor.fetchone()[0]
+    start_id = existing_max + 1 if existing_max else 1
+
+    # Insert new discount codes
+    for i in range(start_id, start_id + num_codes):
+        code = f"SALE{i:02d}"
+        percent = random.choice([5, 10, 15, 20, 25, 30])
+        start = fake.date_time_between(start_date=AS_OF - ONE_YEAR, end_date=AS_OF - timedelta(days=30))
+        end = start + timedelta(days=random.randint(7, 90))
+        writer.add("discounts", (
+            i, code, percent,
+            to_epoch(start),
+            to_epoch(end)
         ))
-        install_id += 1
 
-print("[INFO] Inserted app installs.")
+    print(f"[INFO] Inserted {num_codes} discount codes.")
+
+def load_discount_windows(cursor):
+    # (discount_id, start, end) in epoch seconds, for the interval index handed to the order stages
+    return [(discount_id, read_epoch(start), read_epoch(end)) for discount_id, start, end in cursor.execute(
+        "SELECT discount_id, start_date, end_date FROM discounts ORDER BY discount_id").fetchall()]
+
+class DiscountWindows:
+    # Interval index over discount validity windows: the sorted window boundaries cut the timeline into
+    # segments, each listing the discounts valid throughout it, so "valid at t" is one bisect
+    def __init__(self, windows):
+        # A window covers start..end inclusive, i.e. [start, end + 1) in epoch seconds
+        self.bounds = sorted({start for _, start, _ in windows} | {end + 1 for _, _, end in windows})
+        self.segments = [[] for _ in self.bounds]
+        for discount_id, start, end in sorted(windows):
+            for i in range(bisect_left(self.bounds, start), bisect_left(self.bounds, end + 1)):
+                self.segments[i].append(discount_id)
+        self.valid_counts = None
+
+    def valid_at(self, moment):
+        i = bisect_right(self.bounds, moment) - 1
+        return self.segments[i] if i >= 0 else []
+
+    def valid_mask(self, moments):
+        # numpy engine: which epoch timestamps have at least one valid discount
+        if self.valid_counts is None:
+            self.valid_counts = np.array([len(ids) for ids in self.segments] + [0], dtype=np.int64)
+        i = np.searchsorted(np.asarray(self.bounds, dtype=np.int64), moments, side="right") - 1
+        return self.valid_counts[i] > 0  # i == -1 (before the first window) hits the trailing 0
+
+class OrderDiscountSampler:
+    # Picks `quota` orders uniformly from the stream of orders that have a valid discount, without knowing
+    # the stream length up front (reservoir sampling, Algorithm L: once the reservoir is full the gap to the
+    # next replacement is drawn directly, so skipped orders cost no random draws), then gives each sampled
+    # order one discount valid at its order date
+    def __init__(self, windows, quota, rng):
+        self.windows = windows
+        self.quota = quota
+        self.rng = rng
+        self.reservoir = []
+        self.seen = 0
+        self.weight = 1.0
+        self.next_pick = math.inf
+
+    def uniform(self):
+        return self.rng.random() or sys.float_info.min  # (0, 1) for the logs below
+
+    def advance(self, position):
+        self.weight *= math.exp(math.log(self.uniform()) / self.quota)
+        gap = math.log(self.uniform()) / math.log1p(-self.weight) if self.weight < 1.0 else 0.0
+        self.next_pick = position + math.floor(gap) + 1
+
+    def offer(self, order_id, moment):
+        if not self.windows.valid_at(moment):
+            return
+        position = self.seen
+        self.seen += 1
+        if position < self.quota:
+            self.reservoir.append((order_id, moment))
+            if self.seen == self.quota:
+                self.advance(position)
+        elif position == self.next_pick:
+            self.reservoir[self.rng.randrange(self.quota)] = (order_id, moment)
+            self.advance(position)
+
+    def offer_batch(self, order_ids, moments):
+        # Same draws as offering one by one, but only the reservoir fill and the replacements touch Python
+        mask = self.windows.valid_mask(moments)
+        order_ids, moments = order_ids[mask], moments[mask]
+        start = self.seen
+        for order_id, moment in zip(order_ids[:max(self.quota - start, 0)].tolist(),
+                                    moments[:max(self.quota - start, 0)].tolist()):
+            self.offer(order_id, moment)
+        end = start + len(order_ids)
+        while self.next_pick < end:
+            position = self.next_pick
+            self.reservoir[self.rng.randrange(self.quota)] = (int(order_ids[position - start]),
+                                                              int(moments[position - start]))
+            self.advance(position)
+        self.seen = end
+
+    def write(self, writer):
+        # One discount per sampled order, so (order_id, discount_id) pairs are unique by construction
+        for order_id, moment in sorted(self.reservoir):
+            writer.add("order_discounts", (order_id, self.rng.choice(self.windows.valid_at(moment))))
+        print(f"[INFO] Applied discounts to {len(self.reservoir)} of {self.seen} orders placed in a discount window.")
+        return len(self.reservoir)
+
+class OrderDiscountCoin:
+    # Per-entity counterpart of OrderDiscountSampler (HopifyGenerator, --entity-rng): each order placed in a
+    # discount window is discounted with a fixed probability, so a customer's discounts depend on its own orders
+    # alone and the run total matches the quota in expectation
+    def __init__(self, windows, rate, rng):
+        self.windows = windows
+        self.rate = rate
+        self.rng = rng
+        self.picked = []
+        self.seen = 0
+
+    def offer(self, order_id, moment):
+        if not self.windows.valid_at(moment):
+            return
+        self.seen += 1
+        if self.rng.random() < self.rate:
+            self.picked.append((order_id, moment))
+
+    def write(self, writer):
+        for order_id, moment in self.picked:
+            writer.add("order_discounts", (order_id, self.rng.choice(self.windows.valid_at(moment))))
+        print(f"[INFO] Applied discounts to {len(self.picked)} of {self.seen} orders placed in a discount window.")
+        return len(self.picked)
 
 # ------------------------------
-# Discounts and Order Discounts (with defensive uniqueness)
+# Marketing Spend Table
 # ------------------------------
+def generate_marketing_spend(writer, months=None):
+    marketing_spend_data = []
+    segment_spend_ranges = {
+        "SMB": (10000, 25000),
+        "Mid-Market": (50000, 80000),
+        "Enterprise": (100000, 150000)
+    }
+
+    if months is None:
+        months = [AS_OF - relativedelta(months=i) for i in range(HISTORY_MONTHS, 0, -1)]
+
+    for month in months:
+        month_str = month.strftime('%Y-%m')
+        for segment in CUSTOMER_SEGMENTS:
+            min_spend, max_spend = segment_spend_ranges[segment]
+            variation = random.uniform(-0.1, 0.1)  # simulate 10% monthly budget fluctuation
+            avg_spend = (min_spend + max_spend) / 2
+            monthly_budget = round(avg_spend * (1 + variation), 2)
+            marketing_spend_data.append((segment, month_str, monthly_budget))
+
+    writer.add_many("marketing_spend", marketing_spend_data)
+
+    print(f"[INFO] Inserted {len(marketing_spend_data)} rows of marketing spend data with dynamic variation.")
 
-# Ensure discount_id continues from the current max
-cursor.execute("SELECT MAX(discount_id) FROM discounts")
-existing_max = cursor.fetchone()[0]
-start_id = existing_max + 1 if existing_max else 1
-
-# Insert 50 new discount codes
-for i in range(start_id, start_id + 50):
-    code = f"SALE{i:02d}"
-    percent = random.choice([5, 10, 15, 20, 25, 30])
-    start = fake.date_time_between(start_date='-1y', end_date='-30d')
-    end = start + timedelta(days=random.randint(7, 90))
-    cursor.execute("INSERT INTO discounts VALUES (?, ?, ?, ?, ?)", (
-        i, code, percent,
-        start.strftime("%Y-%m-%d %H:%M:%S"),
-        end.strftime("%Y-%m-%d %H:%M:%S")
-    ))
+# ------------------------------
+# Web Traffic Data (Safe Refresh)
+# ------------------------------
+def generate_web_traffic(writer, months=None):
+    # Full refresh by default; with explicit months only those months are replaced
+    if months is None:
+        writer.cursor.execute(f"DELETE FROM {stored_table('web_traffic')}")
+        months = [AS_OF - relativedelta(months=i) for i in range(0, 24)]
+    else:
+        writer.cursor.executemany(f"DELETE FROM {stored_table('web_traffic')} WHERE traffic_date = ?",
+                                  [(month.strftime("%Y-%m"),) for month in months])
 
-# Apply discounts to unique orders, avoiding duplicate (order_id, discount_id) pairs
-used_pairs = set()
-cursor.execute("SELECT order_id FROM orders ORDER BY RANDOM() LIMIT 20000")
-for row in cursor.fetchall():
-    order_id = row[0]
-    tries = 0
-    while tries < 10:
-        discount_id = random.randint(start_id, start_id + 49)
-        if (order_id, discount_id) not in used_pairs:
-            cursor.execute("INSERT INTO order_discounts VALUES (?, ?)", (order_id, discount_id))
-            used_pairs.add((order_id, discount_id))
-            break
-        tries += 1  # Retry with a different discount
+    for month in months:
+        for channel in TRAFFIC_CHANNELS:
+            visitors = random.randint(10000, 30000) if channel != 'Organic' else random.randint(50000, 100000)
+            leads = int(visitors * random.uniform(0.02, 0.05))
+            mqls = int(leads * random.uniform(0.2, 0.4))
+            writer.add("web_traffic", (month.strftime("%Y-%m"), channel, visitors, leads, mqls))
 
-print("[INFO] Inserted discounts and applied to orders.")
+    print("[INFO] Sample web traffic data inserted (table cleared before insert).")
 
 # ------------------------------
-# Marketing Spend Table
+# Replace Benchmarks from CSV
 # ------------------------------
+def load_benchmarks(writer, benchmarks_csv_path=DEFAULT_BENCHMARKS_CSV):
+    print(f"[INFO] Benchmarks CSV path set to: {benchmarks_csv_path}")
+
+    # Delete all existing benchmarks
+    writer.cursor.execute("DELETE FROM benchmarks")
+
+    # Load and insert new benchmarks
+    rows = []
+    with open(benchmarks_csv_path, mode='r', encoding='utf-8') as file:
+        reader = csv.DictReader(file, delimiter=',')
+
+        for i, row in enumerate(reader):
+            try:
+                # Skip rows with missing required fields
+                if not row["benchmark_id"] or not row["metric_name"] or not row["target_value"]:
+                    print(f"[SKIP] Row {i + 1} missing required fields: {row}")
+                    continue
+
+                parsed_row = (
+                    row["benchmark_id"].strip(),
+                    row["metric_category"].strip(),
+                    row["segment"].strip(),
+                    row["metric_name"].strip(),
+                    float(row["target_value"]),
+                    row["description"].strip(),
+                    row["target_period"].strip()
+                )
+                rows.append(parsed_row)
+
+            except Exception as e:
+                print(f"[ERROR] Row {i + 1} failed: {row}")
+                print(f"        Error: {e}")
+
+    # Insert cleaned rows into benchmarks table
+    writer.add_many("benchmarks", rows)
+
+    print(f"[INFO] Benchmarks replaced from CSV. Rows inserted: {len(rows)}")
 
-marketing_spend_data = []
-segment_spend_ranges = {
-    "SMB": (10000, 25000),
-    "Mid-Market": (50000, 80000),
-    "Enterprise": (100000, 150000)
+# ------------------------------
+# Analytical Indexes (opt-in post-load phase, then ANALYZE)
+# ------------------------------
+# Covering indexes for the standard KPI queries (churn, ARPU, MRR, CAC, per-customer drill-downs; see
+# 04_code/hopify_kpi_benchmark.py). Built once after the bulk load, which is far cheaper than maintaining them per row
+ANALYTICAL_INDEXES = {
+    "idx_customers_signup": ("customers", ["signup_date", "customer_segment"]),
+    "idx_customers_segment": ("customers", ["customer_segment", "signup_date"]),
+    "idx_orders_customer": ("orders", ["customer_id", "order_date", "total_amount"]),
+    "idx_orders_date": ("orders", ["order_date", "customer_id", "total_amount"]),
+    "idx_order_items_order": ("order_items", ["order_id", "product_id", "quantity", "subtotal"]),
+    "idx_payments_customer": ("payments", ["customer_id", "payment_date"]),
+    "idx_payments_date": ("payments", ["payment_date", "success", "customer_id", "payment_amount"]),
+    "idx_subscriptions_customer": ("subscriptions", ["customer_id", "start_date", "end_date"]),
+    "idx_subscriptions_period": ("subscriptions", ["start_date", "end_date", "customer_id", "subscription_price"]),
+    "idx_support_tickets_customer": ("support_tickets", ["customer_id", "created_at", "ticket_category"]),
+    "idx_support_tickets_created": ("support_tickets", ["created_at", "customer_id"]),
+    "idx_churn_events_customer": ("churn_events", ["customer_id", "churn_date"]),
+    "idx_churn_events_date": ("churn_events", ["churn_date", "customer_id"]),
+    "idx_order_discounts_discount": ("order_discounts", ["discount_id", "order_id"]),
+    "idx_app_installs_date": ("app_installs", ["install_date", "location_id", "product_id"]),
 }
 
-month_cursor = datetime.now() - relativedelta(months=36)
-end_month = datetime.now() - relativedelta(months=1)
-
-while month_cursor <= end_month:
-    month_str = month_cursor.strftime('%Y-%m')
-    for segment in CUSTOMER_SEGMENTS:
-        min_spend, max_spend = segment_spend_ranges[segment]
-        variation = random.uniform(-0.1, 0.1)  # simulate 10% monthly budget fluctuation
-        avg_spend = (min_spend + max_spend) / 2
-        monthly_budget = round(avg_spend * (1 + variation), 2)
-        marketing_spend_data.append((segment, month_str, monthly_budget))
-    month_cursor += relativedelta(months=1)
-
-cursor.executemany("""
-    INSERT INTO marketing_spend (segment, month, monthly_budget)
-    VALUES (?, ?, ?)
-""", marketing_spend_data)
-
-print(f"[INFO] Inserted {len(marketing_spend_data)} rows of marketing spend data with dynamic variation.")
+def create_indexes(conn):
+    cursor = conn.cursor()
+    for name, (table, columns) in ANALYTICAL_INDEXES.items():
+        # Dictionary-encoded columns are indexed on their decoded expression, which queries through the views use
+        columns = [decoded_column(table, column) for column in columns]
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {stored_table(table)} ({', '.join(columns)})")
+    cursor.execute("ANALYZE")
+    print(f"[INFO] Built {len(ANALYTICAL_INDEXES)} analytical indexes and refreshed planner statistics (ANALYZE).")
 
 # ------------------------------
-# Web Traffic Data (Safe Refresh)
+# Read-Optimized Finalize (fact tables clustered by customer and date, WITHOUT ROWID links, page size, VACUUM)
 # ------------------------------
+# Fact table -> date column. Rows are renumbered in (customer_id, date) order with the table's own IDs, and VACUUM
+# then lays each table out in ID order, so one customer's rows share pages; order items follow their order
+CLUSTERED_TABLES = {
+    "orders": "order_date",
+    "payments": "payment_date",
+    "subscriptions": "start_date",
+    "support_tickets": "created_at",
+    "churn_events": "churn_date",
+}
+TIMELINE_SAMPLE = 1000  # customers timed before and after
+TIMELINE_SAMPLE_SCAN = 20  # without --indexes every timeline read scans the fact tables
+MMAP_STEP = 64 * 1024 * 1024
+# One customer's history, as an account or support screen reads it
+TIMELINE_SQL = """
+SELECT 'order' AS event, order_date AS at, total_amount AS amount, NULL AS detail FROM orders WHERE customer_id = ?1
+UNION ALL SELECT 'item', o.order_date, oi.subtotal, oi.product_id FROM orders o
+    JOIN order_items oi ON oi.order_id = o.order_id WHERE o.customer_id = ?1
+UNION ALL SELECT 'payment', payment_date, payment_amount, payment_method FROM payments WHERE customer_id = ?1
+UNION ALL SELECT 'subscription', start_date, subscription_price, plan_type FROM subscriptions WHERE customer_id = ?1
+UNION ALL SELECT 'ticket', created_at, NULL, ticket_category FROM support_tickets WHERE customer_id = ?1
+UNION ALL SELECT 'churn', churn_date, NULL, churn_reason FROM churn_events WHERE customer_id = ?1
+ORDER BY at
+"""
+
+def renumber_rows(cursor, table, order_by):
+    # Hands the table's existing IDs out again in `order_by` order and rewrites the table in ID order. The set of
+    # IDs stays the same, so the next IDs of --append and the rowid high-water marks stay valid; the old -> new map
+    # is left in temp.renumbered for the tables that reference these IDs
+    stored, id_column = stored_table(table), ID_COLUMNS[table]
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({stored})").fetchall()]
+    cursor.execute("DROP TABLE IF EXISTS temp.renumbered")
+    cursor.execute("CREATE TEMP TABLE renumbered (old_id INTEGER PRIMARY KEY, new_id INTEGER)")
+    cursor.execute(
+        f"INSERT INTO temp.renumbered SELECT ranked.{id_column}, ids.{id_column} "
+        f"FROM (SELECT {id_column}, ROW_NUMBER() OVER (ORDER BY {order_by}) AS position FROM {stored}) ranked "
+        f"JOIN (SELECT {id_column}, ROW_NUMBER() OVER (ORDER BY {id_column}) AS position FROM {stored}) ids "
+        f"USING (position)"
+    )
+    selected = ", ".join(f"new_id AS {column}" if column == id_column else f"{stored}.{column}" for column in columns)
+    cursor.execute("DROP TABLE IF EXISTS temp.renumbered_rows")
+    cursor.execute(f"CREATE TEMP TABLE renumbered_rows AS SELECT {selected} FROM {stored} "
+                   f"JOIN temp.renumbered ON old_id = {stored}.{id_column}")
+    cursor.execute(f"DELETE FROM {stored}")
+    cursor.execute(f"INSERT INTO {stored} SELECT * FROM temp.renumbered_rows ORDER BY {id_column}")
+    cursor.execute("DROP TABLE temp.renumbered_rows")
+
+def cluster_fact_tables(cursor):
+    for table, column in CLUSTERED_TABLES.items():
+        renumber_rows(cursor, table, f"customer_id, {column}, {ID_COLUMNS[table]}")
+        if table == "orders":
+            cursor.execute("UPDATE order_items SET order_id = "
+                           "(SELECT new_id FROM temp.renumbered WHERE old_id = order_items.order_id)")
+            # A pure link table: WITHOUT ROWID keeps its rows in the primary key B-tree itself, instead of a rowid
+            # table plus an automatic index holding the same two columns
+            links = cursor.execute("SELECT new_id, discount_id FROM order_discounts "
+                                   "JOIN temp.renumbered ON old_id = order_id ORDER BY 1, 2").fetchall()
+            indexes = [name for name, in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'order_discounts' AND sql IS NOT NULL")]
+            cursor.execute("DROP TABLE order_discounts")
+            cursor.execute(logical_tables()["order_discounts"].rstrip(";") + " WITHOUT ROWID")
+            cursor.executemany(INSERT_SQL["order_discounts"], links)
+            for name in indexes:
+                cursor.execute(f"CREATE INDEX {name} ON order_discounts ({', '.join(ANALYTICAL_INDEXES[name][1])})")
+    renumber_rows(cursor, "order_items", "order_id, order_item_id")
+    cursor.execute("DROP TABLE temp.renumbered")
+
+def evict_file(path):
+    # Drops a file's pages from the OS page cache where the platform allows it, so the next reader starts cold
+    if hasattr(os, "posix_fadvise"):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+def timeline_latency(db_path, pragmas=()):
+    # Mean milliseconds per customer for TIMELINE_SQL over evenly spaced customers, read cold (fresh connection,
+    # file evicted from the OS cache), so pages shared by one customer's rows show up as fewer page reads
+    evict_file(db_path)
+    conn = sqlite3.connect(db_path)
+    apply_pragmas(conn, pragmas)
+    count = TIMELINE_SAMPLE if conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name = 'idx_orders_customer'").fetchone()[0] else TIMELINE_SAMPLE_SCAN
+    customer_ids = [customer_id for customer_id, in conn.execute("SELECT customer_id FROM customers ORDER BY 1")]
+    sample = customer_ids[::max(1, len(customer_ids) // count)][:count]
+    started = time.perf_counter()
+    for customer_id in sample:
+        conn.execute(TIMELINE_SQL, (customer_id,)).fetchall()
+    conn.close()
+    return 1000 * (time.perf_counter() - started) / max(1, len(sample))
+
+def finalize_database(conn, db_path, page_size=DEFAULT_PAGE_SIZE):
+    # Read-optimized layout for a finished build: cluster, then VACUUM into the new page size; records the mmap_size
+    # readers should use and reports file size and timeline latency before and after
+    cursor = conn.cursor()
+    conn.commit()
+    size_before, page_size_before = os.path.getsize(db_path), cursor.execute("PRAGMA page_size").fetchone()[0]
+    latency_before = timeline_latency(db_path)
 
-cursor.execute("DELETE FROM web_traffic")
+    cluster_fact_tables(cursor)
+    conn.commit()
+    cursor.execute(f"PRAGMA page_size = {page_size}")
+    cursor.execute("VACUUM")
+    # The other tables keep their row counts, and with them their planner statistics
+    cursor.execute("ANALYZE order_discounts")
+
+    size_after = os.path.getsize(db_path)
+    reader_pragmas = [f"mmap_size = {-(-size_after // MMAP_STEP) * MMAP_STEP}"]
+    write_metadata(conn, reader_pragmas=json.dumps(reader_pragmas))
+    latency_after = timeline_latency(db_path)
+    latency_mmap = timeline_latency(db_path, reader_pragmas)
+    print(f"[PERF] Finalize: file {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB "
+          f"(page size {page_size_before} -> {page_size})")
+    print(f"[PERF] Customer timeline: {latency_before:.2f} ms -> {latency_after:.2f} ms per customer "
+          f"({latency_mmap:.2f} ms with {reader_pragmas[0]})")
+    print(f"[INFO] Recommended reader settings (generator_metadata.reader_pragmas): PRAGMA {reader_pragmas[0]}")
 
-channels = ['Paid Search', 'Social Media', 'Organic']
-months = [datetime.now() - relativedelta(months=i) for i in range(0, 24)]
+# ------------------------------
+# KPI Fact Tables (monthly KPIs per segment, materialized with incremental refresh)
+# ------------------------------
+# benchmarks.metric_name -> target column in kpi_monthly_segment
+KPI_TARGETS = {
+    "Monthly Churn Target (%)": "churn_target_pct",
+    "MRR Target": "mrr_target",
+    "ARPU Target": "arpu_target",
+    "CAC Target": "cac_target",
+    "Monthly New Customers Target": "new_customers_target",
+}
+# Source tables and the column that dates their rows; rows past the rowid high-water mark of the last refresh
+# mark their month (and every later one) as changed
+KPI_SOURCES = {
+    "customers": "signup_date",
+    "subscriptions": "start_date",
+    "payments": "payment_date",
+    "churn_events": "churn_date",
+    "marketing_spend": "month",
+    "web_traffic": "traffic_date",
+}
 
-for month in months:
-    for channel in channels:
-        visitors = random.randint(10000, 30000) if channel != 'Organic' else random.randint(50000, 100000)
-        leads = int(visitors * random.uniform(0.02, 0.05))
-        mqls = int(leads * random.uniform(0.2, 0.4))
-        cursor.execute("""
-            INSERT INTO web_traffic (traffic_date, source_channel, visitors, leads, mqls)
-            VALUES (?, ?, ?, ?, ?)
-        """, (month.strftime("%Y-%m"), channel, visitors, leads, mqls))
+def month_label(value):
+    # "YYYY-MM" of a stored timestamp or month label
+    return value[:7] if isinstance(value, str) else format_epoch(value)[:7]
+
+def kpi_month_range(first, last):
+    return [month.strftime("%Y-%m") for month in month_starts(datetime.strptime(first + "-01", "%Y-%m-%d"),
+                                                              datetime.strptime(last + "-01", "%Y-%m-%d"))]
+
+def kpi_changed_from(cursor, high_water):
+    # Earliest month touched by rows added since the last refresh (None when nothing changed)
+    months = []
+    for table, column in KPI_SOURCES.items():
+        value = cursor.execute(f"SELECT MIN({column}) FROM {stored_table(table)} WHERE rowid > ?",
+                               (high_water.get(table, 0),)).fetchone()[0]
+        if value is not None:
+            months.append(month_label(value))
+    return min(months) if months else None
+
+def compute_kpis(cursor, months):
+    # One grouped pass per source table over the refreshed months; MRR and active customers are running totals,
+    # carried in from the last stored month before the range
+    since = stored_timestamp(datetime.strptime(months[0] + "-01", "%Y-%m-%d"))
+
+    def by_segment():
+        return {(month, segment): 0 for month in months for segment in CUSTOMER_SEGMENTS}
+
+    new, churned, reactivated, started, ended = by_segment(), by_segment(), by_segment(), by_segment(), by_segment()
+    revenue, paying, spend = by_segment(), by_segment(), by_segment()
+
+    def collect(sql, *targets, params=(since,)):
+        for month, segment, *values in cursor.execute(sql, params).fetchall():
+            if (month, segment) in targets[0]:
+                for target, value in zip(targets, values):
+                    target[(month, segment)] = value or 0
+
+    collect(f"SELECT {month_sql('signup_date')}, customer_segment, COUNT(*) FROM customers "
+            f"WHERE signup_date >= ? GROUP BY 1, 2", new)
+    collect(f"SELECT {month_sql('ce.churn_date')}, c.customer_segment, COUNT(*) FROM churn_events ce "
+            f"JOIN customers c ON c.customer_id = ce.customer_id WHERE ce.churn_date >= ? GROUP BY 1, 2", churned)
+    collect(f"SELECT {month_sql('s.start_date')}, c.customer_segment, SUM(s.subscription_price), "
+            f"SUM(LOWER(s.change_type) = 'reactivation') FROM subscriptions s "
+            f"JOIN customers c ON c.customer_id = s.customer_id WHERE s.start_date >= ? GROUP BY 1, 2", started, reactivated)
+    collect(f"SELECT {month_sql('s.end_date')}, c.customer_segment, SUM(s.subscription_price) FROM subscriptions s "
+            f"JOIN customers c ON c.customer_id = s.customer_id WHERE s.end_date >= ? GROUP BY 1, 2", ended)
+    collect(f"SELECT {month_sql('p.payment_date')}, c.customer_segment, SUM(p.payment_amount), "
+            f"COUNT(DISTINCT p.customer_id) FROM payments p JOIN customers c ON c.customer_id = p.customer_id "
+            f"WHERE p.success = 1 AND p.payment_date >= ? GROUP BY 1, 2", revenue, paying)
+    collect("SELECT month, segment, SUM(monthly_budget) FROM marketing_spend WHERE month >= ? GROUP BY 1, 2", spend,
+            params=(months[0],))
+
+    targets = {}
+    for segment, metric_name, target_value in cursor.execute(
+            "SELECT segment, metric_name, target_value FROM benchmarks").fetchall():
+        if metric_name in KPI_TARGETS:
+            targets[(segment, KPI_TARGETS[metric_name])] = target_value
+
+    previous = {
+        segment: (active + new_count - churned_count + reactivated_count, mrr)
+        for segment, active, new_count, churned_count, reactivated_count, mrr in cursor.execute(
+            "SELECT segment, active_customers, new_customers, churned_customers, reactivated_customers, mrr "
+            "FROM kpi_monthly_segment WHERE month = (SELECT MAX(month) FROM kpi_monthly_segment WHERE month < ?)",
+            (months[0],)
+        ).fetchall()
+    }
+    segment_rows = []
+    for segment in CUSTOMER_SEGMENTS:
+        active, mrr = previous.get(segment, (0, 0.0))
+        for month in months:
+            key = (month, segment)
+            mrr += started[key] - ended[key]
+            segment_rows.append((
+                month, segment, active, new[key], churned[key], reactivated[key],
+                round(100.0 * churned[key] / active, 2) if active else None, targets.get((segment, "churn_target_pct")),
+                round(mrr, 2), targets.get((segment, "mrr_target")),
+                round(revenue[key], 2), paying[key],
+                round(revenue[key] / paying[key], 2) if paying[key] else None, targets.get((segment, "arpu_target")),
+                round(spend[key], 2), round(spend[key] / new[key], 2) if new[key] else None,
+                targets.get((segment, "cac_target")), targets.get((segment, "new_customers_target")),
+            ))
+            active += new[key] - churned[key] + reactivated[key]
+
+    traffic_rows = [
+        (month, channel, visitors, leads, mqls, round(100.0 * mqls / leads, 2) if leads else None)
+        for month, channel, visitors, leads, mqls in cursor.execute(
+            "SELECT traffic_date, source_channel, SUM(visitors), SUM(leads), SUM(mqls) FROM web_traffic "
+            "WHERE traffic_date >= ? AND traffic_date <= ? GROUP BY 1, 2 ORDER BY 1, 2", (months[0], months[-1])
+        ).fetchall()
+    ]
+    return sorted(segment_rows), traffic_rows
+
+def refresh_kpis(writer, full=False):
+    # Recomputes the months changed since the last refresh (all months when full, or when the tables are new) and
+    # records the new high-water marks in the same transaction as the rows
+    cursor = writer.cursor
+    if cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'kpi_monthly_segment'").fetchone()[0] == 0:
+        # Databases built before the KPI tables existed
+        for statement in re.findall(r"CREATE TABLE kpi_\w+ \(.*?\n\);", schema_sql(), re.DOTALL):
+            cursor.execute(statement)
+        full = True
+    metadata = dict(cursor.execute("SELECT key, value FROM generator_metadata").fetchall())
+    last_month = month_label(stored_timestamp(AS_OF - timedelta(seconds=1)))
+
+    if full or "kpi_high_water" not in metadata:
+        first_signup = cursor.execute("SELECT MIN(signup_date) FROM customers").fetchone()[0]
+        first_month = month_label(first_signup) if first_signup is not None else None
+    else:
+        stored_last = cursor.execute("SELECT MAX(month) FROM kpi_monthly_segment").fetchone()[0]
+        changed = kpi_changed_from(cursor, json.loads(metadata["kpi_high_water"]))
+        following = kpi_month_range(stored_last, last_month)[1:2] if stored_last else []
+        candidates = [month for month in [changed] + following if month]
+        first_month = min(candidates) if candidates else None
+
+    if first_month is None or first_month > last_month:
+        print("[INFO] KPI tables are up to date.")
+        months = []
+    else:
+        months = kpi_month_range(first_month, last_month)
+        cursor.execute("DELETE FROM kpi_monthly_segment WHERE month >= ?", (first_month,))
+        cursor.execute("DELETE FROM kpi_monthly_traffic WHERE month >= ?", (first_month,))
+        segment_rows, traffic_rows = compute_kpis(cursor, months)
+        writer.add_many("kpi_monthly_segment", segment_rows)
+        writer.add_many("kpi_monthly_traffic", traffic_rows)
+        writer.sync()
+        print(f"[INFO] KPI tables refreshed for {len(months)} month(s): {months[0]} to {months[-1]}.")
+
+    high_water = {table: cursor.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {stored_table(table)}").fetchone()[0]
+                  for table in KPI_SOURCES}
+    cursor.execute("INSERT OR REPLACE INTO generator_metadata (key, value) VALUES ('kpi_high_water', ?)",
+                   (json.dumps(high_water),))
+    return months
 
-print("[INFO] Sample web traffic data inserted (table cleared before insert).")
+# ------------------------------
+# Time-Partitioned Output (per-period fact files, a catalog with ATTACH-based UNION ALL views)
+# ------------------------------
+# Fact table -> column whose period places a row in a partition; order items go with their order
+PARTITIONED_TABLES = {
+    "orders": "order_date",
+    "order_items": None,
+    "payments": "payment_date",
+    "subscriptions": "start_date",
+    "support_tickets": "created_at",
+    "churn_events": "churn_date",
+}
+PARTITION_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+CATALOG_FILE = "catalog.db"
+CATALOG_SQL = """
+CREATE TABLE partitions (
+    period TEXT PRIMARY KEY,
+    path TEXT,
+    first_day TEXT,
+    next_day TEXT,
+    row_count INTEGER
+);
+"""
+
+def default_partition_dir(db_path):
+    return os.path.splitext(db_path)[0] + "_partitions"
+
+def logical_tables():
+    # Table name -> CREATE TABLE statement of its logical (decoded) form
+    return {match.group(1): match.group(0)
+            for match in re.finditer(r"CREATE TABLE (\w+) \(.*?\n\);", logical_schema_sql(), re.DOTALL)}
+
+def partition_period(month, partition_by):
+    # "YYYY-MM" -> (period label, first day, first day of the next period)
+    step = PARTITION_MONTHS[partition_by]
+    first = datetime.strptime(month + "-01", "%Y-%m-%d")
+    first = first.replace(month=(first.month - 1) // step * step + 1)
+    label = {"month": first.strftime("%Y_%m"), "quarter": f"{first.year}q{(first.month + 2) // 3}",
+             "year": str(first.year)}[partition_by]
+    return label, first, first + relativedelta(months=step)
+
+def partition_periods(cursor, partition_by, high_water):
+    # Periods holding fact rows past the rowid high-water marks of the last export
+    months = set()
+    for table, column in PARTITIONED_TABLES.items():
+        source, since = stored_table(table), high_water.get(table, 0)
+        if column is None:
+            if not since:
+                continue  # every order item's order is already counted
+            source, column = f"{source} JOIN orders USING (order_id)", "orders.order_date"
+        months.update(month for month, in cursor.execute(
+            f"SELECT DISTINCT {month_sql(column)} FROM {source} WHERE {stored_table(table)}.rowid > ?", (since,)))
+    return sorted({partition_period(month, partition_by) for month in months if month}, key=lambda period: period[1])
+
+def index_tables(cursor, tables):
+    # ANALYTICAL_INDEXES for plain (logical) tables, then ANALYZE
+    for name, (table, columns) in ANALYTICAL_INDEXES.items():
+        if table in tables:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS main.{name} ON {table} ({', '.join(columns)})")
+    cursor.execute("ANALYZE main")
+
+def write_partition(spec):
+    # One period's fact rows, copied out of the main database into a fresh file that replaces the old one only
+    # once complete (readers that already attached the old file keep reading it)
+    temp_path = spec["path"] + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    cursor = conn.cursor()
+    cursor.execute("ATTACH DATABASE ? AS source", (spec["db_path"],))
+    rows = 0
+    for table, column in PARTITIONED_TABLES.items():
+        cursor.execute(spec["schema"][table])
+        if column is None:
+            cursor.execute(f"INSERT INTO main.{table} SELECT * FROM source.{table} "
+                           f"WHERE order_id IN (SELECT order_id FROM main.orders)")
+        else:
+            cursor.execute(f"INSERT INTO main.{table} SELECT * FROM source.{table} WHERE {column} >= ? AND {column} < ?",
+                           spec["bounds"])
+        rows += cursor.rowcount
+    if spec["indexes"]:
+        index_tables(cursor, PARTITIONED_TABLES)
+    conn.commit()
+    cursor.execute("DETACH DATABASE source")
+    conn.close()
+    os.replace(temp_path, spec["path"])
+    return spec["period"], rows
+
+def export_partitions(conn, db_path, partition_dir, partition_by, workers=None, full=True):
+    # Fact tables split by period into <partition_dir>/facts_<period>.db, written in parallel from the main
+    # database; everything else is copied to the catalog. After the first export only the periods touched by rows
+    # added since then (on --append usually just the latest one) are rewritten. Partitions and catalog carry the
+    # analytical indexes when the main database does
+    conn.commit()
+    os.makedirs(partition_dir, exist_ok=True)
+    catalog_path = os.path.join(partition_dir, CATALOG_FILE)
+    catalog = sqlite3.connect(catalog_path)
+    state = read_metadata(catalog)
+    if full or state.get("partition_by") != partition_by or state.get("date_storage") != DATE_STORAGE:
+        if catalog.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'partitions'").fetchone()[0]:
+            for path, in catalog.execute("SELECT path FROM partitions").fetchall():
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(partition_dir, path))
+        catalog.close()
+        os.remove(catalog_path)
+        catalog = sqlite3.connect(catalog_path)
+        # The fact tables stay in the catalog empty, as the schema open_partitions() falls back to
+        catalog.executescript("\n".join(logical_tables()[table] for table in TABLE_COLUMNS) + CATALOG_SQL)
+        high_water = {}
+    else:
+        high_water = json.loads(state["partition_high_water"])
+
+    cursor = conn.cursor()
+    indexes = cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = 'idx_orders_date'"
+                             ).fetchone()[0] > 0
+    new_high_water = {table: cursor.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {stored_table(table)}").fetchone()[0]
+                      for table in PARTITIONED_TABLES}
+    schema = logical_tables()
+    periods = partition_periods(cursor, partition_by, high_water)
+    specs = [{"period": label, "path": os.path.join(partition_dir, f"facts_{label}.db"), "db_path": db_path,
+              "schema": schema, "bounds": (stored_timestamp(first), stored_timestamp(following)), "indexes": indexes}
+             for label, first, following in periods]
+    if len(specs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            written = list(pool.map(write_partition, specs))
+    else:
+        written = [write_partition(spec) for spec in specs]
+
+    catalog.executemany(
+        "INSERT OR REPLACE INTO partitions (period, path, first_day, next_day, row_count) VALUES (?, ?, ?, ?, ?)",
+        [(label, f"facts_{label}.db", first.strftime("%Y-%m-%d"), following.strftime("%Y-%m-%d"), rows)
+         for (label, first, following), (_, rows) in zip(periods, written)]
+    )
+    # Non-fact tables are small next to the facts and copied whole, decoded
+    catalog.execute("ATTACH DATABASE ? AS source", (db_path,))
+    for table in TABLE_COLUMNS:
+        if table not in PARTITIONED_TABLES:
+            columns = ", ".join(SQL_TYPES[table])
+            catalog.execute(f"DELETE FROM main.{table}")
+            catalog.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM source.{table}")
+    catalog.commit()
+    catalog.execute("DETACH DATABASE source")
+    if indexes:
+        index_tables(catalog.cursor(), [table for table in TABLE_COLUMNS if table not in PARTITIONED_TABLES])
+    metadata = read_metadata(conn)
+    write_metadata(catalog, partition_by=partition_by, date_storage=DATE_STORAGE, category_storage="text",
+                   as_of=metadata.get("as_of"), last_month=metadata.get("last_month"),
+                   main_db=os.path.relpath(os.path.abspath(db_path), os.path.abspath(partition_dir)),
+                   partition_high_water=json.dumps(new_high_water))
+    total = catalog.execute("SELECT COUNT(*) FROM partitions").fetchone()[0]
+    catalog.close()
+    print(f"[INFO] Wrote {len(written)} of {total} {partition_by} partition(s) and the catalog to {partition_dir}.")
+    return [label for label, _ in written]
+
+def open_partitions(catalog_path, since=None, until=None):
+    # Catalog connection with the fact tables as UNION ALL views over the partitions overlapping [since, until)
+    # ("YYYY-MM-DD" or datetime; open-ended when None), so a date-bounded query only opens the files it needs.
+    # SQLite only lets TEMP views span attached databases, and caps attachments per connection (10 by default):
+    # when more partitions overlap the range (a full history of quarters or months), the views read the complete
+    # main database the partitions were cut from instead
+    conn = sqlite3.connect(catalog_path)
+    since, until = [bound.strftime("%Y-%m-%d") if isinstance(bound, datetime) else bound for bound in (since, until)]
+    partitions = conn.execute(
+        "SELECT period, path FROM partitions WHERE (? IS NULL OR next_day > ?) AND (? IS NULL OR first_day < ?) "
+        "ORDER BY first_day", (since, since, until, until)
+    ).fetchall()
+    directory = os.path.dirname(os.path.abspath(catalog_path))
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(partitions) > limit:
+        main_db = read_metadata(conn).get("main_db")
+        main_path = os.path.normpath(os.path.join(directory, main_db)) if main_db else None
+        if main_path is None or not os.path.exists(main_path):
+            conn.close()
+            raise ValueError(f"{len(partitions)} partitions overlap the range, but SQLite attaches at most {limit} "
+                             f"databases per connection and the main database is not available; narrow the range "
+                             f"or partition by a longer period")
+        print(f"[WARN] {len(partitions)} partitions overlap the range (SQLite attaches at most {limit}); "
+              f"reading the fact tables from {main_path}.")
+        conn.execute("ATTACH DATABASE ? AS main_db", (main_path,))
+        for table in PARTITIONED_TABLES:
+            columns = ", ".join(SQL_TYPES[table])
+            conn.execute(f"CREATE TEMP VIEW {table} AS SELECT {columns} FROM main_db.{table}")
+        return conn
+    for period, path in partitions:
+        conn.execute(f"ATTACH DATABASE ? AS p_{period}", (os.path.join(directory, path),))
+    if partitions:
+        for table in PARTITIONED_TABLES:
+            union = " UNION ALL ".join(f"SELECT * FROM p_{period}.{table}" for period, _ in partitions)
+            conn.execute(f"CREATE TEMP VIEW {table} AS {union}")
+    return conn
 
 # ------------------------------
-# Replace Benchmarks from CSV
+# Sharded Customer Generation (multi-process, deterministic per-shard seeds)
 # ------------------------------
-benchmarks_csv_path = os.path.join(
-    os.path.dirname(__file__), '..', 'benchmarks', 'hopify-benchmarks-seg-table.csv'
-)
-print(f"[INFO] Benchmarks CSV path set to: {benchmarks_csv_path}")
+def split_plan(acquisition_plan, shards):
+    # Contiguous customer-ID ranges of near-equal size, expressed as per-month slices of the plan
+    total = sum(acquisition_plan.values())
+    bounds = [total * k // shards for k in range(shards + 1)]
+    slices = [[] for _ in range(shards)]
+    offset = 0
+    for year_month, target in acquisition_plan.items():
+        for k in range(shards):
+            lo, hi = max(offset, bounds[k]), min(offset + target, bounds[k + 1])
+            if hi > lo:
+                slices[k].append((year_month, hi - lo))
+        offset += target
+    return bounds, slices
+
+def max_rows_per_customer():
+    max_orders = max(hi for _, hi in segment_order_ranges.values()) + MAX_EXPANSION_MONTHS
+    return {
+        "customers": 1,
+        "orders": max_orders,
+        "payments": max_orders,
+        "order_items": max(hi for _, hi in segment_order_ranges.values()) * MAX_ITEMS_PER_ORDER,
+        "subscriptions": MAX_SUBSCRIPTIONS_PER_CUSTOMER,
+        "support_tickets": MAX_TICKETS_PER_CUSTOMER,
+        "churn_events": 1,
+    }
+
+def shard_share(quota, bounds, k):
+    # Shard k's part of a run-wide quota, proportional to its customers; the parts add up to the quota
+    total = bounds[-1]
+    return quota * bounds[k + 1] // total - quota * bounds[k] // total if total else 0
+
+def build_shard_specs(acquisition_plan, shards, seed, db_path, catalog, order_engine, fast_load, batch_size, pools,
+                      ticket_customers=TICKET_SAMPLE_SIZE, resume=False, outputs=None, churn_model=CHURN_MODEL,
+                      discounts=(), discounted_orders=NUM_DISCOUNTED_ORDERS, queue_batches=0, entity_rng=False):
+    bounds, slices = split_plan(acquisition_plan, shards)
+    ticket_total = min(ticket_customers, bounds[-1])
+    specs = []
+    for k in range(shards):
+        specs.append({
+            "shard": k,
+            "shards": shards,
+            "seed": seed,
+            "as_of": AS_OF,
+            "date_storage": DATE_STORAGE,
+            "category_storage": CATEGORY_STORAGE,
+            "plan_slice": slices[k],
+            "catalog": catalog,
+            "order_engine": order_engine,
+            "fast_load": fast_load,
+            "batch_size": batch_size,
+            "queue_batches": queue_batches,
+            "faker_pools": pools,
+            # Non-overlapping ID block: everything before this shard's first customer, times the per-customer bound
+            "ids": {table: 1 + bounds[k] * per_customer for table, per_customer in max_rows_per_customer().items()},
+            "ticket_sample_size": shard_share(ticket_total, bounds, k),
+            "discounts": discounts,
+            "discounted_orders": shard_share(discounted_orders, bounds, k),
+            "db_path": db_path if shards == 1 else f"{db_path}.shard{k:03d}",
+            "create_schema": shards > 1,
+            "resume": resume,
+            "outputs": outputs,
+            "churn_model": churn_model,
+            "entity_rng": entity_rng,
+            "acquisition_plan": acquisition_plan,
+            "volumes": {"customers": bounds[-1], "ticket_customers": ticket_customers,
+                        "discounted_orders": discounted_orders},
+        })
+    return specs
+
+SHARD_STAGES = ["customers", "orders", "expansion", "subscriptions", "support_tickets", "churn", "reactivations"]
+
+def run_shard(spec):
+    global AS_OF, DATE_STORAGE, CATEGORY_STORAGE
+    AS_OF = spec["as_of"]
+    DATE_STORAGE = spec["date_storage"]
+    CATEGORY_STORAGE = spec["category_storage"]
+    build_product_index(spec["catalog"])
+    faker_pools.clear()
+    faker_pools.update(spec["faker_pools"] or {})
+    seed, k = spec["seed"], spec["shard"]
+
+    # A resumed shard keeps its own file (and the checkpoints in it)
+    create_schema = spec["create_schema"] and not (spec["resume"] and os.path.exists(spec["db_path"]))
+    if create_schema and os.path.exists(spec["db_path"]):
+        os.remove(spec["db_path"])
+    conn = sqlite3.connect(spec["db_path"], check_same_thread=not spec["queue_batches"])
+    if spec["fast_load"]:
+        apply_pragmas(conn, FAST_LOAD_PRAGMAS)
+    if create_schema:
+        conn.executescript(schema_sql())
+        if CATEGORY_STORAGE == "dictionary":
+            fill_dimensions(conn.cursor())
+    outputs = spec["outputs"]
+    writer = RowBuffer(conn, spec["batch_size"], open_sinks(outputs, f"shard{k:03d}", shared=spec["shards"] == 1),
+                       outputs["sqlite_tables"] if outputs else None, spec["queue_batches"])
+
+    # Continue the ID counters from the last completed stage
+    prefix = f"shard{k:03d}/"
+    completed = load_checkpoints(conn) if spec["resume"] else {}
+    if spec["entity_rng"]:
+        generator = HopifyGenerator(seed, as_of=AS_OF, volumes=spec["volumes"], churn_model=spec["churn_model"],
+                                    pools=spec["faker_pools"], acquisition_plan=spec["acquisition_plan"],
+                                    catalog=spec["catalog"], discounts=spec["discounts"])
+        start = spec["ids"]["customers"]
+        stop = start + sum(count for _, count in spec["plan_slice"])
+        run_stage(writer, completed, prefix + "entities", None, lambda: generate_entities(writer, generator, start, stop))
+        writer.close()
+        if spec["fast_load"]:
+            apply_pragmas(conn, SAFE_PRAGMAS)
+        conn.close()
+        return stop - start, writer.stats()
+    ids = dict(spec["ids"])
+    for stage in SHARD_STAGES:
+        if prefix + stage in completed:
+            ids = completed[prefix + stage]
+
+    customers = run_stage(writer, completed, prefix + "customers", (seed, "customers", k),
+                          lambda: generate_customers(writer, spec["plan_slice"], ids), ids)
+    if customers is None:
+        # Resumed past the customer stage: rebuild the store (and base order dates, if orders are done)
+        orders_done = completed.get(prefix + "orders")
+        customers = CustomerStore.load(writer.cursor, spec["ids"]["customers"], ids["customers"],
+                                       (spec["ids"]["orders"], orders_done["orders"]) if orders_done else None,
+                                       tickets=prefix + "support_tickets" in completed)
+    # Discounted orders are sampled with their own RNG stream, so the orders themselves do not depend on it
+    discounts = OrderDiscountSampler(DiscountWindows(spec["discounts"]), spec["discounted_orders"],
+                                     random.Random(derive_seed(seed, "order_discounts", k)))
+    run_stage(writer, completed, prefix + "orders", (seed, "orders", k),
+              lambda: generate_orders(writer, customers, ids, spec["order_engine"], discounts), ids)
+    run_stage(writer, completed, prefix + "expansion", (seed, "expansion", k),
+              lambda: generate_expansion(writer, customers, ids), ids)
+    run_stage(writer, completed, prefix + "subscriptions", (seed, "subscriptions", k),
+              lambda: generate_subscriptions(writer, customers, ids), ids)
+    run_stage(writer, completed, prefix + "support_tickets", (seed, "support_tickets", k),
+              lambda: generate_support_tickets(writer, customers, spec["ticket_sample_size"], ids), ids)
+    run_stage(writer, completed, prefix + "churn", (seed, "churn", k),
+              lambda: generate_churn(writer, customers, ids, spec["churn_model"]), ids)
+    run_stage(writer, completed, prefix + "reactivations", (seed, "reactivations", k),
+              lambda: generate_reactivations(writer, customers, ids), ids)
+    writer.close()
+
+    if spec["fast_load"]:
+        apply_pragmas(conn, SAFE_PRAGMAS)
+    conn.close()
+    return len(customers), writer.stats()
+
+def merge_shards(conn, specs):
+    # Shards own disjoint ID blocks, so merging is a straight copy in shard order; each shard's copy is
+    # committed together with its merge checkpoint
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    for spec in specs:
+        cursor.execute("ATTACH DATABASE ? AS shard", (spec["db_path"],))
+        for table in SHARDED_TABLES:
+            cursor.execute(f"INSERT INTO main.{stored_table(table)} SELECT * FROM shard.{stored_table(table)}")
+        record_checkpoint(cursor, f"merge/shard{spec['shard']:03d}")
+        conn.commit()
+        cursor.execute("DETACH DATABASE shard")
+        os.remove(spec["db_path"])
+    print(f"[INFO] Merged {len(specs)} shard databases.")
+    return time.perf_counter() - started
+
+def generate_customer_shards(conn, db_path, acquisition_plan, seed, shards, workers, order_engine,
+                             fast_load=False, batch_size=DEFAULT_BATCH_SIZE, pools=None,
+                             ticket_customers=TICKET_SAMPLE_SIZE, resume=False, outputs=None,
+                             churn_model=CHURN_MODEL, discounted_orders=NUM_DISCOUNTED_ORDERS, queue_batches=0,
+                             entity_rng=False):
+    catalog = conn.execute("SELECT product_id, category, price FROM products ORDER BY product_id").fetchall()
+    specs = build_shard_specs(acquisition_plan, shards, seed, db_path, catalog, order_engine, fast_load, batch_size,
+                              pools, ticket_customers, resume, outputs, churn_model,
+                              load_discount_windows(conn.cursor()), discounted_orders, queue_batches, entity_rng)
+    if resume and shards > 1:
+        # Shards already merged into the main file are done (their shard files are gone)
+        completed = load_checkpoints(conn)
+        specs = [spec for spec in specs if f"merge/shard{spec['shard']:03d}" not in completed]
+
+    if not specs:
+        results = []
+    elif shards == 1:
+        results = [run_shard(specs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_shard, specs))
+
+    # Stage times are summed across shards (CPU time spent, not wall time when running in parallel)
+    shard_stats = {}
+    for _, stats in results:
+        merge_stats(shard_stats, stats)
+    if shards > 1:
+        shard_stats.setdefault("stage_seconds", {})["merge_shards"] = merge_shards(conn, specs)
+        if outputs and outputs["duckdb_path"]:
+            shard_stats["stage_seconds"]["merge_duckdb"] = merge_duckdb_parts(
+                outputs["duckdb_path"], [duckdb_part_path(outputs["duckdb_path"], f"shard{spec['shard']:03d}")
+                                         for spec in specs])
+
+    print(f"[INFO] Generated {sum(count for count, _ in results)} customers across {shards} shard(s).")
+    return shard_stats
 
-# Delete all existing benchmarks
-cursor.execute("DELETE FROM benchmarks")
+# ------------------------------
+# Per-Entity Generation (counter-based seeds: any customer's rows on demand)
+# ------------------------------
+class RowCollector:
+    # Stand-in for RowBuffer that keeps one customer's rows in memory: table -> list of rows
+    def __init__(self):
+        self.rows = defaultdict(list)
+
+    def add(self, table, row):
+        self.rows[table].append(row)
+
+    def add_many(self, table, rows):
+        self.rows[table].extend(rows)
+
+DISCOUNT_RATE_SAMPLE = 2000  # customers whose orders estimate the per-entity discount rate
+active_generator = None  # the HopifyGenerator whose run date, catalog and pools the module globals hold
+
+class HopifyGenerator:
+    # Random access to the customer-level tables. Every customer is generated as a one-customer shard: each stage
+    # reseeds from derive_seed(seed, "entity", stage, customer_id) and its IDs come from a fixed per-customer block
+    # (max_rows_per_customer), so customer #123456 and its orders, tickets and churn are produced without
+    # generating anyone before it. A build with --entity-rng writes exactly these rows, for any shard count.
+    #
+    #   generator = HopifyGenerator(seed=42, scale=0.1, as_of=datetime(2026, 1, 1))
+    #   generator.customer(1234)              # customers row, as stored
+    #   generator.orders_for(1234)            # orders rows (base and expansion)
+    #   generator.rows_for(1234)              # every customer-level table: {table: rows}
+    #   generator.iter_customers(1, 1001)     # (customer_id, {table: rows}) for customer IDs 1..1000
+    #
+    # Products and discount codes are generated in memory unless given (catalog, discounts), exactly as a full
+    # build with the same seed, scale and run date would; volumes override the scaled per-table volumes.
+    def __init__(self, seed=SEED, scale=1.0, as_of=None, volumes=None, churn_model=CHURN_MODEL, pools=None,
+                 date_storage=None, acquisition_plan=None, catalog=None, discounts=None):
+        self.seed = seed
+        self.volumes = dict(scaled_volumes(scale), **(volumes or {}))
+        self.as_of = as_of or AS_OF
+        self.date_storage = date_storage or DATE_STORAGE
+        self.churn_model = churn_model
+        self.pools = pools
+        self.per_customer = max_rows_per_customer()
+        self.activate()
+
+        if acquisition_plan is None:
+            seed_stage(seed, "acquisition_plan")
+            acquisition_plan = build_acquisition_plan(self.volumes["customers"])
+        self.months = list(acquisition_plan)
+        self.month_ends = list(accumulate(acquisition_plan.values()))  # last customer index + 1 per month
+        self.total = self.month_ends[-1] if self.month_ends else 0
+        self.ticket_customers = min(self.volumes["ticket_customers"], self.total)
+
+        if catalog is None or discounts is None:
+            conn = sqlite3.connect(":memory:")
+            conn.executescript(schema_sql())
+            writer = RowBuffer(conn)
+            with open(os.devnull, mode='w') as quiet, contextlib.redirect_stdout(quiet):
+                seed_stage(seed, "products")
+                generate_products(writer, self.volumes["products"])
+                seed_stage(seed, "discounts")
+                generate_discounts(writer, self.volumes["discount_codes"])
+            writer.flush()
+            catalog = conn.execute("SELECT product_id, category, price FROM products ORDER BY product_id").fetchall()
+            discounts = load_discount_windows(conn.cursor())
+            conn.close()
+        self.catalog = catalog
+        self.discount_windows = DiscountWindows(discounts)
+        self.activate(force=True)
+
+        # Ticket customers and discounted orders are per-customer draws: a customer is sampled for tickets with
+        # probability ticket_customers / customers, and each of its orders in a discount window is discounted with
+        # probability discounted_orders / (orders in a discount window), estimated from evenly spaced customers
+        self.ticket_rate = self.ticket_customers / self.total if self.total else 0.0
+        self.discount_rate = 0.0
+        self.discount_rate = self.estimate_discount_rate()
+
+    def activate(self, force=False):
+        # The stage functions read the run date, date storage, product index and faker pools from module globals
+        global active_generator, AS_OF, DATE_STORAGE
+        if active_generator is self and not force:
+            return
+        AS_OF = self.as_of
+        DATE_STORAGE = self.date_storage
+        if getattr(self, "catalog", None) is not None:
+            build_product_index(self.catalog)
+        faker_pools.clear()
+        faker_pools.update(self.pools or {})
+        active_generator = self
+
+    def __len__(self):
+        return self.total
+
+    def estimate_discount_rate(self):
+        # Share of discount-window orders to discount: the quota over the window orders of up to
+        # DISCOUNT_RATE_SAMPLE evenly spaced customers, scaled to all customers (exact when there are fewer)
+        quota = self.volumes["discounted_orders"]
+        if not quota or not self.total:
+            return 0.0
+        sample = min(self.total, DISCOUNT_RATE_SAMPLE)
+        date_index = TABLE_COLUMNS["orders"].index("order_date")
+        window_orders = sum(
+            1
+            for i in range(sample)
+            for row in self.rows_for(1 + i * self.total // sample, "orders", stored=False).get("orders", [])
+            if self.discount_windows.valid_at(row[date_index])
+        )
+        estimate = window_orders * self.total / sample
+        return min(1.0, quota / estimate) if estimate else 0.0
+
+    def rows_for(self, customer_id, through=SHARD_STAGES[-1], stored=True):
+        # Rows of every customer-level table for one customer, running the stages up to `through`; stored=False
+        # keeps timestamps as epoch seconds (what RowBuffer expects)
+        if not 1 <= customer_id <= self.total:
+            raise IndexError(f"customer_id {customer_id} is outside 1..{self.total}")
+        self.activate()
+        index = customer_id - 1
+        ids = {table: 1 + index * per_customer for table, per_customer in self.per_customer.items()}
+        month = self.months[bisect_right(self.month_ends, index)]
+        writer = RowCollector()
+        discounts = OrderDiscountCoin(self.discount_windows, self.discount_rate,
+                                      random.Random(derive_seed(self.seed, "entity", "order_discounts", customer_id)))
+        ticket_draw = random.Random(derive_seed(self.seed, "entity", "ticket_sample", customer_id)).random()
+        ticket_sample = 1 if ticket_draw < self.ticket_rate else 0
+        customers = None
+
+        def generate_customer():
+            nonlocal customers
+            customers = generate_customers(writer, [(month, 1)], ids)
+
+        stages = {
+            "customers": generate_customer,
+            "orders": lambda: generate_orders(writer, customers, ids, "python", discounts),
+            "expansion": lambda: generate_expansion(writer, customers, ids),
+            "subscriptions": lambda: generate_subscriptions(writer, customers, ids),
+            "support_tickets": lambda: generate_support_tickets(writer, customers, ticket_sample, ids),
+            "churn": lambda: generate_churn(writer, customers, ids, self.churn_model),
+            "reactivations": lambda: generate_reactivations(
+                writer, customers, ids, churned_customers=[row[1:3] for row in writer.rows["churn_events"]]),
+        }
+        with open(os.devnull, mode='w') as quiet, contextlib.redirect_stdout(quiet):  # stages print per call
+            for stage in SHARD_STAGES[:SHARD_STAGES.index(through) + 1]:
+                seed_stage(self.seed, "entity", stage, customer_id)
+                stages[stage]()
+
+        rows = {table: writer.rows[table] for table in SHARDED_TABLES if writer.rows[table]}
+        return {table: format_timestamps(table, table_rows) for table, table_rows in rows.items()} if stored else rows
+
+    def customer(self, customer_id):
+        return self.rows_for(customer_id, "customers")["customers"][0]
+
+    def orders_for(self, customer_id):
+        return self.rows_for(customer_id, "expansion").get("orders", [])
+
+    def iter_customers(self, start=1, stop=None, stored=True):
+        # (customer_id, {table: rows}) for customer IDs start..stop-1, one customer at a time
+        for customer_id in range(start, self.total + 1 if stop is None else stop):
+            yield customer_id, self.rows_for(customer_id, stored=stored)
+
+def generate_entities(writer, generator, start, stop):
+    # Bulk path for --entity-rng: a shard's customer-ID range, written through the row buffer
+    for _, rows in generator.iter_customers(start, stop, stored=False):
+        for table, table_rows in rows.items():
+            writer.add_many(table, table_rows)
+    print(f"[INFO] Generated customers {start}..{stop - 1} entity by entity.")
 
-# Load and insert new benchmarks
-rows = []
-with open(benchmarks_csv_path, mode='r', encoding='utf-8') as file:
-    reader = csv.DictReader(file, delimiter=',')
+# ------------------------------
+# Incremental Append (extend an existing database from its last generated month)
+# ------------------------------
+ID_COLUMNS = {
+    "customers": "customer_id",
+    "orders": "order_id",
+    "order_items": "order_item_id",
+    "payments": "payment_id",
+    "subscriptions": "subscription_id",
+    "support_tickets": "ticket_id",
+    "churn_events": "churn_id",
+}
 
-    for i, row in enumerate(reader):
-        try:
-            # Skip rows with missing required fields
-            if not row["benchmark_id"] or not row["metric_name"] or not row["target_value"]:
-                print(f"[SKIP] Row {i + 1} missing required fields: {row}")
+def write_metadata(conn, **values):
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS generator_metadata (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT OR REPLACE INTO generator_metadata (key, value) VALUES (?, ?)",
+                         [(key, str(value)) for key, value in values.items()])
+
+def read_metadata(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS generator_metadata (key TEXT PRIMARY KEY, value TEXT)")
+    return dict(conn.execute("SELECT key, value FROM generator_metadata").fetchall())
+
+def next_ids(cursor):
+    # Every ID sequence continues after the highest existing key
+    return {
+        table: (cursor.execute(f"SELECT MAX({column}) FROM {table}").fetchone()[0] or 0) + 1
+        for table, column in ID_COLUMNS.items()
+    }
+
+def load_active_customers(cursor, window_start, first_new_customer_id):
+    # (customer_id, segment, signup_date, active_from) for customers that have not churned, or whose latest churn
+    # was followed by a reactivation; active_from is when their new events may start
+    churned = dict(cursor.execute("SELECT customer_id, MAX(churn_date) FROM churn_events GROUP BY customer_id").fetchall())
+    reactivated = dict(cursor.execute(
+        "SELECT customer_id, MAX(start_date) FROM subscriptions WHERE LOWER(change_type) = 'reactivation' "
+        "GROUP BY customer_id"
+    ).fetchall())
+
+    active = []
+    rows = cursor.execute("SELECT customer_id, customer_segment, signup_date FROM customers ORDER BY customer_id")
+    for customer_id, segment, signup_date_str in rows.fetchall():
+        signup_date = from_epoch(read_epoch(signup_date_str))
+        if customer_id >= first_new_customer_id:
+            active.append((customer_id, segment, signup_date, signup_date))
+            continue
+        active_from = max(window_start, signup_date)
+        churn_date = churned.get(customer_id)
+        if churn_date:
+            reactivation_date = reactivated.get(customer_id)
+            if not reactivation_date or reactivation_date <= churn_date:
                 continue
+            active_from = max(active_from, from_epoch(read_epoch(reactivation_date)))
+        active.append((customer_id, segment, signup_date, active_from))
+    return active
+
+def generate_window_orders(writer, customers, ids):
+    # Same per-customer rate as the base history (segment order range over ORDER_WINDOW), thinned to the part
+    # of the window each customer is active for
+    order_count = 0
+    for customer_id, segment, _, active_from in customers:
+        if active_from >= AS_OF:
+            continue
+        keep = (AS_OF - active_from) / ORDER_WINDOW
+        for _ in range(random.randint(*segment_order_ranges[segment])):
+            if random.random() < keep:
+                add_order(writer, ids, customer_id, segment, fake.date_time_between_dates(active_from, AS_OF))
+                order_count += 1
+
+    print(f"[INFO] Appended {order_count} orders with items and payments.")
+
+def build_ticket_share(cursor, metadata):
+    # Share of customers sampled for tickets by the build that made this database (its run_config volumes, so
+    # --scale and --ticket-customers carry over); databases without one use the share of customers with tickets,
+    # a slight undercount since a sampled customer can draw none
+    if "run_config" in metadata:
+        volumes = json.loads(metadata["run_config"])["volumes"]
+        if not volumes["customers"]:
+            return 0.0
+        return min(volumes["ticket_customers"], volumes["customers"]) / volumes["customers"]
+    customer_count = cursor.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+    ticket_customers = cursor.execute("SELECT COUNT(DISTINCT customer_id) FROM support_tickets").fetchone()[0]
+    return ticket_customers / customer_count if customer_count else 0.0
+
+def generate_window_tickets(writer, customers, ids, ticket_share):
+    # Same share of ticketing customers and tickets per year as the base history, thinned to the window;
+    # tickets stop a week before AS_OF so they are resolved by then
+    ticket_end = AS_OF - timedelta(days=7)
+    start_id = ids["support_tickets"]
+    for customer_id, segment, signup_date, active_from in customers:
+        ticket_start = max(signup_date, active_from - timedelta(days=7))
+        if ticket_start >= ticket_end or random.random() >= ticket_share:
+            continue
+        num_tickets, resolution_range = draw_ticket_profile(segment)
+        keep = (ticket_end - ticket_start) / ONE_YEAR
+        for _ in range(num_tickets):
+            if random.random() < keep:
+                add_ticket(writer, ids, customer_id, fake.date_time_between_dates(ticket_start, ticket_end),
+                           resolution_range)
+
+    print(f"[INFO] Appended {ids['support_tickets'] - start_id} support tickets.")
+
+def generate_window_churn(writer, customers, ids, model=CHURN_MODEL):
+    # The base history's churn probability covers HISTORY_MONTHS; spread it evenly as a hazard over the window
+    history = AS_OF - (AS_OF - relativedelta(months=HISTORY_MONTHS))
+    active = {customer_id: active_from for customer_id, _, _, active_from in customers}
+    store = CustomerStore.load(writer.cursor, 1, ids["customers"], tickets=True)
+    churn_probs = resolve_churn_model(model)(store.churn_features())
+    churn_inserted = 0
+
+    for (customer_id, segment), churn_prob in zip(store, churn_probs):
+        active_from = active.get(customer_id)
+        if active_from is None or active_from >= AS_OF:
+            continue
+        signup_date = store.signup_date(customer_id)
+        hazard = churn_prob * ((AS_OF - active_from) / history)
+
+        if random.random() < hazard:
+            earliest_churn = max(active_from, signup_date + min_lifetime(segment))
+            if earliest_churn < AS_OF:
+                add_churn_event(writer, ids, customer_id, earliest_churn)
+                churn_inserted += 1
+
+    print(f"[INFO] Appended {churn_inserted} churn events.")
+
+def month_starts(first, last):
+    months = []
+    month = datetime(first.year, first.month, 1)
+    while month <= last:
+        months.append(month)
+        month += relativedelta(months=1)
+    return months
+
+def append_to_database(args, pools):
+    global DATE_STORAGE, CATEGORY_STORAGE
+    run_started = time.perf_counter()
+    db_path = os.path.abspath(args.db_path)
+    conn = sqlite3.connect(db_path, check_same_thread=not args.queue_batches)
+    if args.fast_load:
+        apply_pragmas(conn, FAST_LOAD_PRAGMAS)
+    cursor = conn.cursor()
+    writer = RowBuffer(conn, args.batch_size, queue_batches=args.queue_batches)
+    faker_pools.clear()
+    faker_pools.update(pools or {})
+
+    # Last generated month: recorded by the previous run, or the last month with marketing spend
+    # (databases built before the metadata table existed)
+    metadata = read_metadata(conn)
+    DATE_STORAGE = metadata.get("date_storage", "text")
+    if args.date_storage not in (None, DATE_STORAGE):
+        conn.close()
+        raise SystemExit(f"[ERROR] {db_path} stores timestamps as {DATE_STORAGE}; drop --date-storage or rebuild it.")
+    CATEGORY_STORAGE = metadata.get("category_storage", "text")
+    if args.category_storage not in (None, CATEGORY_STORAGE):
+        conn.close()
+        raise SystemExit(f"[ERROR] {db_path} stores categories as {CATEGORY_STORAGE}; drop --category-storage or "
+                         f"rebuild it.")
+    if CATEGORY_STORAGE == "dictionary":
+        fill_dimensions(cursor)
+    last_month = metadata.get("last_month") or cursor.execute("SELECT MAX(month) FROM marketing_spend").fetchone()[0]
+    if not last_month:
+        raise SystemExit(f"[ERROR] {db_path} has no generated months to append to; run a full build first.")
+    first_new_month = datetime.strptime(last_month + "-01", "%Y-%m-%d") + relativedelta(months=1)
+    new_months = month_starts(first_new_month, AS_OF - relativedelta(months=1))
+    window_start = datetime.fromisoformat(metadata["as_of"]) if "as_of" in metadata else first_new_month
+
+    if not new_months and window_start >= AS_OF:
+        print(f"[INFO] {db_path} is already up to date (last month {last_month}, as of {window_start:%Y-%m-%d}).")
+        conn.close()
+        return
+    print(f"[INFO] Appending {len(new_months)} new month(s) after {last_month}; "
+          f"events from {window_start:%Y-%m-%d} to {AS_OF:%Y-%m-%d}.")
+
+    build_product_index(cursor.execute("SELECT product_id, category, price FROM products ORDER BY product_id").fetchall())
+    ids = next_ids(cursor)
+    first_churn_id = ids["churn_events"]
+
+    # New acquisitions keep the database's own monthly run rate
+    seed_key = AS_OF.strftime("%Y-%m-%d")
+    customer_count, month_count = cursor.execute(
+        f"SELECT COUNT(*), COUNT(DISTINCT {month_sql('signup_date')}) FROM customers"
+    ).fetchone()
+    monthly_rate = customer_count / month_count if month_count else NUM_CUSTOMERS / HISTORY_MONTHS
+    seed_stage(args.seed, "append", seed_key, "acquisition_plan")
+    plan_slice = [
+        (month.strftime('%Y-%m'), round(draw_monthly_target(month) * monthly_rate / SEASONAL_MEAN_TARGET))
+        for month in new_months
+    ]
+
+    first_new_customer_id = ids["customers"]
+    seed_stage(args.seed, "append", seed_key, "customers")
+    new_customers = generate_customers(writer, plan_slice, ids)
+    writer.end_stage("customers")
+    seed_stage(args.seed, "append", seed_key, "subscriptions")
+    generate_subscriptions(writer, new_customers, ids)
+    writer.end_stage("subscriptions")
+
+    customers = load_active_customers(cursor, window_start, first_new_customer_id)
+    print(f"[INFO] {len(customers)} active customers in the append window.")
+    seed_stage(args.seed, "append", seed_key, "orders")
+    generate_window_orders(writer, customers, ids)
+    writer.end_stage("orders")
+    seed_stage(args.seed, "append", seed_key, "support_tickets")
+    generate_window_tickets(writer, customers, ids, build_ticket_share(cursor, metadata))
+    writer.end_stage("support_tickets")
+    seed_stage(args.seed, "append", seed_key, "churn")
+    generate_window_churn(writer, customers, ids, args.churn_model)
+    writer.end_stage("churn")
+    seed_stage(args.seed, "append", seed_key, "reactivations")
+    generate_reactivations(writer, CustomerStore.load(cursor, 1, ids["customers"]), ids, first_churn_id)
+    writer.end_stage("reactivations")
+
+    seed_stage(args.seed, "append", seed_key, "marketing_spend")
+    generate_marketing_spend(writer, new_months)
+    writer.end_stage("marketing_spend")
+    seed_stage(args.seed, "append", seed_key, "web_traffic")
+    generate_web_traffic(writer, month_starts(window_start, AS_OF))
+    writer.end_stage("web_traffic")
+    refresh_kpis(writer)
+    writer.end_stage("kpis")
+
+    write_metadata(conn, as_of=AS_OF.isoformat(), last_month=new_months[-1].strftime('%Y-%m') if new_months else last_month)
+    if args.indexes:
+        create_indexes(conn)
+        writer.end_stage("indexes")
+    partition_by = args.partition_by or metadata.get("partition_by")
+    if partition_by:
+        partition_dir = os.path.abspath(args.partition_dir or metadata.get("partition_dir")
+                                        or default_partition_dir(db_path))
+        write_metadata(conn, partition_by=partition_by, partition_dir=partition_dir)
+        export_partitions(conn, db_path, partition_dir, partition_by, args.workers, full=False)
+        writer.end_stage("partitions")
+    if args.fast_load:
+        apply_pragmas(conn, SAFE_PRAGMAS)
+    conn.commit()
+    conn.close()
+
+    print_load_report(writer.stats())
+    if args.stats_json:
+        write_stats_json(args.stats_json, writer.stats(), {"mode": "append",
+                                                            "total_seconds": round(time.perf_counter() - run_started, 4)})
+    print(f"\n[INFO] Appended to {db_path}; all data has been committed and the connection has been closed.")
+
+def refresh_database_kpis(args):
+    # Standalone refresh of an existing database, on the database's own run date and date storage
+    global AS_OF, DATE_STORAGE, CATEGORY_STORAGE
+    conn = sqlite3.connect(os.path.abspath(args.db_path))
+    metadata = read_metadata(conn)
+    if "as_of" not in metadata:
+        conn.close()
+        raise SystemExit(f"[ERROR] {args.db_path} has no run date in generator_metadata; rebuild it first.")
+    AS_OF = datetime.fromisoformat(metadata["as_of"])
+    DATE_STORAGE = metadata.get("date_storage", "text")
+    CATEGORY_STORAGE = metadata.get("category_storage", "text")
+    writer = RowBuffer(conn, args.batch_size)
+    refresh_kpis(writer)
+    writer.end_stage("kpis")
+    if "partition_by" in metadata:
+        # The catalog holds a copy of the KPI tables
+        export_partitions(conn, os.path.abspath(args.db_path), metadata["partition_dir"], metadata["partition_by"],
+                          full=False)
+        writer.end_stage("partitions")
+    conn.close()
+    print_load_report(writer.stats())
+
+# ------------------------------
+# Snapshot Cache (finished builds stored under a hash of everything that determines them)
+# ------------------------------
+def snapshot_key(run_config, args):
+    # The generation options, run date, post-load phases, benchmark targets, generator source and the versions of
+    # the libraries that draw the rows (Python's random, Faker, and numpy, which feeds the numpy order engine and
+    # the churn model's feature columns when installed): builds with equal keys have the same tables, so a cached
+    # copy can stand in for a rebuild
+    code = hashlib.sha256()
+    for path in (os.path.abspath(__file__), args.benchmarks_csv):
+        with open(path, mode='rb') as file:
+            code.update(hashlib.sha256(file.read()).digest())
+    inputs = {"run_config": run_config, "as_of": AS_OF.isoformat(), "indexes": args.indexes,
+              "finalize": args.page_size if args.finalize else None, "code": code.hexdigest(),
+              "python": list(sys.version_info[:2]), "faker": faker.VERSION,
+              "numpy": np.__version__ if np is not None else None}
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest(), inputs
+
+def copy_database(source_path, target_path):
+    # Page-by-page copy through SQLite's online backup API (a consistent copy even while others read the source),
+    # swapped in whole; a journal left next to the target by an interrupted build belongs to the old file
+    temp_path = target_path + ".tmp"
+    for path in (temp_path, target_path + "-journal", target_path + "-wal"):
+        if os.path.exists(path):
+            os.remove(path)
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(temp_path)
+    source.backup(target)
+    target.close()
+    source.close()
+    os.replace(temp_path, target_path)
+
+def restore_snapshot(snapshot_path, db_path):
+    started = time.perf_counter()
+    copy_database(snapshot_path, db_path)
+    print(f"[INFO] Snapshot cache hit: copied {snapshot_path} to {db_path}.")
+    return time.perf_counter() - started
+
+def store_snapshot(db_path, snapshot_path, inputs):
+    # The inputs go next to the copy, so a cache directory can be inspected (and pruned) by hand
+    started = time.perf_counter()
+    os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+    copy_database(db_path, snapshot_path)
+    with open(os.path.splitext(snapshot_path)[0] + ".json", mode='w', encoding='utf-8') as file:
+        json.dump(inputs, file, indent=2)
+    print(f"[INFO] Snapshot stored in the cache: {snapshot_path}")
+    return time.perf_counter() - started
 
-            parsed_row = (
-                row["benchmark_id"].strip(),
-                row["metric_category"].strip(),
-                row["segment"].strip(),
-                row["metric_name"].strip(),
-                float(row["target_value"]),
-                row["description"].strip(),
-                row["target_period"].strip()
-            )
-            rows.append(parsed_row)
-
-        except Exception as e:
-            print(f"[ERROR] Row {i + 1} failed: {row}")
-            print(f"        Error: {e}")
-
-# Insert cleaned rows into benchmarks table
-cursor.executemany("""
-    INSERT INTO benchmarks (
-        benchmark_id,
-        metric_category,
-        segment,
-        metric_name,
-        target_value,
-        description,
-        target_period
-    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-""", rows)
-
-print(f"[INFO] Benchmarks replaced from CSV. Rows inserted: {len(rows)}")
-
-
-# ------------------------------
-# Finalize and Close Connection
-# ------------------------------
-conn.commit()
-conn.close()
-
-print("\n🎉 Hopify v15 (SaaS Full Lifecycle Dataset) created successfully! 🎉")
-print("✅ Includes:")
-print("- Dynamic multi-year historical data")
-print("- Segment-aware subscriptions, churn, support, payments")
-print("- Orders and product category skew by segment")
-print("- Marketing campaigns, web traffic, lead conversions")
-print("- Benchmarks for key SaaS and Marketing metrics")
-print("- Full event timestamping and behavioral modeling")
-print("- Cross-sell, upsell, support impact on churn, and more")
-print("\n[INFO] All data has been committed and the connection has been closed.")
\ No newline at end of file
+# ------------------------------
+# Main
+# ------------------------------
+def as_of_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}") from None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the Hopify SaaS SQLite database.")
+    parser.add_argument("--db-path", default=DEFAULT_DB_PATH, help="Output SQLite file")
+    parser.add_argument("--benchmarks-csv", default=DEFAULT_BENCHMARKS_CSV, help="KPI benchmark targets CSV")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help=f"Scale factor: customers, ticket sample and discounted orders grow linearly "
+                             f"(1 = {NUM_CUSTOMERS} customers, 100 = {NUM_CUSTOMERS * 100})")
+    overrides = parser.add_argument_group("per-table overrides (take precedence over --scale)")
+    overrides.add_argument("--customers", type=int, help="Total customers across the acquisition plan")
+    overrides.add_argument("--ticket-customers", type=int, help="Customers sampled for support tickets")
+    overrides.add_argument("--discounted-orders", type=int, help="Orders with a discount applied")
+    overrides.add_argument("--discount-codes", type=int, help=f"Discount codes (fixed, default {NUM_DISCOUNT_CODES})")
+    overrides.add_argument("--products", type=int, help=f"Products in the catalog (fixed, default {NUM_PRODUCTS_TOTAL})")
+    parser.add_argument("--append", action="store_true",
+                        help="Extend an existing database instead of rebuilding it: acquisitions for the months after its "
+                             "last generated month, plus orders, tickets, churn and reactivations since its last run")
+    parser.add_argument("--refresh-kpis", action="store_true",
+                        help="Only refresh the KPI fact tables of an existing database (the months whose source rows "
+                             "changed since the last refresh)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted build: stages with a checkpoint are skipped, the rest run with the "
+                             "same run date, seeds and ID counters as the interrupted run")
+    parser.add_argument("--parquet-dir", default=None,
+                        help="Also stream every table to Parquet, one directory per table (<dir>/<table>/*.parquet)")
+    parser.add_argument("--duckdb-path", default=None,
+                        help="Also load every table into this DuckDB file (TIMESTAMP/DECIMAL types, Arrow ingest)")
+    parser.add_argument("--no-sqlite", action="store_true",
+                        help="With --parquet-dir or --duckdb-path: skip the SQLite output; tables later stages read "
+                             "back go to a scratch SQLite file that is deleted at the end")
+    parser.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE, help="Rows per Parquet row group")
+    parser.add_argument("--stats-json", default=None,
+                        help="Write per-stage wall time, rows, rows/sec and peak RSS (plus per-table write stats) as JSON")
+    parser.add_argument("--as-of", type=as_of_date, default=None,
+                        help="Run date (YYYY-MM-DD) the history ends at; default today. With the same seed and options "
+                             "the same run date gives the same tables")
+    parser.add_argument("--snapshot-cache", default=None,
+                        help="Directory of finished builds keyed by a hash of the options, seed, scale, run date and "
+                             "generator source: a hit copies the cached database into place instead of generating")
+    parser.add_argument("--seed", type=int, default=SEED, help="Master seed; every stage and shard derives its own seed from it")
+    parser.add_argument("--shards", type=int, default=1, help="Split customer generation into this many shards")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for sharded generation and partition export (default: CPU count)")
+    parser.add_argument("--order-engine", choices=["python", "numpy"], default=ORDER_ENGINE, help="Orders/items/payments engine")
+    parser.add_argument("--entity-rng", action="store_true",
+                        help="Seed every customer's rows from (seed, stage, customer ID), so HopifyGenerator can "
+                             "reproduce any customer on demand and the output does not depend on --shards")
+    parser.add_argument("--churn-model", default=CHURN_MODEL,
+                        help=f"Churn scoring model: one of {sorted(CHURN_MODELS)}, or 'package.module:function' "
+                             f"taking the feature columns and returning one probability per customer")
+    parser.add_argument("--date-storage", choices=["text", "epoch"], default=None,
+                        help=f"Timestamp columns as TEXT '%%Y-%%m-%%d %%H:%%M:%%S' or INTEGER epoch seconds (smaller file, "
+                             f"faster range scans; query with datetime(col, 'unixepoch')). Default {DATE_STORAGE}; "
+                             f"--append follows the database")
+    parser.add_argument("--category-storage", choices=["text", "dictionary"], default=None,
+                        help=f"Low-cardinality columns (segment, source, plan, status, payment method, ticket category, "
+                             f"churn reason, product category, channel) as repeated TEXT, or as INTEGER codes into "
+                             f"dim_* tables behind views with the usual table and column names (smaller file). "
+                             f"Default {CATEGORY_STORAGE}; --append follows the database")
+    parser.add_argument("--indexes", action="store_true",
+                        help="After loading, build covering indexes for the KPI queries and run ANALYZE "
+                             "(see 04_code/hopify_kpi_benchmark.py for the query workload)")
+    parser.add_argument("--finalize", action="store_true",
+                        help="After loading, renumber the fact tables' rows in (customer_id, date) order, make "
+                             "order_discounts WITHOUT ROWID, VACUUM into --page-size pages and record the mmap_size "
+                             "readers should use; reports file size and per-customer timeline latency before and after")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Page size for --finalize (bytes)")
+    parser.add_argument("--partition-by", choices=list(PARTITION_MONTHS), default=None,
+                        help="Also split the fact tables (orders, order_items, payments, subscriptions, support_tickets, "
+                             "churn_events) into one SQLite file per period, next to a catalog.db with the other tables "
+                             "(open_partitions() gives UNION ALL views over them); --append rewrites only the periods "
+                             "it touches. SQLite attaches at most 10 files per connection, so views over more periods "
+                             "(a full history of months or quarters) read the main database instead")
+    parser.add_argument("--partition-dir", default=None,
+                        help="Directory for the partition files and catalog.db (default: <db-path without .db>_partitions)")
+    parser.add_argument("--fast-load", action="store_true",
+                        help="Bulk-load mode: in-memory journal, synchronous OFF, large page cache; safe settings restored at the end")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows buffered per table before each executemany")
+    parser.add_argument("--writer-thread", action="store_true",
+                        help="Write batches on a dedicated thread so generation and SQLite/Parquet writes overlap")
+    parser.add_argument("--queue-batches", type=int, default=DEFAULT_QUEUE_BATCHES,
+                        help="Batches in flight to the writer thread before generation blocks (with --writer-thread)")
+    parser.add_argument("--faker-pools", action="store_true",
+                        help="Draw customer names, companies, emails and addresses from pre-generated pools instead of live Faker calls")
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE, help="Distinct values per faker pool")
+    parser.add_argument("--pool-cache", default=None, help="JSON file to persist/reuse faker pools (with --faker-pools)")
+    args = parser.parse_args(argv)
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.append and args.shards > 1:
+        parser.error("--append runs in a single process; drop --shards")
+    if args.refresh_kpis and (args.append or args.resume or args.parquet_dir or args.duckdb_path or args.as_of):
+        parser.error("--refresh-kpis runs on its own; drop --append, --resume, --parquet-dir, --duckdb-path and --as-of")
+    if args.refresh_kpis and not os.path.exists(args.db_path):
+        parser.error(f"--refresh-kpis needs an existing database: {args.db_path} not found")
+    if args.append and args.resume:
+        parser.error("--resume applies to full builds; an interrupted --append can simply be rerun")
+    if args.no_sqlite and not (args.parquet_dir or args.duckdb_path):
+        parser.error("--no-sqlite needs --parquet-dir or --duckdb-path")
+    if args.parquet_dir and (args.append or args.resume):
+        parser.error("--parquet-dir streams a full build; it cannot be combined with --append or --resume")
+    if args.duckdb_path and (args.append or args.resume):
+        parser.error("--duckdb-path loads a full build; it cannot be combined with --append or --resume")
+    if args.entity_rng and args.order_engine == "numpy":
+        parser.error("--entity-rng generates one customer at a time; use the python order engine")
+    if args.entity_rng and args.append:
+        parser.error("--entity-rng applies to full builds; --append continues the database's own streams")
+    if args.indexes and args.no_sqlite:
+        parser.error("--indexes applies to the SQLite output; drop --no-sqlite")
+    if args.finalize and (args.append or args.no_sqlite or args.parquet_dir or args.duckdb_path or args.entity_rng):
+        parser.error("--finalize renumbers the fact rows of a full SQLite build, which --append, --no-sqlite, "
+                     "--parquet-dir, --duckdb-path and --entity-rng rely on keeping; drop it or them")
+    if args.page_size not in [512 << k for k in range(8)]:
+        parser.error("--page-size must be a power of two from 512 to 65536")
+    if args.snapshot_cache and (args.append or args.resume or args.refresh_kpis or args.no_sqlite or args.parquet_dir
+                                or args.duckdb_path or args.partition_by):
+        parser.error("--snapshot-cache caches full builds of the SQLite file alone; drop --append, --resume, "
+                     "--refresh-kpis, --no-sqlite, --parquet-dir, --duckdb-path and --partition-by")
+    if args.partition_by and args.no_sqlite:
+        parser.error("--partition-by splits the SQLite output; drop --no-sqlite")
+    if args.partition_dir and not (args.partition_by or args.append):
+        parser.error("--partition-dir needs --partition-by")
+    if args.row_group_size < 1:
+        parser.error("--row-group-size must be at least 1")
+    if args.append and not os.path.exists(args.db_path):
+        parser.error(f"--append needs an existing database: {args.db_path} not found")
+    if args.scale <= 0:
+        parser.error("--scale must be positive")
+    for name in ("customers", "products", "discount_codes"):
+        if getattr(args, name) is not None and getattr(args, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+    for name in ("ticket_customers", "discounted_orders"):
+        if getattr(args, name) is not None and getattr(args, name) < 0:
+            parser.error(f"--{name.replace('_', '-')} must not be negative")
+    try:
+        resolve_churn_model(args.churn_model)
+    except (ValueError, ImportError, AttributeError) as error:
+        parser.error(f"--churn-model: {error}")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.queue_batches < 1:
+        parser.error("--queue-batches must be at least 1")
+    # Queue depth handed to RowBuffer; 0 writes on the generating thread
+    args.queue_batches = args.queue_batches if args.writer_thread else 0
+    if args.pool_size < 1:
+        parser.error("--pool-size must be at least 1")
+    return args
+
+def scaled_volumes(scale=1.0):
+    # Customer-driven volumes scale linearly; products and discount codes are dimension tables and stay fixed
+    return {
+        "customers": max(1, round(NUM_CUSTOMERS * scale)),
+        "ticket_customers": round(TICKET_SAMPLE_SIZE * scale),
+        "discounted_orders": round(NUM_DISCOUNTED_ORDERS * scale),
+        "discount_codes": NUM_DISCOUNT_CODES,
+        "products": NUM_PRODUCTS_TOTAL,
+    }
+
+def resolve_volumes(args):
+    volumes = scaled_volumes(args.scale)
+    for name in volumes:
+        if getattr(args, name) is not None:
+            volumes[name] = getattr(args, name)
+    return volumes
+
+def main(argv=None):
+    global AS_OF, DATE_STORAGE, CATEGORY_STORAGE
+    run_started = time.perf_counter()
+    args = parse_args(argv)
+    AS_OF = datetime.combine(args.as_of or datetime.today().date(), datetime.min.time())
+    print("[INFO] Database structure and constants initialized.")
+
+    if args.refresh_kpis:
+        refresh_database_kpis(args)
+        return
+
+    if args.append:
+        pools = load_faker_pools(args.seed, args.pool_size, args.pool_cache) if args.faker_pools else None
+        append_to_database(args, pools)
+        return
+
+    DATE_STORAGE = args.date_storage or DATE_STORAGE
+    CATEGORY_STORAGE = args.category_storage or CATEGORY_STORAGE
+    volumes = resolve_volumes(args)
+    print(f"[INFO] Scale {args.scale:g}: " + ", ".join(f"{name}={count}" for name, count in volumes.items()))
+    # Everything that changes the generated rows; a resumed run must match the interrupted one
+    run_config = {"seed": args.seed, "volumes": volumes, "shards": args.shards, "order_engine": args.order_engine,
+                  "churn_model": args.churn_model, "date_storage": DATE_STORAGE,
+                  "category_storage": CATEGORY_STORAGE, "entity_rng": args.entity_rng,
+                  "faker_pools": args.pool_size if args.faker_pools else None}
+
+    db_path = os.path.abspath(args.db_path)
+    if args.snapshot_cache:
+        key, snapshot_inputs = snapshot_key(run_config, args)
+        snapshot_path = os.path.join(os.path.abspath(args.snapshot_cache), f"{key}.db")
+        if os.path.exists(snapshot_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            seconds = restore_snapshot(snapshot_path, db_path)
+            if args.stats_json:
+                write_stats_json(args.stats_json, {"stage_seconds": {"snapshot": seconds}},
+                                 {"mode": "snapshot", "run_config": run_config,
+                                  "total_seconds": round(time.perf_counter() - run_started, 4)})
+            return
+        print(f"[INFO] Snapshot cache miss ({key[:12]}); building and storing a copy.")
+    pools = load_faker_pools(args.seed, args.pool_size, args.pool_cache) if args.faker_pools else None
+    outputs = None
+    if args.parquet_dir or args.duckdb_path:
+        outputs = {"parquet_dir": args.parquet_dir and os.path.abspath(args.parquet_dir),
+                   "duckdb_path": args.duckdb_path and os.path.abspath(args.duckdb_path),
+                   "row_group_size": args.row_group_size,
+                   "sqlite_tables": READ_BACK_TABLES if args.no_sqlite else None}
+        if outputs["parquet_dir"]:
+            prepare_parquet_dir(outputs["parquet_dir"])
+            print(f"[INFO] Streaming tables to Parquet under {outputs['parquet_dir']}.")
+        if outputs["duckdb_path"]:
+            prepare_duckdb(outputs["duckdb_path"])
+            print(f"[INFO] Loading tables into DuckDB at {outputs['duckdb_path']}.")
+        if args.no_sqlite:
+            db_path = (os.path.join(outputs["parquet_dir"], "_scratch.db") if outputs["parquet_dir"]
+                       else outputs["duckdb_path"] + ".scratch.db")
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            print("[INFO] No SQLite output: tables later stages read back go to a scratch file.")
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=not args.queue_batches)
+    if args.fast_load:
+        apply_pragmas(conn, FAST_LOAD_PRAGMAS)
+        print("[INFO] Fast-load mode: " + ", ".join(FAST_LOAD_PRAGMAS))
+    if args.queue_batches:
+        print(f"[INFO] Writer thread enabled: up to {args.queue_batches} batches of {args.batch_size} rows in flight.")
+    cursor = conn.cursor()
+
+    metadata = read_metadata(conn) if args.resume else {}
+    resume = "run_config" in metadata
+    if resume:
+        if json.loads(metadata["run_config"]) != run_config:
+            conn.close()
+            raise SystemExit(f"[ERROR] --resume needs the options of the interrupted run: {metadata['run_config']}")
+        if args.as_of and args.as_of != datetime.fromisoformat(metadata["as_of"]).date():
+            conn.close()
+            raise SystemExit(f"[ERROR] --resume continues the run as of {metadata['as_of'][:10]}; drop --as-of.")
+        AS_OF = datetime.fromisoformat(metadata["as_of"])
+        completed = load_checkpoints(conn)
+        print(f"[INFO] Resuming build as of {AS_OF:%Y-%m-%d} ({len(completed)} checkpoint(s) found).")
+    else:
+        if args.resume:
+            print(f"[INFO] Nothing to resume in {db_path}; starting a full build.")
+        create_schema(cursor)
+        write_metadata(conn, seed=args.seed, as_of=AS_OF.isoformat(), date_storage=DATE_STORAGE,
+                       category_storage=CATEGORY_STORAGE,
+                       run_config=json.dumps(run_config))
+        completed = {}
+
+    seed_stage(args.seed, "acquisition_plan")
+    acquisition_plan = build_acquisition_plan(volumes["customers"])
+
+    writer = RowBuffer(conn, args.batch_size, open_sinks(outputs, "main", shared=True),
+                       outputs["sqlite_tables"] if outputs else None, args.queue_batches)
+
+    run_stage(writer, completed, "products", (args.seed, "products"),
+              lambda: generate_products(writer, volumes["products"]))
+    build_product_index(cursor.execute("SELECT product_id, category, price FROM products ORDER BY product_id").fetchall())
+    print(f"[INFO] Product catalog index built for {len(product_index)} categories.")
+    run_stage(writer, completed, "locations", None, lambda: generate_locations(writer))
+    # Discount codes come before the customer shards, which apply them while generating orders
+    run_stage(writer, completed, "discounts", (args.seed, "discounts"),
+              lambda: generate_discounts(writer, volumes["discount_codes"]))
+
+    shard_stats = generate_customer_shards(conn, db_path, acquisition_plan, args.seed, args.shards, args.workers,
+                                           args.order_engine, args.fast_load, args.batch_size, pools,
+                                           volumes["ticket_customers"], resume, outputs, args.churn_model,
+                                           volumes["discounted_orders"], args.queue_batches, args.entity_rng)
+    writer.stage_started = time.perf_counter()
+
+    run_stage(writer, completed, "app_installs", (args.seed, "app_installs"),
+              lambda: generate_app_installs(writer))
+    run_stage(writer, completed, "marketing_spend", (args.seed, "marketing_spend"),
+              lambda: generate_marketing_spend(writer))
+    run_stage(writer, completed, "web_traffic", (args.seed, "web_traffic"),
+              lambda: generate_web_traffic(writer))
+    run_stage(writer, completed, "benchmarks", None, lambda: load_benchmarks(writer, args.benchmarks_csv))
+    if not args.no_sqlite:
+        run_stage(writer, completed, "kpis", None, lambda: refresh_kpis(writer, full=True))
+    write_metadata(conn, last_month=list(acquisition_plan)[-1])
+    writer.close()
+    if outputs and outputs["parquet_dir"]:
+        finish_parquet_dir(outputs["parquet_dir"])
+    if args.indexes:
+        run_stage(writer, completed, "indexes", None, lambda: create_indexes(conn))
+    if args.finalize:
+        run_stage(writer, completed, "finalize", None, lambda: finalize_database(conn, db_path, args.page_size))
+    if args.partition_by:
+        partition_dir = os.path.abspath(args.partition_dir or default_partition_dir(db_path))
+        write_metadata(conn, partition_by=args.partition_by, partition_dir=partition_dir)
+        run_stage(writer, completed, "partitions", None,
+                  lambda: export_partitions(conn, db_path, partition_dir, args.partition_by, args.workers))
+
+    # ------------------------------
+    # Finalize and Close Connection
+    # ------------------------------
+    if args.fast_load:
+        apply_pragmas(conn, SAFE_PRAGMAS)
+    conn.commit()
+    conn.close()
+    if args.no_sqlite:
+        os.remove(db_path)
+    if args.snapshot_cache:
+        shard_stats.setdefault("stage_seconds", {})["snapshot"] = store_snapshot(db_path, snapshot_path,
+                                                                                 snapshot_inputs)
+
+    run_stats = merge_stats(shard_stats, writer.stats())
+    print_load_report(run_stats)
+    if args.stats_json:
+        write_stats_json(args.stats_json, run_stats, {"mode": "build", "run_config": run_config,
+                                                      "total_seconds": round(time.perf_counter() - run_started, 4)})
+
+    print("\n🎉 Hopify v15 (SaaS Full Lifecycle Dataset) created successfully! 🎉")
+    print("✅ Includes:")
+    print("- Dynamic multi-year historical data")
+    print("- Segment-aware subscriptions, churn, support, payments")
+    print("- Orders and product category skew by segment")
+    print("- Marketing campaigns, web traffic, lead conversions")
+    print("- Benchmarks for key SaaS and Marketing metrics")
+    print("- Full event timestamping and behavioral modeling")
+    print("- Cross-sell, upsell, support impact on churn, and more")
+    print("\n[INFO] All data has been committed and the connection has been closed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+# Standard library
+import os
+import re
+import csv
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+# Generator module (index set, timestamp helpers, default paths)
+import hopify_db_v1_gen as gen
+
+# Optional: the same workload on the generator's DuckDB output
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+# ------------------------------
+# Constants
+# ------------------------------
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT_DIR = os.path.join(CODE_DIR, '..', '01_project_artifacts', '01_benchmarks', 'generator_perf')
+DEFAULT_REPEAT = 3
+WINDOW_MONTHS = 12  # trailing months covered by the monthly KPI queries
+DRILLDOWN_CUSTOMERS = 50  # customers looked up one by one in the drill-down query
+CSV_COLUMNS = ["query", "rows", "before_ms", "after_ms", "speedup", "duckdb_ms"]
+
+# ------------------------------
+# KPI Query Workload (dashboard queries, compared with the benchmarks table targets)
+# ------------------------------
+# {month:column} is replaced by the "YYYY-MM" expression for the database's date storage; $since / $as_of are
+# bound as stored timestamps; queries marked per_customer run once for each drill-down customer ($customer_id);
+# queries with "requires" are skipped on databases without that table. The SQL is kept portable between SQLite
+# and DuckDB: $name parameters, and every selected column either grouped or aggregated
+KPI_QUERIES = [
+    {
+        "name": "monthly_churn_by_segment",
+        "description": "Monthly churn % by segment vs 'Monthly Churn Target (%)'",
+        "sql": """
+            SELECT c.customer_segment, {month:ce.churn_date} AS month, COUNT(DISTINCT ce.customer_id) AS churned,
+                   ROUND(100.0 * COUNT(DISTINCT ce.customer_id) / (
+                       SELECT COUNT(*) FROM customers base
+                       WHERE base.customer_segment = c.customer_segment AND base.signup_date < $since
+                   ), 2) AS churn_pct,
+                   MAX(b.target_value) AS target_pct
+            FROM churn_events ce
+            JOIN customers c ON c.customer_id = ce.customer_id
+            LEFT JOIN benchmarks b ON b.segment = c.customer_segment AND b.metric_name = 'Monthly Churn Target (%)'
+            WHERE ce.churn_date >= $since
+            GROUP BY c.customer_segment, month
+            ORDER BY c.customer_segment, month
+        """,
+    },
+    {
+        "name": "monthly_arpu_by_segment",
+        "description": "Monthly ARPU (successful payments per paying customer) by segment vs 'ARPU Target'",
+        "sql": """
+            SELECT c.customer_segment, {month:p.payment_date} AS month,
+                   ROUND(SUM(p.payment_amount) / COUNT(DISTINCT p.customer_id), 2) AS arpu,
+                   MAX(b.target_value) AS target_arpu
+            FROM payments p
+            JOIN customers c ON c.customer_id = p.customer_id
+            LEFT JOIN benchmarks b ON b.segment = c.customer_segment AND b.metric_name = 'ARPU Target'
+            WHERE p.payment_date >= $since AND p.success = 1
+            GROUP BY c.customer_segment, month
+            ORDER BY c.customer_segment, month
+        """,
+    },
+    {
+        "name": "mrr_by_segment",
+        "description": "MRR of subscriptions active at the run date by segment vs 'MRR Target'",
+        "sql": """
+            SELECT c.customer_segment, ROUND(SUM(s.subscription_price), 2) AS mrr,
+                   MAX(b.target_value) AS target_mrr
+            FROM subscriptions s
+            JOIN customers c ON c.customer_id = s.customer_id
+            LEFT JOIN benchmarks b ON b.segment = c.customer_segment AND b.metric_name = 'MRR Target'
+            WHERE s.start_date <= $as_of AND (s.end_date IS NULL OR s.end_date > $as_of)
+            GROUP BY c.customer_segment
+            ORDER BY c.customer_segment
+        """,
+    },
+    {
+        "name": "monthly_cac_by_segment",
+        "description": "New customers and CAC (marketing spend per new customer) by segment vs 'CAC Target'",
+        "sql": """
+            SELECT c.customer_segment, {month:c.signup_date} AS month, COUNT(*) AS new_customers,
+                   ROUND(MAX(ms.monthly_budget) / COUNT(*), 2) AS cac, MAX(b.target_value) AS target_cac
+            FROM customers c
+            LEFT JOIN marketing_spend ms ON ms.segment = c.customer_segment AND ms.month = {month:c.signup_date}
+            LEFT JOIN benchmarks b ON b.segment = c.customer_segment AND b.metric_name = 'CAC Target'
+            WHERE c.signup_date >= $since
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """,
+    },
+    {
+        "name": "support_load_before_churn",
+        "description": "Tickets per churned customer in the window, by segment and ticket category",
+        "sql": """
+            SELECT c.customer_segment, st.ticket_category, COUNT(*) AS tickets,
+                   COUNT(DISTINCT ce.customer_id) AS churned_customers
+            FROM churn_events ce
+            JOIN customers c ON c.customer_id = ce.customer_id
+            JOIN support_tickets st ON st.customer_id = ce.customer_id AND st.created_at <= ce.churn_date
+            WHERE ce.churn_date >= $since
+            GROUP BY c.customer_segment, st.ticket_category
+            ORDER BY c.customer_segment, st.ticket_category
+        """,
+    },
+    {
+        "name": "kpi_fact_table_lookup",
+        "description": "The same monthly KPIs and targets read from the materialized kpi_monthly_segment table",
+        "requires": "kpi_monthly_segment",
+        "sql": """
+            SELECT segment, month, churn_rate_pct, churn_target_pct, arpu, arpu_target, mrr, mrr_target, cac, cac_target
+            FROM kpi_monthly_segment
+            WHERE month >= $since_month
+            ORDER BY segment, month
+        """,
+    },
+    {
+        "name": "customer_drilldown",
+        "description": "One customer's orders with line items, payments and tickets (dashboard drill-down)",
+        "per_customer": True,
+        "sql": """
+            SELECT o.order_id, o.order_date, o.total_amount, SUM(oi.quantity) AS items,
+                   (SELECT COUNT(*) FROM payments p WHERE p.customer_id = o.customer_id) AS payments,
+                   (SELECT COUNT(*) FROM support_tickets st WHERE st.customer_id = o.customer_id) AS tickets
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.order_id
+            WHERE o.customer_id = $customer_id
+            GROUP BY o.order_id, o.order_date, o.total_amount, o.customer_id
+            ORDER BY o.order_date
+        """,
+    },
+]
+
+def render_sql(sql, month_sql=None):
+    # {month:column} -> month expression for the current gen.DATE_STORAGE (or the given engine's expression)
+    month_sql = month_sql or gen.month_sql
+    while "{month:" in sql:
+        start = sql.index("{month:")
+        end = sql.index("}", start)
+        sql = sql[:start] + month_sql(sql[start + len("{month:"):end]) + sql[end + 1:]
+    return sql
+
+def duckdb_month_sql(column):
+    # DuckDB output stores date-times as TIMESTAMP
+    return f"strftime({column}, '%Y-%m')"
+
+def bound_params(sql, params):
+    # Only the parameters the statement names (DuckDB rejects extra ones)
+    return {key: params[key] for key in set(re.findall(r"\$(\w+)", sql)) if key in params}
+
+def workload_params(conn):
+    metadata = dict(conn.execute("SELECT key, value FROM generator_metadata").fetchall())
+    gen.DATE_STORAGE = metadata.get("date_storage", "text")
+    gen.CATEGORY_STORAGE = metadata.get("category_storage", "text")
+    as_of = datetime.fromisoformat(metadata["as_of"])
+    max_customer_id = conn.execute("SELECT MAX(customer_id) FROM customers").fetchone()[0] or 0
+    step = max(1, max_customer_id // DRILLDOWN_CUSTOMERS)
+    since = as_of - relativedelta(months=WINDOW_MONTHS)
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')").fetchall()}
+    return {
+        "since": gen.stored_timestamp(since),
+        "since_month": since.strftime("%Y-%m"),
+        "as_of": gen.stored_timestamp(as_of),
+        "window": (since, as_of),  # as datetimes, for engines with a native timestamp type
+        "queries": [query for query in KPI_QUERIES if query.get("requires", "customers") in tables],
+        "customer_ids": list(range(1, max_customer_id + 1, step))[:DRILLDOWN_CUSTOMERS],
+    }
+
+# ------------------------------
+# Run the Workload
+# ------------------------------
+def run_query(conn, query, params, month_sql=None):
+    sql = render_sql(query["sql"], month_sql)
+    if query.get("per_customer"):
+        rows = []
+        for customer_id in params["customer_ids"]:
+            rows.extend(conn.execute(sql, {"customer_id": customer_id}).fetchall())
+        return rows
+    return conn.execute(sql, bound_params(sql, params)).fetchall()
+
+def run_workload(conn, params, repeat, month_sql=None):
+    # Best of `repeat` runs per query (the first run also warms the page cache)
+    results = {}
+    for query in params["queries"]:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = run_query(conn, query, params, month_sql)
+            timings.append(time.perf_counter() - started)
+        results[query["name"]] = {"rows": rows, "seconds": min(timings)}
+    return results
+
+def drop_indexes(conn):
+    for name in gen.ANALYTICAL_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute("DROP TABLE IF EXISTS sqlite_stat1")
+    conn.commit()
+
+def duckdb_workload(duckdb_path, params, repeat):
+    # The same queries on the DuckDB file written with --duckdb-path: timestamps bound as datetimes, since
+    # DuckDB compares them against TIMESTAMP columns
+    if duckdb is None:
+        raise SystemExit("[ERROR] --duckdb-path requires duckdb (pip install duckdb)")
+    conn = duckdb.connect(duckdb_path, read_only=True)
+    since, as_of = params["window"]
+    duck_params = dict(params, since=since, as_of=as_of)
+    print(f"[INFO] Running {len(params['queries'])} KPI queries on DuckDB...")
+    results = run_workload(conn, duck_params, repeat, duckdb_month_sql)
+    conn.close()
+    return results
+
+def benchmark(db_path, repeat, duckdb_path=None):
+    # Works on a private copy: indexes are dropped for the "before" run and rebuilt for the "after" run
+    with tempfile.TemporaryDirectory(prefix="hopify_kpi_") as workdir:
+        source = sqlite3.connect(db_path)
+        conn = sqlite3.connect(os.path.join(workdir, "kpi.db"))
+        source.backup(conn)
+        source.close()
+
+        params = workload_params(conn)
+        drop_indexes(conn)
+        print(f"[INFO] Running {len(params['queries'])} KPI queries without analytical indexes...")
+        before = run_workload(conn, params, repeat)
+
+        started = time.perf_counter()
+        gen.create_indexes(conn)
+        conn.commit()
+        index_seconds = time.perf_counter() - started
+        print(f"[INFO] Running {len(params['queries'])} KPI queries with analytical indexes...")
+        after = run_workload(conn, params, repeat)
+        conn.close()
+    duck = duckdb_workload(duckdb_path, params, repeat) if duckdb_path else {}
+
+    report = []
+    for query in params["queries"]:
+        name = query["name"]
+        if before[name]["rows"] != after[name]["rows"]:
+            print(f"[WARN] {name}: results differ with and without indexes.")
+        report.append({
+            "query": name,
+            "rows": len(after[name]["rows"]),
+            "before_ms": round(before[name]["seconds"] * 1000, 2),
+            "after_ms": round(after[name]["seconds"] * 1000, 2),
+            "speedup": round(before[name]["seconds"] / after[name]["seconds"], 1) if after[name]["seconds"] else None,
+            "duckdb_ms": round(duck[name]["seconds"] * 1000, 2) if name in duck else None,
+        })
+        if name in duck and len(duck[name]["rows"]) != len(after[name]["rows"]):
+            print(f"[WARN] {name}: DuckDB returned {len(duck[name]['rows'])} rows, SQLite {len(after[name]['rows'])}.")
+    return report, index_seconds, after
+
+# ------------------------------
+# Report (console, JSON + CSV)
+# ------------------------------
+def print_report(report, index_seconds):
+    print(f"[PERF] {'query':<28} {'rows':>6} {'before ms':>10} {'after ms':>10} {'speedup':>8} {'duckdb ms':>10}")
+    for row in report:
+        print(f"[PERF] {row['query']:<28} {row['rows']:>6} {row['before_ms']:>10.2f} {row['after_ms']:>10.2f} "
+              f"{row['speedup'] if row['speedup'] is not None else '-':>7}x "
+              f"{row['duckdb_ms'] if row['duckdb_ms'] is not None else '-':>10}")
+    print(f"[PERF] Index build + ANALYZE: {index_seconds:.2f}s")
+
+def print_targets(results):
+    # Latest value per segment next to its benchmark target, for the monthly KPIs
+    for name in ("monthly_churn_by_segment", "monthly_arpu_by_segment", "mrr_by_segment", "monthly_cac_by_segment"):
+        latest = {}
+        for row in results[name]["rows"]:
+            latest[row[0]] = row
+        for segment, row in sorted(latest.items()):
+            print(f"[KPI]  {name:<28} {segment:<11} value={row[-2]} target={row[-1]}")
+
+def write_results(output_dir, report):
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = report["created_at"].replace(":", "").replace("-", "")
+    json_path = os.path.join(output_dir, f"kpi_queries_{stamp}.json")
+    csv_path = os.path.join(output_dir, f"kpi_queries_{stamp}.csv")
+
+    with open(json_path, mode='w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+
+    with open(csv_path, mode='w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_COLUMNS)
+        for row in report["queries"]:
+            writer.writerow([row[column] for column in CSV_COLUMNS])
+
+    print(f"[INFO] Results written to: {json_path}")
+    print(f"[INFO] Results written to: {csv_path}")
+
+# ------------------------------
+# Main
+# ------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time the KPI query workload (churn, ARPU, MRR, CAC vs benchmarks targets, customer drill-downs) "
+                    "on a generated database, without and with the generator's analytical indexes."
+    )
+    parser.add_argument("--db-path", default=gen.DEFAULT_DB_PATH, help="Generated SQLite database (left unchanged)")
+    parser.add_argument("--duckdb-path", default=None,
+                        help="DuckDB file from the same generator run (--duckdb-path); its timings are added per query")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Runs per query; the fastest is kept")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Where result JSON/CSV files are written")
+    parser.add_argument("--no-save", action="store_true", help="Only print the report")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if not os.path.exists(args.db_path):
+        parser.error(f"{args.db_path} not found; generate a database first")
+    if args.duckdb_path and not os.path.exists(args.duckdb_path):
+        parser.error(f"{args.duckdb_path} not found; generate with --duckdb-path first")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    queries, index_seconds, results = benchmark(args.db_path, args.repeat, args.duckdb_path)
+    print_report(queries, index_seconds)
+    print_targets(results)
+
+    if not args.no_save:
+        write_results(os.path.abspath(args.output_dir), {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "db_path": os.path.abspath(args.db_path),
+            "duckdb_path": args.duckdb_path and os.path.abspath(args.duckdb_path),
+            "repeat": args.repeat,
+            "index_seconds": round(index_seconds, 4),
+            "queries": queries,
+        })
+
+
+if __name__ == "__main__":
+    main()